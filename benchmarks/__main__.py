@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+from benchmarks.suite import BenchmarkSuite, DICTIONARY_PATH, NUM_WORDS, compare
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--dictionary", default=DICTIONARY_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--num-words", type=int, nargs="+", default=NUM_WORDS, help="Puzzle sizes."
+    )
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against the baseline, as a fraction.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baseline.",
+    )
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite(args.dictionary, seed=args.seed, repeats=args.repeats)
+    suite.run(num_words=args.num_words)
+    results = suite.to_json()
+
+    with open(args.out, "w", encoding="utf-8") as fp:
+        json.dump(results, fp, indent=4)
+    print(f"Results written to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fp:
+            json.dump(results, fp, indent=4)
+        print(f"Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as fp:
+            baseline = json.load(fp)
+    except FileNotFoundError:
+        sys.exit(f"No baseline at {args.baseline}, run with --save-baseline first.")
+
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print("    ", regression)
+        print(
+            "Timings are machine-specific, record the baseline with --save-baseline"
+            " on this machine at the base revision before comparing."
+        )
+        sys.exit(1)
+    print("No regressions against baseline.")
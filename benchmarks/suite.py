@@ -0,0 +1,217 @@
+import contextlib
+import os
+import platform
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from grid_generator.src.grid_generator import (
+    CrossWordGame,
+    FillEngine,
+    GridConflictingCell,
+    UnplaceablePathError,
+    WordDictionary,
+    WordGraph,
+    WordPicker,
+    iter_dictionary_entries,
+    iterative_randomized_search,
+)
+from grid_generator.src.path_scoring import score_pathes
+
+
+DICTIONARY_PATH = "data/enriched_dictionary_en.json"
+NUM_WORDS = [4, 6, 8, 12, 16, 20]
+DICTIONARY_SIZES = [1000, 5000, None]
+
+
+def load_word_dictionary_json(path) -> WordDictionary:
+    return WordDictionary(iter_dictionary_entries(path))
+
+
+def _timed(fn: Callable[[], object], repeats: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "runs": repeats,
+    }
+
+
+class BenchmarkSuite:
+    """Times every stage of the grid generation pipeline.
+
+    All randomness is seeded and words are sampled from a fixed dictionary,
+    so two runs on the same machine measure the same work.
+    """
+
+    def __init__(self, dictionary_path=DICTIONARY_PATH, seed=0, repeats=5):
+        self.dictionary_path = dictionary_path
+        self.seed = seed
+        self.repeats = repeats
+        self.raw_dictionary = list(iter_dictionary_entries(dictionary_path))
+        self.word_dictionary = WordDictionary(self.raw_dictionary)
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    def sample_words(self, num_words) -> List[str]:
+        rng = random.Random(f"{self.seed}:{num_words}")
+        candidates = [
+            word
+            for word in self.word_dictionary.unique_words[:1000]
+            if 4 <= len(word) <= 8
+        ]
+        return rng.sample(candidates, num_words)
+
+    def record(self, name, fn, repeats=None, quiet=False, **params):
+        random.seed(self.seed)
+        with _quiet() if quiet else contextlib.nullcontext():
+            result = _timed(fn, repeats or self.repeats)
+        result["params"] = params
+        self.results[name] = result
+        print(f"{name}: median {result['median'] * 1000:.3f} ms")
+
+    def run(self, num_words=NUM_WORDS, dictionary_sizes=DICTIONARY_SIZES):
+        self.record(
+            "dictionary_load[json]",
+            lambda: load_word_dictionary_json(self.dictionary_path),
+        )
+        for size in dictionary_sizes:
+            entries = self.raw_dictionary[:size]
+            self.record(
+                f"word_dictionary[{size or 'all'}]",
+                lambda: WordDictionary(entries),
+                dictionary_size=len(entries),
+            )
+        for n in num_words:
+            self._run_for_num_words(n)
+        return self.results
+
+    def _run_for_num_words(self, num_words):
+        words = self.sample_words(num_words)
+        self.record(
+            f"word_graph[{num_words}]", lambda: WordGraph(words), num_words=num_words
+        )
+
+        graph = WordGraph(words)
+        random.seed(self.seed)
+        pathes = []
+        path_ids = []
+
+        def search():
+            result = iterative_randomized_search(
+                graph, len(graph.nodes) - 1, max_pathes=100, max_iterations=10000
+            )
+            pathes[:] = result.values()
+            path_ids[:] = result.keys()
+
+        self.record(
+            f"iterative_randomized_search[{num_words}]",
+            search,
+            quiet=True,
+            num_words=num_words,
+        )
+
+        self.record(
+            f"score_pathes[{num_words}]",
+            lambda: score_pathes(graph, path_ids),
+            num_words=num_words,
+            pathes=len(path_ids),
+        )
+
+        game = CrossWordGame.__new__(CrossWordGame)
+        game.words = words
+        grids = []
+
+        def to_grids():
+            grids.clear()
+            for path in pathes:
+                try:
+                    grids.append(game._node_links_to_grid(path))
+                except (GridConflictingCell, UnplaceablePathError):
+                    pass
+
+        self.record(
+            f"node_links_to_grid[{num_words}]",
+            to_grids,
+            num_words=num_words,
+            pathes=len(pathes),
+        )
+        self.record(
+            f"grid_is_valid[{num_words}]",
+            lambda: [grid.is_valid() for grid in grids],
+            num_words=num_words,
+            grids=len(grids),
+        )
+        self._run_end_to_end(num_words)
+
+    def _run_end_to_end(self, num_words):
+        word_picker = WordPicker(
+            self.dictionary_path, stop_word_offset=0, most_frequents=1000
+        )
+        for engine in (FillEngine.Random, FillEngine.Backtracking):
+            successes = []
+
+            def generate():
+                # Unseeded games draw from SystemRandom, every repeat gets
+                # its own seed so runs repeat the same games.
+                game = CrossWordGame(
+                    word_picker,
+                    num_words=num_words,
+                    max_pathes=100,
+                    threads=1,
+                    engine=engine,
+                    time_budget=10,
+                    seed=f"{self.seed}:{num_words}:{len(successes)}",
+                )
+                successes.append(game.grid is not None)
+
+            name = f"cross_word_game[{engine},{num_words}]"
+            self.record(
+                name,
+                generate,
+                repeats=3,
+                quiet=True,
+                num_words=num_words,
+                engine=engine,
+            )
+            self.results[name]["success_rate"] = sum(successes) / len(successes)
+
+    def to_json(self):
+        return {
+            "meta": {
+                "seed": self.seed,
+                "repeats": self.repeats,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+            },
+            "results": self.results,
+        }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """The generator prints progress, keep it out of timings and output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def compare(current: dict, baseline: dict, tolerance=0.25) -> List[str]:
+    """Returns the benchmarks whose median got slower than the baseline
+    by more than tolerance (a fraction)."""
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None or not reference["median"]:
+            continue
+        ratio = result["median"] / reference["median"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{name}: {reference['median'] * 1000:.3f} ms -> "
+                f"{result['median'] * 1000:.3f} ms (x{ratio:.2f})"
+            )
+    return regressions
@@ -1,4 +1,4 @@
-import sys
+import argparse
 
 from dictionary_builder.builders import english, portuguese
 
@@ -10,18 +10,25 @@ supported_languages = {
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        sys.exit(f"""Usage: {sys.argv[0]} [language-code]
-    
-    Supported languages:
-        * en (English)
-        * pt (Portugese)               
-""")
-    
-    language = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        prog="python -m dictionary_builder",
+        description="Builds data/dictionary_<language-code>.json, resuming "
+        "from data/dictionary_<language-code>.jsonl if a previous run stopped.",
+    )
+    parser.add_argument(
+        "language",
+        help="Supported languages: en (English), pt (Portugese)",
+    )
+    parser.add_argument("--batch-size", type=int, default=english.BATCH_SIZE)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Annotation processes."
+    )
+    args = parser.parse_args()
+
+    language = args.language
     try:
         dictionary_builder = supported_languages[language]
     except KeyError as exc:
         raise KeyError(f"Unsupported language: {language}") from exc
 
-    dictionary_builder.run()
+    dictionary_builder.run(batch_size=args.batch_size, workers=args.workers)
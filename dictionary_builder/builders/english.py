@@ -1,16 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
+import json
+import os
+import pathlib
 
-def run():
-    import json
-    import nltk
-    import stanza
-    from collections import Counter
-    import pathlib
+BATCH_SIZE = 256
 
+# Stanza pipeline of a worker process, see _init_worker.
+_nlp = None
 
-    data_dir = (pathlib.Path.cwd() / "data").resolve()
-    print("Data dir: ", data_dir)
 
+def count_words(data_dir):
+    """Counts lowercase words of Gutenberg, cached in gutenberg.json."""
+    output_filepath = (pathlib.Path(data_dir) / "gutenberg.json").resolve()
+    if output_filepath.exists():
+        print("Reusing word counts from", output_filepath)
+        with open(output_filepath, "r") as fp:
+            return json.load(fp)
+
+    import nltk
+    from collections import Counter
 
     dictionary = Counter()
     for file_ in nltk.corpus.gutenberg.fileids():
@@ -26,18 +35,45 @@ def run():
     for key, item in dictionary.items():
         if item > 3 and item not in stopwords:
             frequent_words[key] = item
-    
+
     print(len(frequent_words))
 
-    output_filepath = (pathlib.Path(data_dir) / "gutenberg.json").resolve() 
-    with open(output_filepath, "w") as fp:
+    tmp_filepath = output_filepath.with_suffix(".json.tmp")
+    with open(tmp_filepath, "w") as fp:
         json.dump(frequent_words, fp, indent=4)
+    os.replace(tmp_filepath, output_filepath)
+    return frequent_words
 
-    nlp = stanza.Pipeline('en')
 
+def load_checkpoint(jsonl_path):
+    """Returns the words already annotated in jsonl_path.
+
+    A line cut short by a crash is dropped from the file, so the next run
+    appends after the last complete entry.
+    """
+    done = set()
+    if not jsonl_path.exists():
+        return done
+    valid_bytes = 0
+    with open(jsonl_path, "rb") as fp:
+        for line in fp:
+            try:
+                done.add(json.loads(line)["word"])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+    with open(jsonl_path, "r+b") as fp:
+        fp.truncate(valid_bytes)
+    return done
+
+
+def annotate_batch(nlp, batch):
+    """Runs a batch of (word, freq) through stanza as bulk documents."""
+    import stanza
+
+    docs = nlp.bulk_process([stanza.Document([], text=key) for key, _ in batch])
     processed = []
-    for key, freq in tqdm(frequent_words.items()):
-        doc = nlp(key)
+    for (key, freq), doc in zip(batch, docs):
         for sentence in doc.sentences:
             for word in sentence.words:
                 obj = {
@@ -48,7 +84,85 @@ def run():
                     "freq": freq,
                 }
                 processed.append(obj)
+    return processed
+
+
+def _init_worker():
+    global _nlp
+    import stanza
+
+    _nlp = stanza.Pipeline('en')
+
+
+def _annotate_in_worker(batch):
+    return annotate_batch(_nlp, batch)
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def finalize(jsonl_path, json_path):
+    """Streams the annotated lines into the JSON array the other tools read."""
+    tmp_path = json_path.with_suffix(".json.tmp")
+    with open(jsonl_path, "r", encoding="utf-8") as src, open(
+        tmp_path, "w", encoding="utf-8"
+    ) as dst:
+        dst.write("[")
+        for idx, line in enumerate(src):
+            if idx:
+                dst.write(",\n")
+            dst.write(line.rstrip("\n"))
+        dst.write("]")
+    os.replace(tmp_path, json_path)
+
+
+def run(batch_size=BATCH_SIZE, workers=1):
+    data_dir = (pathlib.Path.cwd() / "data").resolve()
+    print("Data dir: ", data_dir)
+
+    frequent_words = count_words(data_dir)
+
+    jsonl_path = (pathlib.Path(data_dir) / "dictionary_en.jsonl").resolve()
+    output_filepath = (pathlib.Path(data_dir) / "dictionary_en.json").resolve()
+
+    done = load_checkpoint(jsonl_path)
+    pending = [(key, freq) for key, freq in frequent_words.items() if key not in done]
+    print(f"{len(done)} words already annotated, {len(pending)} to go.")
+
+    batches = list(iter_batches(pending, batch_size))
+    with open(jsonl_path, "a", encoding="utf-8") as fp, tqdm(
+        total=len(pending)
+    ) as bar:
+
+        def write(batch_size, processed):
+            for obj in processed:
+                fp.write(json.dumps(obj) + "\n")
+            # Every flushed batch is a checkpoint.
+            fp.flush()
+            bar.update(batch_size)
+
+        if workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker
+            ) as pool:
+                # map yields in submission order, so the file stays ordered.
+                for batch, processed in zip(
+                    batches, pool.map(_annotate_in_worker, batches)
+                ):
+                    write(len(batch), processed)
+        else:
+            import stanza
+
+            nlp = stanza.Pipeline('en')
+            for batch in batches:
+                write(len(batch), annotate_batch(nlp, batch))
 
-    output_filepath = (pathlib.Path(data_dir) / "dictionary_en.json").resolve() 
-    with open(output_filepath, "w", encoding="utf-8") as fp:
-        json.dump(processed, fp)
+    finalize(jsonl_path, output_filepath)
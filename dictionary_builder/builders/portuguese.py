@@ -1,5 +1,5 @@
 
-def run():
+def run(batch_size=None, workers=1):
     raise NotImplementedError("Old code, currently missing file 'br-utf8.txt'")
     stanza.download('pt')
     nlp = stanza.Pipeline('pt')
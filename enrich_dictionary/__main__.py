@@ -1,4 +1,4 @@
-import sys
+import argparse
 
 from enrich_dictionary.enrichers import english
 
@@ -9,15 +9,27 @@ supported_languages = {
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        sys.exit(f"""Usage: {sys.argv[0]} [language-code]
-    
-    Supported languages: {supported_languages.keys()}
-""")
-    language = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        prog="python -m enrich_dictionary",
+        description="Joins data/dictionary_<language-code> with data/hints.txt "
+        "into data/enriched_dictionary_<language-code>.",
+    )
+    parser.add_argument(
+        "language", help=f"Supported languages: {supported_languages.keys()}"
+    )
+    parser.add_argument(
+        "--format",
+        default="jsonl",
+        choices=english.FORMATS,
+        help="jsonl (default), a json array, or jsonl compiled to the binary "
+        "format the grid generator memory-maps.",
+    )
+    args = parser.parse_args()
+
+    language = args.language
     try:
         enricher = supported_languages[language]
     except KeyError as exc:
         raise KeyError(f"Unsupported language: {language}") from exc
 
-    enricher.run()
+    enricher.run(output_format=args.format)
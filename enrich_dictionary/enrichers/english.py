@@ -1,32 +1,163 @@
+from itertools import groupby
+from operator import itemgetter
 import json
+import os
 import pathlib
+import sqlite3
+import tempfile
+
+# Rows per executemany, bounds the memory used while loading.
+CHUNK_SIZE = 10000
+FORMATS = ("jsonl", "json", "bin")
 
-def run():
-    data_dir = (pathlib.Path.cwd() / "data").resolve()
-    input_dictionary_path = (pathlib.Path(data_dir) / "dictionary_en.json").resolve() 
-    hints_path = (pathlib.Path(data_dir) / "hints.txt").resolve()
-    output_path = (pathlib.Path(data_dir) / "enriched_dictionary_en.json").resolve()
-    
 
-    enriched = []
+def iter_dictionary(data_dir):
+    """Streams the entries of dictionary_en.jsonl, or of the dictionary_en.json
+    array when the builder's line-delimited file is gone."""
+    jsonl_path = pathlib.Path(data_dir) / "dictionary_en.jsonl"
+    if jsonl_path.exists():
+        with open(jsonl_path, "r", encoding="utf-8") as fp:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with open(pathlib.Path(data_dir) / "dictionary_en.json", "r", encoding="utf-8") as fp:
+        yield from iter_json_array(fp)
 
+
+def iter_json_array(fp, chunk_size=1 << 16):
+    """Yields the objects of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = fp.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The next object spans past the buffer, read more of it.
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                raise
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+
+def iter_hints(hints_path):
+    """Yields (word, hint) from "word=hint" lines, the hint may contain "="."""
     with open(hints_path, "r", encoding="utf-8") as fp:
-        hints = fp.readlines()
+        for line in fp:
+            word, sep, hint = line.partition("=")
+            hint = hint.strip()
+            if sep and word and hint:
+                yield word, hint
 
-    with open(input_dictionary_path, "r", encoding="utf-8") as fp:
-        en_dictionary = {word["word"]: word for word in json.load(fp)}
 
+def _insert_chunked(db, sql, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.executemany(sql, chunk)
+            chunk = []
+    if chunk:
+        db.executemany(sql, chunk)
 
-    for line in hints:
-        if "=" not in line:
-            continue
-        tmp = line.split("=")
-        word = tmp[0]
-        hint = tmp[1]
 
-        if word in en_dictionary:
-            enriched.append({**en_dictionary[word], "hint": [hint.strip("\n")]})
+def iter_enriched(dictionary_entries, hints, tmp_dir=None):
+    """Joins dictionary entries with every hint of their word.
+
+    Both sides are spilled to a temporary sqlite database, so memory stays
+    bounded whatever the size of the inputs. A word gets one entry, the last
+    one of the dictionary, whose hint list holds each distinct hint in file
+    order. Words without hints are left out. Entries keep the order of the
+    dictionary, which WordDictionary keeps as well when they carry no "freq"
+    (the shipped dictionary is in order of first appearance in the corpus).
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        db = sqlite3.connect(os.path.join(tmp, "enrich.sqlite"))
+        try:
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            db.execute(
+                "CREATE TABLE entries (word TEXT PRIMARY KEY, pos INTEGER, entry TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE hints (word TEXT, hint TEXT, UNIQUE (word, hint))"
+            )
+            # A repeated word keeps the position of its first entry.
+            _insert_chunked(
+                db,
+                "INSERT INTO entries VALUES (?, ?, ?)"
+                " ON CONFLICT (word) DO UPDATE SET entry = excluded.entry",
+                (
+                    (entry["word"], pos, json.dumps(entry))
+                    for pos, entry in enumerate(dictionary_entries)
+                ),
+            )
+            db.execute("CREATE INDEX entries_pos ON entries (pos)")
+            _insert_chunked(db, "INSERT OR IGNORE INTO hints VALUES (?, ?)", hints)
+            db.commit()
+
+            rows = db.execute(
+                "SELECT e.word, e.entry, h.hint FROM entries e"
+                " JOIN hints h ON h.word = e.word"
+                " ORDER BY e.pos, h.rowid"
+            )
+            for _, group in groupby(rows, key=itemgetter(0)):
+                group = list(group)
+                yield {**json.loads(group[0][1]), "hint": [row[2] for row in group]}
+        finally:
+            db.close()
+
+
+def write_jsonl(entries, path):
+    tmp_path = str(path) + ".tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        for entry in entries:
+            fp.write(json.dumps(entry) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def write_json(entries, path):
+    tmp_path = str(path) + ".tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        fp.write("[")
+        for entry in entries:
+            if count:
+                fp.write(",\n")
+            fp.write(json.dumps(entry))
+            count += 1
+        fp.write("]")
+    os.replace(tmp_path, path)
+    return count
+
+
+def run(output_format="jsonl"):
+    data_dir = (pathlib.Path.cwd() / "data").resolve()
+    hints_path = (pathlib.Path(data_dir) / "hints.txt").resolve()
+    output_root = (pathlib.Path(data_dir) / "enriched_dictionary_en").resolve()
 
+    entries = iter_enriched(iter_dictionary(data_dir), iter_hints(hints_path), data_dir)
+    if output_format == "json":
+        output_path = output_root.with_suffix(".json")
+        count = write_json(entries, output_path)
+    else:
+        output_path = output_root.with_suffix(".jsonl")
+        count = write_jsonl(entries, output_path)
+        if output_format == "bin":
+            from grid_generator.src.compiled_dictionary import compile_dictionary
 
-    with open(output_path, "w", encoding="utf-8") as fp:
-        json.dump(enriched, fp, indent=4)
+            output_path = compile_dictionary(output_path)
+    print(f"Wrote {count} entries to {output_path}")
@@ -1,24 +1,315 @@
+import argparse
+import os
 import sys
-from grid_generator.src.grid_generator import WordPicker, CrossWordGame
+import time
+from typing import Optional
+from grid_generator.src.grid_generator import (
+    WordPicker,
+    CrossWordGame,
+    FillEngine,
+    GenerationStrategy,
+    Difficulty,
+    WordConstraints,
+    known_words,
+    load_word_dictionary,
+)
+from grid_generator.src.cache import PuzzleCache
+from grid_generator.src.compatibility import (
+    build_compatibility,
+    compatibility_path_for,
+)
+from grid_generator.src.density import DensityObjective
+from grid_generator.src.telemetry import configure, sink_for, telemetry
 
 available_languages = {"en"}
+available_engines = {FillEngine.Random, FillEngine.Backtracking, FillEngine.Growth}
+# Candidate words of the picker, the compatibility matrix covers the same.
+MOST_FREQUENTS = 1000
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m grid_generator")
+    parser.add_argument("lang", help=f"Available languages: {available_languages}")
+    parser.add_argument("--num-words", type=int, default=6)
+    parser.add_argument("--max-pathes", type=int, default=100)
+    parser.add_argument(
+        "--engine", default=FillEngine.Random, choices=sorted(available_engines)
+    )
+    parser.add_argument(
+        "--strategy",
+        default=GenerationStrategy.Best,
+        choices=[GenerationStrategy.Best, GenerationStrategy.First],
+    )
+    parser.add_argument(
+        "--time-budget", type=float, default=None, help="Seconds per game."
+    )
+    parser.add_argument(
+        "--difficulty", default=None, choices=sorted(Difficulty.bands)
+    )
+    parser.add_argument(
+        "--count", type=int, default=None, help="Batch mode: number of puzzles."
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--out", default="puzzles.jsonl", help="Batch mode: JSONL output file."
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Batch mode: append to --out instead of overwriting it.",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--words",
+        type=lambda value: value.split(","),
+        default=None,
+        help="Comma separated word set to build the grid from.",
+    )
+    parser.add_argument(
+        "--cache-dir", default=None, help="Cache grids per word set on disk."
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile the dictionary to its binary form and exit.",
+    )
+    parser.add_argument(
+        "--build-compat",
+        action="store_true",
+        help="Build the word crossing compatibility matrix and exit, it is "
+        "then used to pick connected word sets.",
+    )
+    parser.add_argument(
+        "--dense",
+        action="store_true",
+        help="Rearrange words for more crossings and filled cells per grid.",
+    )
+    parser.add_argument(
+        "--max-width", type=int, default=None, help="Dense mode: grid width bound."
+    )
+    parser.add_argument(
+        "--max-height", type=int, default=None, help="Dense mode: grid height bound."
+    )
+    parser.add_argument(
+        "--one-per-lemma",
+        action="store_true",
+        help="No two words of a puzzle share a lemma (walk, walked).",
+    )
+    parser.add_argument(
+        "--pos",
+        type=lambda value: {
+            tag.upper(): int(count)
+            for tag, count in (item.split("=") for item in value.split(","))
+        },
+        default=None,
+        help="Words per part of speech, e.g. NOUN=3,VERB=2.",
+    )
+    parser.add_argument(
+        "--letters", default="", help="Letters the puzzle words must contain."
+    )
+    parser.add_argument(
+        "--feats",
+        type=lambda value: tuple(value.split(",")),
+        default=(),
+        help="Comma separated features every word has, e.g. Number=Sing.",
+    )
+    parser.add_argument(
+        "--exclude-feats",
+        type=lambda value: tuple(value.split(",")),
+        default=(),
+        help="Comma separated features no word has, e.g. Tense=Past.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve puzzles over HTTP, see grid_generator/src/server.py.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=None,
+        help="Serve mode: comma separated word counts to prefetch puzzles of, "
+        "at --difficulty. Defaults to --num-words.",
+    )
+    parser.add_argument(
+        "--buffer-size", type=int, default=8, help="Serve mode: puzzles per size."
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=5.0,
+        help="Serve mode: seconds to generate a puzzle that is not buffered.",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print generation progress."
+    )
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        help="Write generation metrics to a .jsonl or .prom (Prometheus) file.",
+    )
+    return parser.parse_args(argv)
+
+
+def objective_from(args) -> Optional[DensityObjective]:
+    if not (args.dense or args.max_width or args.max_height):
+        return None
+    return DensityObjective(max_width=args.max_width, max_height=args.max_height)
+
+
+def constraints_from(args) -> Optional[WordConstraints]:
+    if not (
+        args.one_per_lemma
+        or args.pos
+        or args.letters
+        or args.feats
+        or args.exclude_feats
+    ):
+        return None
+    return WordConstraints(
+        one_per_lemma=args.one_per_lemma,
+        upos=args.pos or {},
+        letters=args.letters.lower(),
+        feats=args.feats,
+        exclude_feats=args.exclude_feats,
+    )
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        sys.exit(f"""Usage: {sys.argv[0]} lang
 
-    Available languages: {available_languages}
-""")
+def run_batch(args, dictionary_path, compatibility=None):
+    from grid_generator.src.batch import generate_batch
+    from grid_generator.src.service import GeneratorService
 
-    lang = sys.argv[1]
+    t0 = time.perf_counter()
+    with GeneratorService(
+        dictionary_path,
+        workers=args.workers,
+        cache_dir=args.cache_dir,
+        stop_word_offset=0,
+        most_frequents=MOST_FREQUENTS,
+        compatibility=compatibility,
+        constraints=constraints_from(args),
+    ) as service:
+        words = None
+        if args.words:
+            try:
+                words = known_words(service.word_picker.word_dictionary, args.words)
+            except ValueError as error:
+                sys.exit(str(error))
+        with open(args.out, "a" if args.append else "w", encoding="utf-8") as fp:
+            written = generate_batch(
+                service,
+                args.count,
+                fp,
+                num_words=args.num_words,
+                max_pathes=args.max_pathes,
+                engine=args.engine,
+                seed=args.seed,
+                words=words,
+                objective=objective_from(args),
+                difficulty=args.difficulty,
+                time_budget=args.time_budget,
+                strategy=args.strategy,
+            )
+        utilization = service.utilization()
+    elapsed = time.perf_counter() - t0
+    print(f"Wrote {written}/{args.count} puzzles to {args.out} in {elapsed:.2f}s")
+    if utilization:
+        average = sum(utilization.values()) / len(utilization)
+        print(f"Worker utilization: {average:.0%} over {len(utilization)} workers")
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    configure(sink_for(args.metrics), verbose=args.verbose)
+
+    lang = args.lang
     assert lang in available_languages, f"{lang} not in {available_languages}"
+    dictionary_path = f"data/enriched_dictionary_{lang}.jsonl"
+    if not os.path.exists(dictionary_path):
+        dictionary_path = f"data/enriched_dictionary_{lang}.json"
+
+    if args.compile:
+        from grid_generator.src.compiled_dictionary import compile_dictionary
+
+        print(f"Compiled {compile_dictionary(dictionary_path)}")
+        sys.exit(0)
+
+    compatibility = compatibility_path_for(dictionary_path)
+    if args.build_compat:
+        print(
+            "Built",
+            build_compatibility(
+                load_word_dictionary(dictionary_path),
+                compatibility,
+                stop=MOST_FREQUENTS,
+            ),
+        )
+        sys.exit(0)
+    if not os.path.exists(compatibility):
+        compatibility = None
+
+    if args.serve:
+        import asyncio
+        from grid_generator.src.server import serve
+
+        try:
+            asyncio.run(
+                serve(
+                    dictionary_path,
+                    host=args.host,
+                    port=args.port,
+                    workers=args.workers,
+                    prefetch=[
+                        (size, args.difficulty)
+                        for size in args.sizes or [args.num_words]
+                    ],
+                    buffer_size=args.buffer_size,
+                    deadline=args.deadline,
+                    stop_word_offset=0,
+                    most_frequents=MOST_FREQUENTS,
+                    compatibility=compatibility,
+                    constraints=constraints_from(args),
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+        telemetry.flush()
+        sys.exit(0)
+
+    if args.count is not None:
+        run_batch(args, dictionary_path, compatibility)
+        telemetry.flush()
+        sys.exit(0)
 
     word_picker = WordPicker(
-        f"data/enriched_dictionary_{lang}.json",
+        dictionary_path,
         stop_word_offset=0,
-        most_frequents=1000,
+        most_frequents=MOST_FREQUENTS,
+        compatibility=compatibility,
+        constraints=constraints_from(args),
     )
-    game = CrossWordGame(word_picker, num_words=6, max_pathes=100, threads=1)
+    try:
+        game = CrossWordGame(
+            word_picker,
+            num_words=args.num_words,
+            max_pathes=args.max_pathes,
+            threads=1,
+            engine=args.engine,
+            time_budget=args.time_budget,
+            strategy=args.strategy,
+            seed=args.seed,
+            difficulty=args.difficulty,
+            words=args.words,
+            cache=PuzzleCache(args.cache_dir) if args.cache_dir else None,
+            objective=objective_from(args),
+        )
+    except ValueError as error:
+        sys.exit(str(error))
+    telemetry.flush()
+    if game.grid is None:
+        sys.exit("Could not generate a game.")
     print("Got game...")
     print("Answer:")
     print(game)
@@ -0,0 +1,61 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+import json
+import random
+
+from grid_generator.src.grid_generator import FillEngine, GenerationStrategy
+from grid_generator.src.service import GeneratorService
+
+
+def generate_batch(
+    service: GeneratorService,
+    count,
+    out_fp,
+    num_words=6,
+    max_pathes=100,
+    engine=FillEngine.Random,
+    seed=None,
+    max_in_flight=16,
+    words=None,
+    objective=None,
+    difficulty=None,
+    time_budget=None,
+    strategy=GenerationStrategy.Best,
+):
+    """Generates count puzzles, writing each one as a JSON line once done.
+
+    At most max_in_flight games are queued at a time, so memory stays flat
+    whatever count is. Puzzle i is generated with seed + i, from words when
+    given, made denser on objective when given, at difficulty when given.
+    time_budget and strategy apply to every puzzle, see CrossWordGame.
+    Returns the number of puzzles written.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    submitted = 0
+    written = 0
+    pending = set()
+    while submitted < count or pending:
+        while submitted < count and len(pending) < max_in_flight:
+            pending.add(
+                service.submit_puzzle(
+                    num_words=num_words,
+                    max_pathes=max_pathes,
+                    engine=engine,
+                    seed=seed + submitted,
+                    words=words,
+                    objective=objective,
+                    difficulty=difficulty,
+                    time_budget=time_budget,
+                    strategy=strategy,
+                )
+            )
+            submitted += 1
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            puzzle = future.result()
+            if puzzle is None:
+                continue
+            out_fp.write(json.dumps(puzzle, separators=(",", ":")) + "\n")
+            out_fp.flush()
+            written += 1
+    return written
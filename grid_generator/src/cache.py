@@ -0,0 +1,261 @@
+"""Content-addressed cache of generated grids and word pair links.
+
+Grids are keyed by the sorted word set and the generation parameters. A
+PuzzleCache keeps recently used grids in an in-memory LRU and, when given a
+directory, spills them to disk as small JSON files evicted least recently
+used first once the directory grows past its byte budget. Pair links (the
+letters two words can cross on) only live in memory, they are cheap to
+recompute but shared by every word set a word appears in.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import os
+import time
+
+from grid_generator.src.grid_generator import Grid, WordInGrid, WordOrientation
+
+
+# (char, index in the first word, index in the second word)
+PairLink = Tuple[str, int, int]
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.items: "OrderedDict[object, object]" = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self.items[key]
+        except KeyError:
+            return default
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class DiskCache:
+    """One file per key under directory, at most max_bytes in total.
+
+    Reads touch the file, so eviction removes the least recently used
+    entries. Writes are atomic, several processes may share a directory.
+    """
+
+    suffix = ".json"
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fp:
+                data = fp.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write(data)
+        try:
+            self.size -= os.path.getsize(path)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently used files until under max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+
+def grid_key(words: Iterable[str], **params) -> str:
+    """Hash of the sorted word set and the generation parameters."""
+    canonical = json.dumps(
+        {"words": sorted(words), **params}, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def grid_to_bytes(grid: Grid) -> bytes:
+    return json.dumps(
+        [
+            [pword.word, pword.x_start, pword.y_start, pword.orientation]
+            for pword in grid.placed_words
+        ],
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def grid_from_bytes(data: bytes) -> Grid:
+    words_in_grid = []
+    for word, x_start, y_start, orientation in json.loads(data):
+        horizontal = orientation == WordOrientation.Horizontal
+        words_in_grid.append(
+            WordInGrid(
+                x_start=x_start,
+                x_end=x_start + len(word) if horizontal else x_start,
+                y_start=y_start,
+                y_end=y_start if horizontal else y_start + len(word),
+                word=word,
+                orientation=orientation,
+            )
+        )
+    return Grid.from_words(words_in_grid)
+
+
+def compute_pair_links(word_a: str, word_b: str) -> Tuple[PairLink, ...]:
+    """Every (char, index_a, index_b) where word_a[index_a] == word_b[index_b],
+    ordered by index_a then index_b."""
+    positions: Dict[str, List[int]] = {}
+    for index_b, char in enumerate(word_b):
+        positions.setdefault(char, []).append(index_b)
+    return tuple(
+        (char, index_a, index_b)
+        for index_a, char in enumerate(word_a)
+        for index_b in positions.get(char, ())
+    )
+
+
+class PuzzleCache:
+    """Best grid found per word set, plus pair links per word pair.
+
+    The seed is not part of the key, a hit returns the smallest grid any
+    earlier run found for the same words and parameters. Word sets no grid
+    was found for are remembered too: once max_failures searches failed on
+    one, it is skipped right away for failure_ttl seconds after the last.
+    """
+
+    def __init__(
+        self,
+        directory=None,
+        max_grids=1024,
+        max_pairs=100000,
+        max_bytes=64 * 1024 * 1024,
+        max_failures=3,
+        failure_ttl=24 * 60 * 60,
+    ):
+        self.max_failures = max_failures
+        self.failure_ttl = failure_ttl
+        self.grids = LRUCache(max_grids)
+        self.pairs = LRUCache(max_pairs)
+        self.disk = DiskCache(directory, max_bytes) if directory else None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, key: str) -> Optional[bytes]:
+        data = self.grids.get(key)
+        if data is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                self.grids.put(key, data)
+        return data
+
+    def get_grid(self, words: Iterable[str], **params) -> Optional[Grid]:
+        data = self._load(grid_key(words, **params))
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Stored serialized, so callers never share a mutable Grid.
+        return grid_from_bytes(data)
+
+    def put_grid(self, words: Iterable[str], grid: Grid, **params):
+        """Stores grid unless a grid of smaller or equal area is cached."""
+        key = grid_key(words, **params)
+        cached = self._load(key)
+        if cached is not None and grid_from_bytes(cached).area <= grid.area:
+            return
+        data = grid_to_bytes(grid)
+        self.grids.put(key, data)
+        if self.disk is not None:
+            self.disk.put(key, data)
+
+    def _failures(self, key: str) -> int:
+        """Failed searches recorded under key and not expired yet."""
+        data = self._load(key)
+        if not data:
+            return 0
+        try:
+            count, last = json.loads(data)
+        except ValueError:
+            return 0
+        if time.time() - last > self.failure_ttl:
+            return 0
+        return count
+
+    def put_failure(self, words: Iterable[str], **params):
+        """Records that a search found no grid for the word set."""
+        key = grid_key(words, failed=True, **params)
+        data = json.dumps([self._failures(key) + 1, time.time()]).encode("utf-8")
+        self.grids.put(key, data)
+        if self.disk is not None:
+            self.disk.put(key, data)
+
+    def has_failed(self, words: Iterable[str], **params) -> bool:
+        failures = self._failures(grid_key(words, failed=True, **params))
+        return failures >= self.max_failures
+
+    def pair_links(self, word_a: str, word_b: str) -> Tuple[PairLink, ...]:
+        key = (word_a, word_b)
+        links = self.pairs.get(key)
+        if links is None:
+            links = compute_pair_links(word_a, word_b)
+            self.pairs.put(key, links)
+        return links
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "grids_in_memory": len(self.grids),
+            "pairs_in_memory": len(self.pairs),
+            "disk_bytes": self.disk.size if self.disk is not None else 0,
+        }
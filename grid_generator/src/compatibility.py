@@ -0,0 +1,213 @@
+"""Crossing compatibility of every word pair of a vocabulary, in CSR form.
+
+Built offline from a dictionary and memory-mapped at load time, in the
+section layout of compiled_dictionary. Rows are the vocabulary words, in
+word id order, and their entries are the crossings with the other words:
+
+    meta    JSON: word id range, length bounds and checksum of the vocabulary
+    ids     uint32, dictionary word id of every row, ascending
+    indptr  uint32, row r spans entries indptr[r] to indptr[r + 1]
+    cols    uint32, dictionary word id of the crossing word
+    pos_a   uint8, crossing position in the row word
+    pos_b   uint8, crossing position in the crossing word
+
+Entries of a row are sorted by (cols, pos_a, pos_b). The matrix grows with
+the square of the vocabulary, it is meant for picker candidate ranges of a
+few thousand words.
+"""
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import random
+
+from grid_generator.src.compiled_dictionary import (
+    CompiledDictionaryError,
+    read_sections,
+    write_sections,
+)
+from grid_generator.src.grid_generator import WordDictionary
+
+
+MAGIC = b"CWCOMP01"
+
+_SECTION_TYPES = {
+    "meta": None,
+    "ids": "I",
+    "indptr": "I",
+    "cols": "I",
+    "pos_a": "B",
+    "pos_b": "B",
+}
+
+
+def compatibility_path_for(dictionary_path) -> str:
+    root, _ = os.path.splitext(str(dictionary_path))
+    return root + ".compat"
+
+
+def _checksum(word_dictionary: WordDictionary, ids) -> str:
+    digest = hashlib.sha256()
+    for word_id in ids:
+        digest.update(word_dictionary.unique_words[word_id].encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def build_compatibility(
+    word_dictionary: WordDictionary,
+    out_path,
+    start=0,
+    stop=None,
+    min_length=4,
+    max_length=8,
+) -> str:
+    """Writes the crossings between all words with ids in [start, stop) and
+    a length in [min_length, max_length], returns out_path."""
+    stop = len(word_dictionary.unique_words) if stop is None else stop
+    stop = min(stop, len(word_dictionary.unique_words))
+    lengths = word_dictionary.lengths
+    ids = array(
+        "I",
+        [
+            word_id
+            for word_id in range(start, stop)
+            if min_length <= lengths[word_id] <= max_length
+        ],
+    )
+
+    occurrences = defaultdict(list)
+    for word_id in ids:
+        for position, char in enumerate(word_dictionary.unique_words[word_id]):
+            occurrences[char].append((word_id, position))
+
+    indptr = array("I", [0])
+    cols = array("I")
+    pos_a = array("B")
+    pos_b = array("B")
+    for a_id in ids:
+        row = [
+            (b_id, a_pos, b_pos)
+            for a_pos, char in enumerate(word_dictionary.unique_words[a_id])
+            for b_id, b_pos in occurrences[char]
+            if b_id != a_id
+        ]
+        row.sort()
+        for b_id, a_pos, b_pos in row:
+            cols.append(b_id)
+            pos_a.append(a_pos)
+            pos_b.append(b_pos)
+        indptr.append(len(cols))
+
+    meta = {
+        "start": start,
+        "stop": stop,
+        "min_length": min_length,
+        "max_length": max_length,
+        "checksum": _checksum(word_dictionary, ids),
+    }
+    sections = {
+        "meta": json.dumps(meta).encode("utf-8"),
+        "ids": ids,
+        "indptr": indptr,
+        "cols": cols,
+        "pos_a": pos_a,
+        "pos_b": pos_b,
+    }
+    write_sections(str(out_path), MAGIC, sections, _SECTION_TYPES)
+    return str(out_path)
+
+
+class CompatibilityMatrix:
+    """Memory-mapped compatibility matrix of word_dictionary's vocabulary.
+
+    Raises CompiledDictionaryError when the file was built from another
+    version of the dictionary.
+    """
+
+    def __init__(self, path, word_dictionary: WordDictionary):
+        self.path = str(path)
+        with open(path, "rb") as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        sections = read_sections(memoryview(self._mmap), MAGIC, _SECTION_TYPES)
+        self.meta = json.loads(bytes(sections["meta"]))
+        self.ids = sections["ids"]
+        self.indptr = sections["indptr"]
+        self.cols = sections["cols"]
+        self.pos_a = sections["pos_a"]
+        self.pos_b = sections["pos_b"]
+        self.word_dictionary = word_dictionary
+        out_of_range = len(self.ids) and self.ids[-1] >= len(
+            word_dictionary.unique_words
+        )
+        if out_of_range or _checksum(word_dictionary, self.ids) != self.meta["checksum"]:
+            raise CompiledDictionaryError(
+                f"{path} was built from another dictionary, rebuild it."
+            )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, word_id) -> Optional[int]:
+        """Row of word_id, None when it is outside the vocabulary."""
+        pos = bisect_left(self.ids, word_id)
+        if pos < len(self.ids) and self.ids[pos] == word_id:
+            return pos
+        return None
+
+    def row_range(self, word_id) -> range:
+        """Entry indices of word_id's crossings, empty outside the vocabulary."""
+        row = self.row(word_id)
+        if row is None:
+            return range(0)
+        return range(self.indptr[row], self.indptr[row + 1])
+
+    def neighbors(self, word_id) -> memoryview:
+        """Word ids crossing word_id, once per crossing, ascending."""
+        entries = self.row_range(word_id)
+        return self.cols[entries.start : entries.stop]
+
+    def pair_links(self, word_a: str, word_b: str) -> Tuple[Tuple[str, int, int], ...]:
+        """(char, index_a, index_b) crossings of two words, ordered by index_a
+        then index_b, the interface WordGraph expects from a link cache."""
+        try:
+            a_id = self.word_dictionary.word_id(word_a)
+            b_id = self.word_dictionary.word_id(word_b)
+        except KeyError:
+            a_id = b_id = None
+        if a_id is None or self.row(a_id) is None or self.row(b_id) is None:
+            from grid_generator.src.cache import compute_pair_links
+
+            return compute_pair_links(word_a, word_b)
+        entries = self.row_range(a_id)
+        k = bisect_left(self.cols, b_id, entries.start, entries.stop)
+        links = []
+        while k < entries.stop and self.cols[k] == b_id:
+            index_a = self.pos_a[k]
+            links.append((word_a[index_a], index_a, self.pos_b[k]))
+            k += 1
+        return tuple(links)
+
+    def sample_crossing(
+        self,
+        word_id,
+        rng: random.Random,
+        accept: Callable[[int], bool],
+        tries=32,
+    ) -> Optional[int]:
+        """Index of a crossing entry of word_id that accept(entry) allows,
+        None when there is none. Crossing words are drawn proportionally to
+        their number of crossings with word_id."""
+        entries = self.row_range(word_id)
+        if not entries:
+            return None
+        for _ in range(tries):
+            entry = rng.randrange(entries.start, entries.stop)
+            if accept(entry):
+                return entry
+        candidates = [entry for entry in entries if accept(entry)]
+        return rng.choice(candidates) if candidates else None
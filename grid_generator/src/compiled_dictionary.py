@@ -0,0 +1,328 @@
+"""Compact binary form of a WordDictionary, loaded through mmap.
+
+Layout, all integers little-endian:
+
+    magic (8 bytes) | section count (uint32)
+    per section: name (8 bytes) | offset (uint64) | size in bytes (uint64)
+    section payloads, each aligned on 8 bytes
+
+Array sections hold uint32 ("I") or uint8 ("B") items, text sections are
+ASCII/UTF-8 blobs addressed through a uint32 offsets section with one more
+item than there are entries.
+"""
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+from grid_generator.src.grid_generator import (
+    LetterPositionIndex,
+    WordDictionary,
+    WordEntry,
+    iter_dictionary_entries,
+)
+
+
+MAGIC = b"CWDICT02"
+_HEADER = struct.Struct("<8sI")
+_SECTION = struct.Struct("<8sQQ")
+_HINT_SEPARATOR = "\x1f"
+_NONE = "\x00"
+
+_SECTION_TYPES = {
+    "words": None,
+    "word_off": "I",
+    "sorted": "I",
+    "lengths": "B",
+    "freq": "I",
+    "upos": "B",
+    "upos_tab": None,
+    "lemmas": None,
+    "lem_off": "I",
+    "feats": None,
+    "feat_off": "I",
+    "hints": None,
+    "hint_off": "I",
+    "lemma_id": "I",
+    "feat_tab": None,
+    "fidx_off": "I",
+    "fidx_ids": "I",
+    "idx_keys": "I",
+    "idx_off": "I",
+    "idx_ids": "I",
+}
+
+
+class CompiledDictionaryError(Exception):
+    """Binary dictionary is missing, truncated or of an unknown version."""
+
+
+def compiled_path_for(json_path) -> str:
+    root, _ = os.path.splitext(str(json_path))
+    return root + ".bin"
+
+
+def is_compiled_up_to_date(json_path) -> bool:
+    """Whether the compiled artifact is newer than json_path and of the
+    current version."""
+    compiled_path = compiled_path_for(json_path)
+    if not os.path.exists(compiled_path) or os.path.getmtime(
+        compiled_path
+    ) < os.path.getmtime(json_path):
+        return False
+    with open(compiled_path, "rb") as fp:
+        return fp.read(len(MAGIC)) == MAGIC
+
+
+def _pack_index_key(key: Tuple[str, int, int]) -> int:
+    char, position, length = key
+    return (ord(char) << 16) | (position << 8) | length
+
+
+def _unpack_index_key(packed: int) -> Tuple[str, int, int]:
+    return chr(packed >> 16), (packed >> 8) & 0xFF, packed & 0xFF
+
+
+def _blob(texts: List[str]) -> Tuple[bytes, array]:
+    offsets = array("I", [0])
+    chunks = []
+    total = 0
+    for text in texts:
+        encoded = text.encode("utf-8")
+        chunks.append(encoded)
+        total += len(encoded)
+        offsets.append(total)
+    return b"".join(chunks), offsets
+
+
+def _as_le_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_dictionary(json_path, out_path=None) -> str:
+    """Compiles a JSON or JSON lines dictionary into the binary format,
+    returns its path."""
+    word_dictionary = WordDictionary(iter_dictionary_entries(json_path))
+    out_path = out_path or compiled_path_for(json_path)
+    write_sections(
+        out_path, MAGIC, dictionary_sections(word_dictionary), _SECTION_TYPES
+    )
+    return out_path
+
+
+def compiled_bytes(word_dictionary: WordDictionary) -> bytes:
+    """The compiled form of an already loaded dictionary, in memory."""
+    return pack_sections(MAGIC, dictionary_sections(word_dictionary), _SECTION_TYPES)
+
+
+def dictionary_sections(word_dictionary: WordDictionary) -> dict:
+    words = word_dictionary.unique_words
+    entries = [word_dictionary[word] for word in words]
+
+    sections = {}
+    sections["words"], sections["word_off"] = _blob(words)
+    sections["sorted"] = array(
+        "I", sorted(range(len(words)), key=words.__getitem__)
+    )
+    sections["lengths"] = array("B", [len(word) for word in words])
+    sections["freq"] = array("I", [entry.freq or 0 for entry in entries])
+    sections["upos"] = array("B", word_dictionary.upos_ids)
+    sections["upos_tab"] = json.dumps(word_dictionary.upos_table).encode("utf-8")
+    sections["lemmas"], sections["lem_off"] = _blob(
+        [_NONE if entry.lemma is None else entry.lemma for entry in entries]
+    )
+    sections["feats"], sections["feat_off"] = _blob(
+        [_NONE if entry.feats is None else entry.feats for entry in entries]
+    )
+    sections["hints"], sections["hint_off"] = _blob(
+        [
+            _HINT_SEPARATOR.join(entry.hint) if entry.hint else _NONE
+            for entry in entries
+        ]
+    )
+
+    sections["lemma_id"] = array("I", word_dictionary.lemma_ids)
+    feat_table = sorted(word_dictionary.feat_postings)
+    sections["feat_tab"] = json.dumps(feat_table).encode("utf-8")
+    sections["fidx_off"] = array("I", [0])
+    sections["fidx_ids"] = array("I")
+    for feat in feat_table:
+        sections["fidx_ids"].extend(word_dictionary.feat_postings[feat])
+        sections["fidx_off"].append(len(sections["fidx_ids"]))
+
+    postings = word_dictionary.letter_index.postings
+    keys = sorted(postings, key=_pack_index_key)
+    idx_ids = array("I")
+    idx_off = array("I", [0])
+    for key in keys:
+        idx_ids.extend(postings[key])
+        idx_off.append(len(idx_ids))
+    sections["idx_keys"] = array("I", [_pack_index_key(key) for key in keys])
+    sections["idx_off"] = idx_off
+    sections["idx_ids"] = idx_ids
+    return sections
+
+
+def write_sections(out_path, magic, sections, section_types):
+    """Writes sections (arrays or bytes) in the order of section_types."""
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(pack_sections(magic, sections, section_types))
+    os.replace(tmp_path, out_path)
+
+
+def pack_sections(magic, sections, section_types) -> bytes:
+    """Header, section table and sections (arrays or bytes) in the order
+    of section_types."""
+    payloads = []
+    for name in section_types:
+        payload = sections[name]
+        if isinstance(payload, array):
+            payload = _as_le_bytes(payload)
+        payloads.append((name, payload))
+
+    offset = _HEADER.size + _SECTION.size * len(payloads)
+    table = []
+    for name, payload in payloads:
+        offset += -offset % 8
+        table.append((name, offset, len(payload)))
+        offset += len(payload)
+
+    packed = bytearray(_HEADER.pack(magic, len(payloads)))
+    for name, section_offset, size in table:
+        packed += _SECTION.pack(name.encode("ascii"), section_offset, size)
+    for (name, section_offset, size), (_, payload) in zip(table, payloads):
+        packed += b"\0" * (section_offset - len(packed))
+        packed += payload
+    return bytes(packed)
+
+
+def read_sections(buffer: memoryview, magic, section_types) -> Dict[str, memoryview]:
+    """Section views of a file written by write_sections, array sections
+    are cast to their typecode."""
+    if len(buffer) < _HEADER.size:
+        raise CompiledDictionaryError("Truncated compiled file.")
+    file_magic, count = _HEADER.unpack_from(buffer, 0)
+    if file_magic != magic:
+        raise CompiledDictionaryError(f"Unknown compiled file: {file_magic!r}")
+    if sys.byteorder != "little":
+        raise CompiledDictionaryError("Compiled files are little-endian.")
+    sections = {}
+    for i in range(count):
+        raw_name, offset, size = _SECTION.unpack_from(
+            buffer, _HEADER.size + i * _SECTION.size
+        )
+        name = raw_name.rstrip(b"\0").decode("ascii")
+        view = buffer[offset : offset + size]
+        typecode = section_types.get(name)
+        sections[name] = view.cast(typecode) if typecode else view
+    missing = set(section_types) - set(sections)
+    if missing:
+        raise CompiledDictionaryError(f"Missing sections: {sorted(missing)}")
+    return sections
+
+
+class _WordList(Sequence):
+    """Lazily decoded view over the words section."""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        return str(self.blob[self.offsets[idx] : self.offsets[idx + 1]], "utf-8")
+
+
+class CompiledWordDictionary(WordDictionary):
+    """WordDictionary backed by a memory-mapped compiled artifact.
+
+    Nothing is parsed up front besides the section table and the letter
+    index keys, entries are decoded on access.
+    """
+
+    def __init__(self, path=None, buffer=None):
+        if buffer is None:
+            with open(path, "rb") as fp:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = self._mmap
+        self.buffer = memoryview(buffer)
+        self.sections = self._read_sections()
+
+        self.unique_words = _WordList(
+            self.sections["words"], self.sections["word_off"]
+        )
+        self.lengths = self.sections["lengths"]
+        self.freqs = self.sections["freq"]
+        self.upos_ids = self.sections["upos"]
+        self.upos_table: List[str] = json.loads(bytes(self.sections["upos_tab"]))
+        self.lemma_ids = self.sections["lemma_id"]
+        fidx_off = self.sections["fidx_off"]
+        fidx_ids = self.sections["fidx_ids"]
+        self.feat_postings = {
+            feat: fidx_ids[fidx_off[i] : fidx_off[i + 1]]
+            for i, feat in enumerate(json.loads(bytes(self.sections["feat_tab"])))
+        }
+
+        idx_keys = self.sections["idx_keys"]
+        idx_off = self.sections["idx_off"]
+        idx_ids = self.sections["idx_ids"]
+        self.letter_index = LetterPositionIndex.from_postings(
+            {
+                _unpack_index_key(packed): idx_ids[idx_off[i] : idx_off[i + 1]]
+                for i, packed in enumerate(idx_keys)
+            }
+        )
+
+    def _read_sections(self) -> Dict[str, memoryview]:
+        return read_sections(self.buffer, MAGIC, _SECTION_TYPES)
+
+    def _text(self, name, offsets_name, word_id) -> Optional[str]:
+        offsets = self.sections[offsets_name]
+        text = str(
+            self.sections[name][offsets[word_id] : offsets[word_id + 1]], "utf-8"
+        )
+        return None if text == _NONE else text
+
+    def word_id(self, word) -> int:
+        sorted_ids = self.sections["sorted"]
+        pos = bisect_left(
+            sorted_ids, word, key=lambda word_id: self.unique_words[word_id]
+        )
+        if pos < len(sorted_ids) and self.unique_words[sorted_ids[pos]] == word:
+            return sorted_ids[pos]
+        raise KeyError(word)
+
+    def entry(self, word_id) -> WordEntry:
+        hints = self._text("hints", "hint_off", word_id)
+        return WordEntry(
+            word=self.unique_words[word_id],
+            lemma=self._text("lemmas", "lem_off", word_id),
+            upos=self.upos_table[self.upos_ids[word_id]] or None,
+            feats=self._text("feats", "feat_off", word_id),
+            hint=[] if hints is None else hints.split(_HINT_SEPARATOR),
+            freq=self.freqs[word_id],
+        )
+
+    def to_unique_list(self):
+        return self.unique_words[:]
+
+    def __getitem__(self, key):
+        return self.entry(self.word_id(key))
+
+    def __len__(self):
+        return len(self.unique_words)
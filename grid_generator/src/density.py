@@ -0,0 +1,210 @@
+"""Density objectives and a local search that makes grids denser.
+
+Path search lays words out along a spanning tree of crossings, so every
+word crosses the others exactly len(words) - 1 times in total. densify()
+starts from such a grid and moves one word at a time to another legal
+placement across the grid, accepting placements that cross several words
+at once where letters coincide. Moves are accepted by simulated annealing
+on a DensityObjective: letters per cell, crossings per word and, as a hard
+bound, the grid dimensions.
+"""
+from dataclasses import dataclass, replace
+from typing import List, Optional
+import math
+import random
+
+from grid_generator.src.fill_engine import Board
+from grid_generator.src.grid_generator import (
+    Grid,
+    GridConflictingCell,
+    WordOrientation,
+)
+from grid_generator.src.telemetry import telemetry
+
+
+@dataclass
+class GridMetrics:
+    width: int
+    height: int
+    words: int
+    letters: int
+    crossings: int
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    @property
+    def fill_ratio(self) -> float:
+        """Letters per cell of the bounding box."""
+        return self.letters / self.area
+
+    @property
+    def crossings_per_word(self) -> float:
+        """Average number of words every word crosses."""
+        return 2 * self.crossings / self.words
+
+
+def grid_metrics(grid: Grid) -> GridMetrics:
+    return GridMetrics(
+        width=grid.x_size,
+        height=grid.y_size,
+        words=len(grid.placed_words),
+        letters=sum(1 for used in grid.occupancy if used),
+        crossings=grid.crossings,
+    )
+
+
+def board_metrics(board: Board) -> GridMetrics:
+    return GridMetrics(
+        width=board.max_x - board.min_x + 1,
+        height=board.max_y - board.min_y + 1,
+        words=len(board.placed),
+        letters=len(board.cells),
+        crossings=sum(
+            1 for orientations in board.orientations.values() if len(orientations) > 1
+        ),
+    )
+
+
+@dataclass
+class DensityObjective:
+    """Weighted sum of fill ratio and crossings per word, higher is better.
+
+    Grids wider than max_width or higher than max_height are penalized
+    per extra row or column, so the search moves them back within bounds,
+    and fits() rejects them. iterations is the number of moves densify()
+    tries per grid.
+    """
+
+    fill_ratio: float = 1.0
+    crossings_per_word: float = 0.5
+    max_width: Optional[int] = None
+    max_height: Optional[int] = None
+    iterations: int = 2000
+    overflow_penalty = 1.0
+
+    def overflow(self, metrics: GridMetrics) -> int:
+        overflow = 0
+        if self.max_width is not None:
+            overflow += max(0, metrics.width - self.max_width)
+        if self.max_height is not None:
+            overflow += max(0, metrics.height - self.max_height)
+        return overflow
+
+    def fits(self, metrics: GridMetrics) -> bool:
+        return self.overflow(metrics) == 0
+
+    def score(self, metrics: GridMetrics) -> float:
+        return (
+            self.fill_ratio * metrics.fill_ratio
+            + self.crossings_per_word * metrics.crossings_per_word
+            - self.overflow_penalty * self.overflow(metrics)
+        )
+
+
+def _to_grid(board: Board, order: List[str]) -> Optional[Grid]:
+    """Grid of the board with words inserted in order, None if that order
+    does not materialize.
+
+    Grid checks parallel words as every word is inserted, so a layout the
+    board built up word by word may be rejected in another order.
+    """
+    words_in_grid = [replace(board.placed[word]) for word in order]
+    try:
+        grid = Grid.from_words(words_in_grid)
+    except GridConflictingCell:
+        return None
+    return grid if grid.is_valid() else None
+
+
+def _is_connected(board: Board) -> bool:
+    """Whether every placed word is reachable from any other by crossings."""
+    words = list(board.placed)
+    if len(words) < 2:
+        return True
+    owners = {}
+    for word, pword in board.placed.items():
+        horizontal = pword.orientation == WordOrientation.Horizontal
+        for idx in range(len(word)):
+            cell = (
+                (pword.x_start + idx, pword.y_start)
+                if horizontal
+                else (pword.x_start, pword.y_start + idx)
+            )
+            owners.setdefault(cell, []).append(word)
+    neighbors = {word: set() for word in words}
+    for cell_words in owners.values():
+        if len(cell_words) > 1:
+            first, second = cell_words
+            neighbors[first].add(second)
+            neighbors[second].add(first)
+    seen = {words[0]}
+    stack = [words[0]]
+    while stack:
+        for neighbor in neighbors[stack.pop()]:
+            if neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+    return len(seen) == len(words)
+
+
+def densify(
+    grid: Grid,
+    objective: DensityObjective,
+    rng: Optional[random.Random] = None,
+    cancel=None,
+    start_temperature=0.05,
+    end_temperature=0.001,
+) -> Grid:
+    """Grid with the words of grid rearranged to score best on objective.
+
+    Every move lifts a random word and places it back across the words
+    left, at a random legal placement. A move that disconnects the grid is
+    never made. Worse layouts are accepted with the usual annealing
+    probability, the temperature decreasing geometrically from
+    start_temperature to end_temperature. Returns grid itself when no
+    layout scores better.
+    """
+    rng = rng or random.Random()
+    order = [pword.word for pword in grid.placed_words]
+    board = Board()
+    for pword in grid.placed_words:
+        board.place(pword.word, pword.x_start, pword.y_start, pword.orientation)
+    score = best_score = objective.score(board_metrics(board))
+    best_grid = grid
+    iterations = objective.iterations
+    cooling = (end_temperature / start_temperature) ** (1 / max(1, iterations))
+    temperature = start_temperature
+    accepted = 0
+    for _ in range(iterations):
+        if cancel is not None and cancel.is_cancelled():
+            break
+        temperature *= cooling
+        word = order[rng.randrange(len(order))]
+        old = board.placed[word]
+        old_placement = (old.x_start, old.y_start, old.orientation)
+        board.remove(word)
+        candidates = board.candidate_placements(word) if _is_connected(board) else []
+        if not candidates:
+            board.place(word, *old_placement)
+            continue
+        # Placements crossing several words are rare, favour them.
+        weights = [board.crossings(word, *candidate) ** 2 for candidate in candidates]
+        placement = rng.choices(candidates, weights)[0]
+        board.place(word, *placement)
+        new_score = objective.score(board_metrics(board))
+        delta = new_score - score
+        if delta >= 0 or rng.random() < math.exp(delta / temperature):
+            score = new_score
+            accepted += 1
+            if score > best_score:
+                candidate = _to_grid(board, order)
+                if candidate is not None:
+                    best_score, best_grid = score, candidate
+        else:
+            board.remove(word)
+            board.place(word, *old_placement)
+    telemetry.count("density.moves", iterations)
+    telemetry.count("density.accepted", accepted)
+    return best_grid
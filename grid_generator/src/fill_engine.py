@@ -0,0 +1,207 @@
+from typing import Dict, List, Optional, Tuple
+
+from grid_generator.src.grid_generator import Grid, WordInGrid, WordOrientation
+
+
+Cell = Tuple[int, int]
+Placement = Tuple[int, int, str]
+
+_STEP = {
+    WordOrientation.Horizontal: (1, 0),
+    WordOrientation.Vertical: (0, 1),
+}
+_PERPENDICULAR = {
+    WordOrientation.Horizontal: WordOrientation.Vertical,
+    WordOrientation.Vertical: WordOrientation.Horizontal,
+}
+
+
+class Board:
+    """Sparse, unbounded board used while placing words.
+
+    Cells map to their letter, and every cell remembers which orientations
+    already go through it, so a crossing can never be reused by a parallel
+    word.
+    """
+
+    def __init__(self):
+        self.cells: Dict[Cell, str] = {}
+        self.orientations: Dict[Cell, set] = {}
+        self.placed: Dict[str, WordInGrid] = {}
+        self.min_x = self.min_y = self.max_x = self.max_y = 0
+
+    def _cells_of(self, word: str, x: int, y: int, orientation: str):
+        dx, dy = _STEP[orientation]
+        for idx in range(len(word)):
+            yield (x + idx * dx, y + idx * dy)
+
+    def crossings(self, word: str, x: int, y: int, orientation: str) -> int:
+        """Returns the number of crossings, or -1 if the placement is illegal.
+
+        A placement is illegal when it overwrites a different letter, runs
+        along a word of the same orientation, touches a parallel word
+        side by side, or extends an existing word at either end.
+        """
+        dx, dy = _STEP[orientation]
+        before = (x - dx, y - dy)
+        after = (x + len(word) * dx, y + len(word) * dy)
+        if before in self.cells or after in self.cells:
+            return -1
+        crossings = 0
+        for idx, cell in enumerate(self._cells_of(word, x, y, orientation)):
+            letter = self.cells.get(cell)
+            if letter is not None:
+                if letter != word[idx] or orientation in self.orientations[cell]:
+                    return -1
+                crossings += 1
+                continue
+            side_a = (cell[0] - dy, cell[1] - dx)
+            side_b = (cell[0] + dy, cell[1] + dx)
+            if side_a in self.cells or side_b in self.cells:
+                return -1
+        return crossings
+
+    def place(self, word: str, x: int, y: int, orientation: str) -> WordInGrid:
+        dx, dy = _STEP[orientation]
+        for idx, cell in enumerate(self._cells_of(word, x, y, orientation)):
+            self.cells[cell] = word[idx]
+            self.orientations.setdefault(cell, set()).add(orientation)
+        word_in_grid = WordInGrid(
+            x_start=x,
+            x_end=x + len(word) * dx if dx else x,
+            y_start=y,
+            y_end=y + len(word) * dy if dy else y,
+            word=word,
+            orientation=orientation,
+        )
+        self.placed[word] = word_in_grid
+        self._update_bounds()
+        return word_in_grid
+
+    def remove(self, word: str):
+        word_in_grid = self.placed.pop(word)
+        for cell in self._cells_of(
+            word, word_in_grid.x_start, word_in_grid.y_start, word_in_grid.orientation
+        ):
+            self.orientations[cell].discard(word_in_grid.orientation)
+            if not self.orientations[cell]:
+                del self.orientations[cell]
+                del self.cells[cell]
+        self._update_bounds()
+
+    def _update_bounds(self):
+        if not self.cells:
+            self.min_x = self.min_y = self.max_x = self.max_y = 0
+            return
+        xs = [cell[0] for cell in self.cells]
+        ys = [cell[1] for cell in self.cells]
+        self.min_x, self.max_x = min(xs), max(xs)
+        self.min_y, self.max_y = min(ys), max(ys)
+
+    def area_with(self, word: str, x: int, y: int, orientation: str) -> int:
+        dx, dy = _STEP[orientation]
+        end_x = x + (len(word) - 1) * dx
+        end_y = y + (len(word) - 1) * dy
+        width = max(self.max_x, end_x) - min(self.min_x, x) + 1
+        height = max(self.max_y, end_y) - min(self.min_y, y) + 1
+        return width * height
+
+    def candidate_placements(self, word: str) -> List[Placement]:
+        """Legal placements of word crossing any already placed word."""
+        seen = set()
+        candidates = []
+        for placed in self.placed.values():
+            orientation = _PERPENDICULAR[placed.orientation]
+            pdx, pdy = _STEP[placed.orientation]
+            dx, dy = _STEP[orientation]
+            for j, placed_char in enumerate(placed.word):
+                cross_x = placed.x_start + j * pdx
+                cross_y = placed.y_start + j * pdy
+                for i, char in enumerate(word):
+                    if char != placed_char:
+                        continue
+                    placement = (cross_x - i * dx, cross_y - i * dy, orientation)
+                    if placement in seen:
+                        continue
+                    seen.add(placement)
+                    if self.crossings(word, *placement) > 0:
+                        candidates.append(placement)
+        return candidates
+
+    def to_grid(self) -> Grid:
+        """Materializes the placed words into a Grid of minimum size."""
+        return Grid.from_words(list(self.placed.values()))
+
+
+class BacktrackingFiller:
+    """Deterministic placement engine.
+
+    Words are placed one at a time on a Board. Illegal placements are pruned
+    up front through occupancy and adjacency checks, the word with the fewest
+    legal placements is always expanded first, and dead ends backtrack.
+    ``max_nodes`` bounds the number of placements tried per fill.
+    """
+
+    def __init__(self, max_nodes=20000):
+        self.max_nodes = max_nodes
+        self.nodes_visited = 0
+        self.cancel = None
+
+    def fill(
+        self, words, seed_orientation=WordOrientation.Horizontal, cancel=None
+    ) -> Optional[Grid]:
+        self.nodes_visited = 0
+        self.cancel = cancel
+        ordered = sorted(words, key=lambda word: (-len(word), word))
+        for seed_word in ordered:
+            board = Board()
+            board.place(seed_word, 0, 0, seed_orientation)
+            remaining = [word for word in ordered if word != seed_word]
+            if self._search(board, remaining):
+                return board.to_grid()
+            if self._exhausted():
+                break
+        return None
+
+    def _exhausted(self) -> bool:
+        if self.cancel is not None and self.cancel.is_cancelled():
+            return True
+        return self.nodes_visited >= self.max_nodes
+
+    def _search(self, board: Board, remaining: List[str]) -> bool:
+        if not remaining:
+            return True
+        if self._exhausted():
+            return False
+
+        # Most constrained word first: fewest legal placements.
+        best_word = None
+        best_candidates = None
+        for word in remaining:
+            candidates = board.candidate_placements(word)
+            if not candidates:
+                return False
+            if best_candidates is None or len(candidates) < len(best_candidates):
+                best_word = word
+                best_candidates = candidates
+                if len(candidates) == 1:
+                    break
+
+        # Prefer placements that keep the grid compact and interlocked.
+        best_candidates.sort(
+            key=lambda placement: (
+                board.area_with(best_word, *placement),
+                -board.crossings(best_word, *placement),
+                placement,
+            )
+        )
+        rest = [word for word in remaining if word != best_word]
+        for placement in best_candidates:
+            self.nodes_visited += 1
+            board.place(best_word, *placement)
+            if self._search(board, rest):
+                return True
+            board.remove(best_word)
+            if self._exhausted():
+                return False
+        return False
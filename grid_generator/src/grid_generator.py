@@ -1,15 +1,22 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Tuple, Dict
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Tuple, Dict, Iterable, Sequence, Set
 from itertools import product
-from operator import attrgetter
-from copy import deepcopy
-import re
+from operator import attrgetter, itemgetter
+from collections import defaultdict
+from array import array
+from bisect import bisect_left, bisect_right
 import json
+import pickle
 import random
 
 from datetime import datetime
 from unidecode import unidecode
 import multiprocessing as mp
+import queue
+import time
+import traceback
+
+from grid_generator.src.telemetry import telemetry
 
 
 @dataclass
@@ -19,6 +26,73 @@ class WordEntry:
     upos: str
     feats: List[str]
     hint: str
+    freq: int = 0
+
+class LetterPositionIndex:
+    """Inverted index of (letter, position, word length) -> word ids.
+
+    Word ids are positions in the ``words`` sequence the index was built from.
+    Postings are stored as sorted ``array("I")`` so they stay compact for
+    large vocabularies.
+    """
+
+    def __init__(self, words: Sequence[str]):
+        buckets = defaultdict(list)
+        for word_id, word in enumerate(words):
+            length = len(word)
+            for position, char in enumerate(word):
+                buckets[(char, position, length)].append(word_id)
+        self.postings: Dict[Tuple[str, int, int], Sequence[int]] = {
+            key: array("I", ids) for key, ids in buckets.items()
+        }
+        self._index_keys()
+
+    @classmethod
+    def from_postings(cls, postings: Dict[Tuple[str, int, int], Sequence[int]]):
+        """Wraps already built postings, e.g. memory-mapped arrays."""
+        index = cls.__new__(cls)
+        index.postings = postings
+        index._index_keys()
+        return index
+
+    def _index_keys(self):
+        self.keys_by_letter: Dict[str, List[Tuple[str, int, int]]] = defaultdict(list)
+        for key in sorted(self.postings):
+            self.keys_by_letter[key[0]].append(key)
+
+    def letters(self) -> List[str]:
+        return list(self.keys_by_letter.keys())
+
+    def lookup(
+        self,
+        char: str,
+        position: Optional[int] = None,
+        length: Optional[int] = None,
+        min_length: Optional[int] = None,
+        max_length: Optional[int] = None,
+    ) -> Set[int]:
+        """Word ids having ``char`` at ``position`` (any position if None)."""
+        result = set()
+        for key in self.keys_by_letter.get(char, []):
+            _, key_position, key_length = key
+            if position is not None and key_position != position:
+                continue
+            if length is not None and key_length != length:
+                continue
+            if min_length is not None and key_length < min_length:
+                continue
+            if max_length is not None and key_length > max_length:
+                continue
+            result.update(self.postings[key])
+        return result
+
+    def occurrences(self, char: str) -> Iterable[Tuple[int, int]]:
+        """Yields (word_id, position) for every occurrence of ``char``."""
+        for key in self.keys_by_letter.get(char, []):
+            position = key[1]
+            for word_id in self.postings[key]:
+                yield word_id, position
+
 
 class WordDictionary:
     def __init__(self, words_list):
@@ -28,53 +102,769 @@ class WordDictionary:
                 del word_dict["status_code"]
             word = WordEntry(**word_dict)
             word.word = unidecode(word.word)
+            word.freq = word.freq or 0
             self.words.append(word)
-        # self.words.sort(key=attrgetter("freq"), reverse=True)
+        # Stable sort: without frequencies the file order is kept.
+        self.words.sort(key=attrgetter("freq"), reverse=True)
         self.hashmap = {}
         for word in self.words:
-            self.hashmap[word.word] = word
+            self.hashmap.setdefault(word.word, word)
+        # Dict keys keep insertion order, so word ids are frequency ranks, or
+        # file order for dictionaries without frequencies.
+        self.unique_words: List[str] = list(self.hashmap.keys())
+        self.word_ids: Dict[str, int] = {
+            word: word_id for word_id, word in enumerate(self.unique_words)
+        }
+        self.lengths = array("B", [len(word) for word in self.unique_words])
+        self.freqs = array(
+            "I", [self.hashmap[word].freq for word in self.unique_words]
+        )
+        self.letter_index = LetterPositionIndex(self.unique_words)
+
+        entries = [self.hashmap[word] for word in self.unique_words]
+        self.upos_table: List[str] = sorted({entry.upos or "" for entry in entries})
+        upos_ids = {upos: idx for idx, upos in enumerate(self.upos_table)}
+        self.upos_ids = array("B", [upos_ids[entry.upos or ""] for entry in entries])
+        self.lemma_ids = lemma_groups([entry.lemma for entry in entries])
+        self.feat_postings = feature_postings([entry.feats for entry in entries])
 
     def to_unique_list(self):
-        s = set()
-        for word in self.words:
-            s.add(word.word)
-        return list(s)
-    
+        return list(self.unique_words)
+
+    def word_id(self, word) -> int:
+        return self.word_ids[word]
+
+    def words_with_letter(
+        self, char, position=None, length=None, min_length=None, max_length=None
+    ) -> Set[str]:
+        ids = self.letter_index.lookup(
+            char,
+            position=position,
+            length=length,
+            min_length=min_length,
+            max_length=max_length,
+        )
+        return {self.unique_words[word_id] for word_id in ids}
+
+    def select_ids(
+        self,
+        ids: range,
+        upos: Iterable[str] = (),
+        exclude_upos: Iterable[str] = (),
+        feats: Iterable[str] = (),
+        exclude_feats: Iterable[str] = (),
+    ) -> List[int]:
+        """Word ids of ids (a range of word ids), ascending, of a part of
+        speech of upos (any if empty) but not of exclude_upos, having every
+        feature of feats and none of exclude_feats ("Number=Plur")."""
+        selected = None
+        for feat in feats:
+            matching = set(_ids_in(self.feat_postings.get(feat, ()), ids))
+            selected = matching if selected is None else selected & matching
+        selected = ids if selected is None else sorted(selected)
+        excluded = set()
+        for feat in exclude_feats:
+            excluded.update(_ids_in(self.feat_postings.get(feat, ()), ids))
+        tags = range(len(self.upos_table))
+        if upos:
+            tags = {tag for tag, name in enumerate(self.upos_table) if name in upos}
+        tags = set(tags) - {
+            tag for tag, name in enumerate(self.upos_table) if name in exclude_upos
+        }
+        upos_ids = self.upos_ids
+        return [
+            word_id
+            for word_id in selected
+            if upos_ids[word_id] in tags and word_id not in excluded
+        ]
+
     def __getitem__(self, key):
         return self.hashmap[key]
 
+    def __len__(self):
+        return len(self.unique_words)
+
+
+def lemma_groups(lemmas: Sequence[Optional[str]]) -> array:
+    """Lemma group of every word id: the smallest word id, so the most
+    frequent word, sharing its lemma. A word without a lemma is its own."""
+    first = {}
+    return array(
+        "I",
+        [
+            word_id if lemma is None else first.setdefault(lemma, word_id)
+            for word_id, lemma in enumerate(lemmas)
+        ],
+    )
+
+
+def feature_postings(feats: Sequence[Optional[str]]) -> Dict[str, array]:
+    """Morphological feature ("Number=Plur") -> sorted word ids having it,
+    from the "Key=Value|Key=Value" feats of every word id."""
+    postings = defaultdict(lambda: array("I"))
+    for word_id, word_feats in enumerate(feats):
+        for feat in (word_feats or "").split("|"):
+            if feat:
+                postings[feat].append(word_id)
+    return dict(postings)
+
+
+def _ids_in(postings: Sequence[int], ids: range) -> Sequence[int]:
+    """Slice of sorted postings within a range of word ids."""
+    return postings[bisect_left(postings, ids.start) : bisect_left(postings, ids.stop)]
+
+
+def iter_dictionary_entries(filename) -> Iterable[dict]:
+    """Yields the entries of a JSON array or a JSON lines (``.jsonl``) file."""
+    with open(filename, "r", encoding="utf-8") as fp:
+        if str(filename).endswith(".jsonl"):
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(fp)
+
+
+def load_word_dictionary(filename) -> WordDictionary:
+    """Loads a JSON or JSON lines dictionary, or its compiled binary form.
+
+    A ``.bin`` filename is memory-mapped directly. For a JSON filename, the
+    compiled artifact next to it is preferred when it is up to date.
+    """
+    from grid_generator.src.compiled_dictionary import (
+        CompiledWordDictionary,
+        compiled_path_for,
+        is_compiled_up_to_date,
+    )
+
+    if str(filename).endswith(".bin"):
+        return CompiledWordDictionary(filename)
+    if is_compiled_up_to_date(filename):
+        return CompiledWordDictionary(compiled_path_for(filename))
+    return WordDictionary(iter_dictionary_entries(filename))
+
+
+class AliasTable:
+    """Vose alias table, samples an index proportionally to its weight in O(1)."""
+
+    def __init__(self, weights: Sequence[float]):
+        size = len(weights)
+        total = float(sum(weights))
+        self.size = size
+        self.prob = array("d", [1.0]) * size
+        self.alias = array("I", range(size))
+        scaled = [weight * size / total for weight in weights]
+        small = [idx for idx, value in enumerate(scaled) if value < 1.0]
+        large = [idx for idx, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+    def sample(self, rng: random.Random) -> int:
+        idx = int(rng.random() * self.size)
+        return idx if rng.random() < self.prob[idx] else self.alias[idx]
+
+
+class LengthBuckets:
+    """Word ids grouped by length, each group with an alias table over the
+    word frequencies (a word seen once or never weighs 1)."""
+
+    def __init__(self, word_ids: Iterable[int], lengths: Sequence[int], freqs):
+        by_length = defaultdict(list)
+        for word_id in word_ids:
+            by_length[lengths[word_id]].append(word_id)
+        self.ids: Dict[int, array] = {}
+        self.tables: Dict[int, AliasTable] = {}
+        self.totals: Dict[int, int] = {}
+        for length, ids in sorted(by_length.items()):
+            weights = [max(freqs[word_id], 1) for word_id in ids]
+            self.ids[length] = array("I", ids)
+            self.tables[length] = AliasTable(weights)
+            self.totals[length] = sum(weights)
+        self._ranges: Dict[Tuple[int, int], Tuple[List[int], List[int]]] = {}
+
+    def _range(self, min_length, max_length):
+        key = (min_length, max_length)
+        if key not in self._ranges:
+            lengths = [
+                length for length in self.ids if min_length <= length <= max_length
+            ]
+            cumulative = []
+            total = 0
+            for length in lengths:
+                total += self.totals[length]
+                cumulative.append(total)
+            self._ranges[key] = (lengths, cumulative)
+        return self._ranges[key]
+
+    def count(self, min_length, max_length) -> int:
+        lengths, _ = self._range(min_length, max_length)
+        return sum(len(self.ids[length]) for length in lengths)
+
+    def sample(self, rng: random.Random, min_length, max_length) -> Optional[int]:
+        """Weighted word id with min_length <= length <= max_length."""
+        lengths, cumulative = self._range(min_length, max_length)
+        if not lengths:
+            return None
+        pick = rng.random() * cumulative[-1]
+        length = lengths[min(bisect_right(cumulative, pick), len(lengths) - 1)]
+        return self.ids[length][self.tables[length].sample(rng)]
+
+
+class Difficulty:
+    """Frequency bands, as fractions of the frequency ranked word list."""
+
+    Easy = "easy"
+    Medium = "medium"
+    Hard = "hard"
+
+    bands = {
+        Easy: (0.0, 1 / 3),
+        Medium: (1 / 3, 2 / 3),
+        Hard: (2 / 3, 1.0),
+    }
+
+
+@dataclass
+class WordConstraints:
+    """Constraints on the word sets of a WordPicker, met while picking from
+    the dictionary indexes instead of by retrying word sets.
+
+    one_per_lemma: no two words share a lemma ("walk", "walked").
+    upos: number of words per part of speech, e.g. {"NOUN": 3, "VERB": 2},
+        the other words are of the parts of speech not listed.
+    letters: letters every one of which is in some word.
+    feats / exclude_feats: morphological features ("Number=Plur") every
+        word has / no word has.
+    """
+
+    one_per_lemma: bool = False
+    upos: Dict[str, int] = field(default_factory=dict)
+    letters: str = ""
+    feats: Tuple[str, ...] = ()
+    exclude_feats: Tuple[str, ...] = ()
+
+    def slots(self, num_words) -> List[Optional[str]]:
+        """Part of speech of every word to pick, None for the unlisted ones."""
+        slots = [tag for tag, count in sorted(self.upos.items()) for _ in range(count)]
+        if len(slots) > num_words:
+            raise ValueError(f"{len(slots)} parts of speech for {num_words} words.")
+        return slots + [None] * (num_words - len(slots))
+
+    def slot_of(self, upos: str) -> Optional[str]:
+        return upos if upos in self.upos else None
+
 
 class WordPicker:
-    def __init__(self, filename, most_frequents=20000, stop_word_offset=200):
-        with open(filename, "r") as fp:
-            self.word_dictionary: WordDictionary = WordDictionary(json.load(fp))
-        self.unique_words = self.word_dictionary.to_unique_list()
-        self.unique_words = self.unique_words[stop_word_offset:most_frequents]
+    def __init__(
+        self,
+        filename,
+        most_frequents=20000,
+        stop_word_offset=200,
+        seed=None,
+        difficulty: Optional[str] = None,
+        compatibility=None,
+        constraints: Optional[WordConstraints] = None,
+    ):
+        """compatibility is the path of a compatibility matrix built for
+        this dictionary (see compatibility.build_compatibility), with it
+        word sets are picked connected. constraints apply to every word set
+        picked, unless others are given to pick_n_random_words."""
+        self.word_dictionary: WordDictionary = load_word_dictionary(filename)
+        self.unique_words = self.word_dictionary.unique_words[
+            stop_word_offset:most_frequents
+        ]
+        # Word ids are frequency ranks, so the slice maps to a range.
+        self.candidate_range = range(
+            stop_word_offset, stop_word_offset + len(self.unique_words)
+        )
+        self.candidate_ids = set(self.candidate_range)
+        self.difficulty = difficulty
+        self._buckets: Dict[Optional[str], LengthBuckets] = {}
+        self.constraints = constraints
+        self._pools: Dict[tuple, Tuple[LengthBuckets, Set[int]]] = {}
+        self.random = random.Random(seed)
         self.picked_words = set()
+        self.picked_order: List[str] = []
+        self.picked_links: List[Tuple[str, int, str, int]] = []
+        self.compatibility = None
+        if compatibility is not None:
+            from grid_generator.src.compatibility import CompatibilityMatrix
+
+            self.compatibility = CompatibilityMatrix(
+                compatibility, self.word_dictionary
+            )
+
+    def __getstate__(self):
+        # Pickled for spawned workers: the dictionary is published once to
+        # shared memory and workers map it, instead of each unpickling a copy.
+        from grid_generator.src.shared import publish_dictionary
+
+        if getattr(self, "_shared_dictionary", None) is None:
+            self._shared_dictionary = publish_dictionary(self.word_dictionary)
+        state = self.__dict__.copy()
+        del state["_shared_dictionary"]
+        state["word_dictionary"] = self._shared_dictionary[1]
+        state["unique_words"] = None
+        state["candidate_ids"] = None
+        state["_buckets"] = {}
+        state["_pools"] = {}
+        if self.compatibility is not None:
+            state["compatibility"] = self.compatibility.path
+        return state
+
+    def __setstate__(self, state):
+        from grid_generator.src.shared import attach_dictionary
+
+        self.__dict__.update(state)
+        self.word_dictionary = attach_dictionary(state["word_dictionary"])
+        self.unique_words = self.word_dictionary.unique_words[
+            self.candidate_range.start : self.candidate_range.stop
+        ]
+        self.candidate_ids = set(self.candidate_range)
+        if self.compatibility is not None:
+            from grid_generator.src.compatibility import CompatibilityMatrix
+
+            self.compatibility = CompatibilityMatrix(
+                self.compatibility, self.word_dictionary
+            )
 
-    def pick_n_random_words(self, num_words, max_length=10, min_length=4):
-        """Reset picked words and pick n words."""
+    def band(self, difficulty: Optional[str] = None) -> range:
+        """Word ids of the candidate words in a difficulty band."""
+        ids = self.candidate_range
+        if difficulty is not None:
+            low, high = Difficulty.bands[difficulty]
+            ids = ids[int(low * len(ids)) : int(high * len(ids))]
+        return ids
+
+    def buckets(self, difficulty: Optional[str] = None) -> LengthBuckets:
+        """Length buckets of the candidate words in a difficulty band."""
+        if difficulty not in self._buckets:
+            self._buckets[difficulty] = LengthBuckets(
+                self.band(difficulty),
+                self.word_dictionary.lengths,
+                self.word_dictionary.freqs,
+            )
+        return self._buckets[difficulty]
+
+    def pool(
+        self,
+        slot: Optional[str],
+        constraints: WordConstraints,
+        difficulty: Optional[str] = None,
+    ) -> Tuple[LengthBuckets, Set[int]]:
+        """Length buckets and word ids of the candidate words in a difficulty
+        band that may fill a slot of constraints (see WordConstraints.slots)."""
+        listed = frozenset(constraints.upos) if slot is None else None
+        key = (
+            difficulty,
+            slot,
+            listed,
+            tuple(constraints.feats),
+            tuple(constraints.exclude_feats),
+        )
+        if key not in self._pools:
+            ids = self.word_dictionary.select_ids(
+                self.band(difficulty),
+                upos=() if slot is None else (slot,),
+                exclude_upos=listed or (),
+                feats=constraints.feats,
+                exclude_feats=constraints.exclude_feats,
+            )
+            buckets = LengthBuckets(
+                ids, self.word_dictionary.lengths, self.word_dictionary.freqs
+            )
+            self._pools[key] = (buckets, set(ids))
+        return self._pools[key]
+
+    def check_pickable(
+        self,
+        num_words,
+        max_length=10,
+        min_length=4,
+        difficulty=None,
+        constraints: Optional[WordConstraints] = None,
+    ):
+        """Raises ValueError when the difficulty band has fewer than
+        num_words words of the length range, or too few meeting constraints
+        (else the picker's), so no pick can succeed."""
+        difficulty = difficulty or self.difficulty
+        available = self.buckets(difficulty).count(min_length, max_length)
+        if available < num_words:
+            raise ValueError(
+                f"Only {available} words of length {min_length}-{max_length} "
+                f"to pick {num_words} words from."
+            )
+        constraints = constraints or self.constraints
+        if constraints is None:
+            return
+        lengths = self.word_dictionary.lengths
+        lemma_ids = self.word_dictionary.lemma_ids
+        slots = constraints.slots(num_words)
+        candidates = set()
+        for slot in dict.fromkeys(slots):
+            _, ids = self.pool(slot, constraints, difficulty)
+            ids = {
+                word_id
+                for word_id in ids
+                if min_length <= lengths[word_id] <= max_length
+            }
+            candidates |= ids
+            if constraints.one_per_lemma:
+                available = len({lemma_ids[word_id] for word_id in ids})
+            else:
+                available = len(ids)
+            if available < slots.count(slot):
+                raise ValueError(
+                    f"Only {available} words of length {min_length}-{max_length} "
+                    f"{'of ' + slot if slot else 'of other parts of speech'} meet "
+                    f"the constraints, {slots.count(slot)} needed."
+                )
+        for letter in constraints.letters:
+            with_letter = self.word_dictionary.letter_index.lookup(
+                letter, min_length=min_length, max_length=max_length
+            )
+            if not with_letter & candidates:
+                raise ValueError(
+                    f"No word of length {min_length}-{max_length} with "
+                    f"{letter!r} meets the constraints."
+                )
+
+    def _pick(self, word):
+        self.picked_words.add(word)
+        self.picked_order.append(word)
+
+    def pick_n_random_words(
+        self,
+        num_words,
+        max_length=10,
+        min_length=4,
+        rng: random.Random = None,
+        difficulty: Optional[str] = None,
+        constraints: Optional[WordConstraints] = None,
+    ) -> List[str]:
+        """Reset picked words and pick n words, in pick order.
+
+        Randomness comes from rng when given, else from the picker's own
+        stream (seeded by its seed argument). With a compatibility matrix
+        the words are picked connected, see pick_connected_words. Without,
+        word sets meeting constraints (else the picker's) are picked by
+        pick_constrained_words, which connected picking falls back to when
+        it cannot meet them.
+        """
+        constraints = constraints or self.constraints
+        if self.compatibility is not None:
+            try:
+                return self.pick_connected_words(
+                    num_words,
+                    max_length=max_length,
+                    min_length=min_length,
+                    rng=rng,
+                    difficulty=difficulty,
+                    constraints=constraints,
+                )
+            except ValueError:
+                if constraints is None:
+                    raise
+                telemetry.count("picker.unconnected_fallbacks")
+        if constraints is not None:
+            return self.pick_constrained_words(
+                num_words,
+                constraints,
+                max_length=max_length,
+                min_length=min_length,
+                rng=rng,
+                difficulty=difficulty,
+            )
         self.picked_words = set()
+        self.picked_order = []
+        self.picked_links = []
         while len(self.picked_words) < num_words:
-            self.pick_random_unique(max_length=max_length, min_length=min_length)
-        return self.picked_words
-
-    def pick_random_unique(self, max_length=10, min_length=4):
-        picked = self.unique_words[0]
-        while (
-            picked in self.picked_words
-            or len(picked) > max_length
-            or len(picked) < min_length
-        ):
-            rand_int = random.randint(0, len(self.unique_words) - 1)
-            picked = self.unique_words[rand_int]
-        self.picked_words.add(picked)
+            picked = self.pick_random_unique(
+                max_length=max_length,
+                min_length=min_length,
+                rng=rng,
+                difficulty=difficulty,
+            )
+            if picked is None:
+                raise ValueError(
+                    f"Not enough words of length {min_length}-{max_length} "
+                    f"to pick {num_words}."
+                )
+        return list(self.picked_order)
+
+    def pick_constrained_words(
+        self,
+        num_words,
+        constraints: WordConstraints,
+        max_length=10,
+        min_length=4,
+        rng: random.Random = None,
+        difficulty: Optional[str] = None,
+    ) -> List[str]:
+        """Reset picked words and pick n words meeting constraints.
+
+        Every word is drawn from the pool of its part of speech slot, already
+        filtered on features (see pool). Words for the required letters are
+        picked first, uniformly among the pool words holding a missing
+        letter in the letter index, the other slots are frequency weighted
+        picks. Words sharing the lemma of a picked word are excluded like
+        picked words. Raises ValueError when the pools run out.
+        """
+        rng = rng or self.random
+        difficulty = difficulty or self.difficulty
+        unique_words = self.word_dictionary.unique_words
+        lemma_ids = self.word_dictionary.lemma_ids
+        self.picked_words = set()
+        self.picked_order = []
+        self.picked_links = []
+        picked_lemmas = set()
+
+        def taken(word_id):
+            return unique_words[word_id] in self.picked_words or (
+                constraints.one_per_lemma and lemma_ids[word_id] in picked_lemmas
+            )
+
+        slots = constraints.slots(num_words)
+        rng.shuffle(slots)
+        for letter in constraints.letters:
+            if any(letter in word for word in self.picked_order):
+                continue
+            with_letter = self.word_dictionary.letter_index.lookup(
+                letter, min_length=min_length, max_length=max_length
+            )
+            for slot in dict.fromkeys(slots):
+                _, pool_ids = self.pool(slot, constraints, difficulty)
+                candidates = sorted(
+                    word_id for word_id in with_letter & pool_ids if not taken(word_id)
+                )
+                if candidates:
+                    word_id = rng.choice(candidates)
+                    slots.remove(slot)
+                    break
+            else:
+                raise ValueError(
+                    f"No word of length {min_length}-{max_length} with "
+                    f"{letter!r} left to meet the constraints."
+                )
+            self._pick(unique_words[word_id])
+            picked_lemmas.add(lemma_ids[word_id])
+        for slot in slots:
+            buckets, _ = self.pool(slot, constraints, difficulty)
+            word_id = self._draw(buckets, rng, min_length, max_length, taken)
+            if word_id is None:
+                raise ValueError(
+                    f"Not enough words of length {min_length}-{max_length} "
+                    f"meeting the constraints to pick {num_words}."
+                )
+            self._pick(unique_words[word_id])
+            picked_lemmas.add(lemma_ids[word_id])
+        return list(self.picked_order)
+
+    def pick_connected_words(
+        self,
+        num_words,
+        max_length=10,
+        min_length=4,
+        rng: random.Random = None,
+        difficulty: Optional[str] = None,
+        constraints: Optional[WordConstraints] = None,
+    ) -> List[str]:
+        """Reset picked words and pick n words that can be laid out together.
+
+        The first word is a frequency weighted pick. Every next word crosses
+        an already picked word, it is drawn from the compatibility matrix
+        and kept only if it fits the layout of the words picked so far. The
+        crossings used are kept in picked_links, as
+        (anchor word, index in anchor, word, index in word).
+
+        With constraints, words are only accepted from the pools of the part
+        of speech slots left (see pool) and from lemmas not picked yet. Once
+        there are no more words left to pick than missing required letters,
+        every word must hold one of them.
+        """
+        from grid_generator.src.fill_engine import Board
+
+        rng = rng or self.random
+        matrix = self.compatibility
+        band = self.band(difficulty or self.difficulty)
+        lengths = self.word_dictionary.lengths
+        unique_words = self.word_dictionary.unique_words
+        picked_ids: List[int] = []
+        self.picked_links = []
+        board = Board()
+
+        buckets = self.buckets(difficulty or self.difficulty)
+        fits = None
+        if constraints is not None:
+            difficulty = difficulty or self.difficulty
+            upos_table = self.word_dictionary.upos_table
+            upos_ids = self.word_dictionary.upos_ids
+            lemma_ids = self.word_dictionary.lemma_ids
+            slots = constraints.slots(num_words)
+            rng.shuffle(slots)
+            picked_lemmas = set()
+            missing = dict.fromkeys(constraints.letters)
+
+            def slot_for(word_id) -> Optional[str]:
+                return constraints.slot_of(upos_table[upos_ids[word_id]])
+
+            def fits(word_id):
+                slot = slot_for(word_id)
+                if slot not in slots or (
+                    constraints.one_per_lemma and lemma_ids[word_id] in picked_lemmas
+                ):
+                    return False
+                if word_id not in self.pool(slot, constraints, difficulty)[1]:
+                    return False
+                word = unique_words[word_id]
+                return len(missing) < len(slots) or any(
+                    letter in word for letter in missing
+                )
+
+            def picked(word_id):
+                slots.remove(slot_for(word_id))
+                picked_lemmas.add(lemma_ids[word_id])
+                for letter in set(unique_words[word_id]):
+                    missing.pop(letter, None)
+
+            buckets = self.pool(slots[0], constraints, difficulty)[0]
+
+        for _ in range(32):
+            word_id = buckets.sample(rng, min_length, max_length)
+            if (
+                word_id is not None
+                and matrix.row(word_id) is not None
+                and (fits is None or fits(word_id))
+            ):
+                if fits is not None:
+                    picked(word_id)
+                picked_ids.append(word_id)
+                board.place(unique_words[word_id], 0, 0, WordOrientation.Horizontal)
+                break
+
+        def placement(anchor: WordInGrid, entry):
+            index_a, index_b = matrix.pos_a[entry], matrix.pos_b[entry]
+            if anchor.orientation == WordOrientation.Horizontal:
+                x, y = anchor.x_start + index_a, anchor.y_start - index_b
+                return x, y, WordOrientation.Vertical
+            x, y = anchor.x_start - index_b, anchor.y_start + index_a
+            return x, y, WordOrientation.Horizontal
+
+        while picked_ids and len(picked_ids) < num_words:
+            anchors = list(picked_ids)
+            rng.shuffle(anchors)
+            for anchor_id in anchors:
+                anchor = board.placed[unique_words[anchor_id]]
+
+                def accept(entry):
+                    word_id = matrix.cols[entry]
+                    if (
+                        word_id not in band
+                        or not min_length <= lengths[word_id] <= max_length
+                        or word_id in picked_ids
+                        or (fits is not None and not fits(word_id))
+                    ):
+                        return False
+                    word = unique_words[word_id]
+                    return board.crossings(word, *placement(anchor, entry)) >= 0
+
+                entry = matrix.sample_crossing(anchor_id, rng, accept)
+                if entry is not None:
+                    word_id = matrix.cols[entry]
+                    word = unique_words[word_id]
+                    if fits is not None:
+                        picked(word_id)
+                    picked_ids.append(word_id)
+                    board.place(word, *placement(anchor, entry))
+                    self.picked_links.append(
+                        (anchor.word, matrix.pos_a[entry], word, matrix.pos_b[entry])
+                    )
+                    break
+            else:
+                break
+        if len(picked_ids) < num_words:
+            raise ValueError(
+                f"Not enough connected words of length {min_length}-{max_length} "
+                f"to pick {num_words}."
+            )
+        if constraints is not None and missing:
+            raise ValueError(f"No connected words with {''.join(missing)!r}.")
+        self.picked_order = [unique_words[word_id] for word_id in picked_ids]
+        self.picked_words = set(self.picked_order)
+        return list(self.picked_order)
+
+    def pick_random_unique(
+        self, max_length=10, min_length=4, rng=None, difficulty=None
+    ) -> Optional[str]:
+        """Frequency weighted pick among words not picked yet.
+
+        Samples are drawn from the length buckets in constant time, only
+        already picked words are redrawn. Returns None once every word of
+        that length range has been picked.
+        """
+        rng = rng or self.random
+        unique_words = self.word_dictionary.unique_words
+        word_id = self._draw(
+            self.buckets(difficulty or self.difficulty),
+            rng,
+            min_length,
+            max_length,
+            lambda word_id: unique_words[word_id] in self.picked_words,
+        )
+        if word_id is None:
+            return None
+        picked = unique_words[word_id]
+        self._pick(picked)
         return picked
 
-    def pick_word_with_character(self, char, max_length=10):
-        picked = self.pick_random_unique(max_length)
-        while char not in picked:
-            picked = self.pick_random_unique(max_length)
+    @staticmethod
+    def _draw(
+        buckets: LengthBuckets, rng, min_length, max_length, taken
+    ) -> Optional[int]:
+        """Frequency weighted word id of buckets that is not taken(word_id),
+        None when every word of the length range is."""
+        # Taken words are rare next to the bucket sizes, a few redraws are
+        # enough unless the range is nearly exhausted.
+        for _ in range(32):
+            word_id = buckets.sample(rng, min_length, max_length)
+            if word_id is None:
+                return None
+            if not taken(word_id):
+                return word_id
+            telemetry.count("picker.redraws")
+        telemetry.count("picker.exact_fallbacks")
+        remaining = [
+            word_id
+            for length in range(min_length, max_length + 1)
+            for word_id in buckets.ids.get(length, [])
+            if not taken(word_id)
+        ]
+        if not remaining:
+            return None
+        return rng.choice(remaining)
+
+    def pick_word_with_character(
+        self, char, max_length=10, min_length=4, position=None, rng=None
+    ):
+        """Pick an unpicked word containing char, looked up in the letter index."""
+        rng = rng or self.random
+        ids = self.word_dictionary.letter_index.lookup(
+            char, position=position, min_length=min_length, max_length=max_length
+        )
+        ids &= self.candidate_ids
+        unique_words = self.word_dictionary.unique_words
+        candidates = sorted(
+            word_id for word_id in ids if unique_words[word_id] not in self.picked_words
+        )
+        if not candidates:
+            return None
+        picked = unique_words[rng.choice(candidates)]
+        self._pick(picked)
         return picked
 
 
@@ -100,17 +890,77 @@ class GridConflictingCell(Exception):
 
 
 class Grid:
+    """Grid backed by a flat bytearray of x_size * y_size cells.
+
+    Cells are addressed by the packed integer key ``y * x_size + x`` and
+    hold the ASCII code of their letter, or EMPTY. A parallel bytearray
+    keeps the orientations of the words going through every cell, so the
+    crossing count of a cell is the number of bits set.
+
+    Words are validated as they are inserted: a placement raises
+    GridConflictingCell as soon as it overwrites a different letter, runs
+    along a word of the same orientation, touches a parallel word side by
+    side or extends another word at either end.
+    """
+
+    EMPTY = ord(" ")
+    HORIZONTAL = 1
+    VERTICAL = 2
+
     def __init__(self, x_size=20, y_size=20):
         self.x_size = x_size
         self.y_size = y_size
-        self.grid = []
+        self.cells = bytearray([self.EMPTY]) * (x_size * y_size)
+        self.occupancy = bytearray(x_size * y_size)
         self.placed_words: List[WordInGrid] = []
-        for y in range(y_size):
-            self.grid.append([])
-            for _ in range(x_size):
-                self.grid[y].append(" ")
+        self.crossings = 0
+
+    @classmethod
+    def from_words(cls, words_in_grid: List[WordInGrid]):
+        """Builds a grid of minimum size holding words_in_grid.
+
+        Word coordinates may be negative, they are shifted in place so the
+        bounding box starts at (0, 0).
+        """
+        min_x, min_y, max_x, max_y = cls.bounding_box(words_in_grid)
+        grid = cls(x_size=max_x - min_x, y_size=max_y - min_y)
+        for word_in_grid in words_in_grid:
+            word_in_grid.x_start -= min_x
+            word_in_grid.x_end -= min_x
+            word_in_grid.y_start -= min_y
+            word_in_grid.y_end -= min_y
+            grid.insert_word(word_in_grid)
+        return grid
+
+    @staticmethod
+    def bounding_box(words_in_grid: List[WordInGrid]) -> Tuple[int, int, int, int]:
+        """Returns (min_x, min_y, max_x, max_y), max values being exclusive."""
+        min_x = min(pword.x_start for pword in words_in_grid)
+        min_y = min(pword.y_start for pword in words_in_grid)
+        max_x = max(
+            pword.x_end
+            if pword.orientation == WordOrientation.Horizontal
+            else pword.x_start + 1
+            for pword in words_in_grid
+        )
+        max_y = max(
+            pword.y_start + 1
+            if pword.orientation == WordOrientation.Horizontal
+            else pword.y_end
+            for pword in words_in_grid
+        )
+        return min_x, min_y, max_x, max_y
+
+    def _key(self, x, y) -> int:
+        if not (0 <= x < self.x_size and 0 <= y < self.y_size):
+            raise GridConflictingCell(f"Cell outside grid: ({x},{y})")
+        return y * self.x_size + x
 
-        self.used_pos = set()
+    def get(self, x, y) -> int:
+        """Cell value at (x, y), cells outside the grid are EMPTY."""
+        if 0 <= x < self.x_size and 0 <= y < self.y_size:
+            return self.cells[y * self.x_size + x]
+        return self.EMPTY
 
     def insert_word(self, word_in_grid):
         # print("Inserting ", word_in_grid)
@@ -120,101 +970,123 @@ class Grid:
             self.insert_vertical_word(word_in_grid)
 
     def insert_horizontal_word(self, word_in_grid):
-        row = self.grid[word_in_grid.y_start]
-        for idx, w in enumerate(word_in_grid.word):
-            x = word_in_grid.x_start + idx
-            coord = f"({x},{row})"
-            if coord in self.used_pos:
-                raise GridConflictingCell(f"Cell already used: {coord}")
-            self.used_pos.add(coord)
-            row[x] = w
-        self.placed_words.append(word_in_grid)
+        self._insert(word_in_grid, 1, 0, self.HORIZONTAL)
 
     def insert_vertical_word(self, word_in_grid):
-        x = word_in_grid.x_start
-        for idx, w in enumerate(word_in_grid.word):
-            y = word_in_grid.y_start + idx
-            coord = f"({x},{y})"
-            if coord in self.used_pos:
-                raise GridConflictingCell(f"Cell already used: {coord}")
-            self.used_pos.add(coord)
-            self.grid[y][x] = w
+        self._insert(word_in_grid, 0, 1, self.VERTICAL)
+
+    def _insert(self, word_in_grid, dx, dy, orientation_bit):
+        x_start, y_start = word_in_grid.x_start, word_in_grid.y_start
+        letters = word_in_grid.word.encode("ascii")
+        length = len(letters)
+        if (
+            self.get(x_start - dx, y_start - dy) != self.EMPTY
+            or self.get(x_start + length * dx, y_start + length * dy) != self.EMPTY
+        ):
+            raise GridConflictingCell(
+                f"Word extends another word: {word_in_grid.word}"
+            )
+        keys = []
+        crossings = 0
+        for idx, letter in enumerate(letters):
+            x = x_start + idx * dx
+            y = y_start + idx * dy
+            key = self._key(x, y)
+            if self.occupancy[key]:
+                if self.cells[key] != letter:
+                    raise GridConflictingCell(f"Cell already used: ({x},{y})")
+                if self.occupancy[key] & orientation_bit:
+                    raise GridConflictingCell(
+                        f"Cell used in same orientation: ({x},{y})"
+                    )
+                crossings += 1
+            elif (
+                self.get(x - dy, y - dx) != self.EMPTY
+                or self.get(x + dy, y + dx) != self.EMPTY
+            ):
+                raise GridConflictingCell(f"Cell touches a parallel word: ({x},{y})")
+            keys.append(key)
+        for key, letter in zip(keys, letters):
+            self.cells[key] = letter
+            self.occupancy[key] |= orientation_bit
+        self.crossings += crossings
         self.placed_words.append(word_in_grid)
 
+    @property
+    def used_pos(self) -> Set[int]:
+        return {key for key, used in enumerate(self.occupancy) if used}
+
+    def crossing_count(self, x, y) -> int:
+        """Number of words going through cell (x, y)."""
+        return bin(self.occupancy[self._key(x, y)]).count("1")
+
     def resize_to_minimum_size(self):
-        min_x = min([min(pword.x_start, pword.x_end) for pword in self.placed_words])
-        max_x = max([max(pword.x_start, pword.x_end) for pword in self.placed_words])
-        min_y = min([min(pword.y_start, pword.y_end) for pword in self.placed_words])
-        max_y = max([max(pword.y_start, pword.y_end) for pword in self.placed_words])
-        x_offset = min_x
-        y_offset = min_y
-        self.x_size = max_x - min_x
-        self.y_size = max_y - min_y
-        self.grid = []
-        # print(self.x_size, self.y_size, x_offset, y_offset)
-        for y in range(self.y_size):
-            self.grid.append([])
-            for _ in range(self.x_size):
-                self.grid[y].append(" ")
-        new_pwords = self.placed_words[:]
-        self.placed_words = []
-        for pword in new_pwords:
-            pword.x_start -= x_offset
-            pword.x_end -= x_offset
-            pword.y_start -= y_offset
-            pword.y_end -= y_offset
-            # print(pword)
-            self.insert_word(pword)
         """Resizes to minimum rectangular dimensions."""
+        new_pwords = self.placed_words[:]
+        resized = Grid.from_words(new_pwords)
+        self.x_size = resized.x_size
+        self.y_size = resized.y_size
+        self.cells = resized.cells
+        self.occupancy = resized.occupancy
+        self.crossings = resized.crossings
+        self.placed_words = resized.placed_words
 
     @property
     def area(self):
         return self.x_size * self.y_size
 
+    @property
+    def grid(self) -> List[List[str]]:
+        """Rows of rendered cells."""
+        return [
+            [
+                self._render_cell(self.cells[y * self.x_size + x])
+                for x in range(self.x_size)
+            ]
+            for y in range(self.y_size)
+        ]
+
     def is_valid(self):
         for pword in self.placed_words:
-            i = 0
+            letters = pword.word.encode("ascii")
             if pword.orientation == WordOrientation.Horizontal:
+                y = pword.y_start
                 # Check that the boundaries are not immediately followed by letters
-                if self.grid[pword.y_start][pword.x_start - 1] != " ":
+                if self.get(pword.x_start - 1, y) != self.EMPTY:
                     return False
-                if self.grid[pword.y_start][pword.x_end + 1] != " ":
+                if self.get(pword.x_end, y) != self.EMPTY:
                     return False
-                for x in range(pword.x_start, pword.x_end):
-                    if not self.grid[pword.y_start][x] == pword.word[i]:
+                for i, x in enumerate(range(pword.x_start, pword.x_end)):
+                    if self.get(x, y) != letters[i]:
                         return False
-                    i += 1
             else:
+                x = pword.x_start
                 # Check that the boundaries are not immediately followed by letters
-                if self.grid[pword.x_start][pword.y_start - 1] != " ":
+                if self.get(x, pword.y_start - 1) != self.EMPTY:
                     return False
-                if self.grid[pword.x_start][pword.y_end + 1] != " ":
+                if self.get(x, pword.y_end) != self.EMPTY:
                     return False
-                for y in range(pword.y_start, pword.y_end):
-                    if not self.grid[y][pword.x_start] == pword.word[i]:
+                for i, y in enumerate(range(pword.y_start, pword.y_end)):
+                    if self.get(x, y) != letters[i]:
                         return False
-                    i += 1
         return True
 
     def get_mask(self):
-        mask = []
-        for y in range(self.y_size):
-            mask.append([])
-            for _ in range(self.x_size):
-                mask[y].append("*")
+        mask = GridMask(x_size=self.x_size, y_size=self.y_size)
         for idx, pword in enumerate(self.placed_words):
             pword.order_number = idx
             if pword.orientation == WordOrientation.Horizontal:
                 y = pword.y_start
                 for x in range(pword.x_start, pword.x_end):
-                    mask[y][x] = str(idx)
+                    mask.cells[y * self.x_size + x] = idx
             else:
                 x = pword.x_start
                 for y in range(pword.y_start, pword.y_end):
-                    mask[y][x] = str(idx)
-        g = Grid(x_size=self.x_size, y_size=self.y_size)
-        g.grid = mask
-        return g
+                    mask.cells[y * self.x_size + x] = idx
+        return mask
+
+    def _render_cell(self, value) -> str:
+        return chr(value)
 
     def _row_separator(self):
         s = ""
@@ -223,7 +1095,6 @@ class Grid:
         return s
 
     def __repr__(self):
-        print(self.x_size, self.y_size)
         s = self._row_separator()
         for row in self.grid:
             for cell in row:
@@ -233,11 +1104,106 @@ class Grid:
         return s
 
 
+class GridMask(Grid):
+    """Grid whose cells hold the order number of the word covering them.
+
+    Cells are 32 bit, growth grids can hold more words than a byte counts.
+    """
+
+    BLOCKED = 0xFFFFFFFF
+
+    def __init__(self, x_size=20, y_size=20):
+        super().__init__(x_size=x_size, y_size=y_size)
+        self.cells = array("I", [self.BLOCKED]) * (x_size * y_size)
+
+    def _render_cell(self, value) -> str:
+        return "*" if value == self.BLOCKED else str(value)
+
+
 class InvalidWordSetError(Exception):
     """WordSet did not yield a valid grid."""
 
 
+class UnplaceablePathError(Exception):
+    """Path of links that cannot place every word at a single position."""
+
+
+class FillEngine:
+    Random = "random"
+    Backtracking = "backtracking"
+    # Picks words while placing them, for large puzzles, see growth.py.
+    Growth = "growth"
+
+
+class GenerationStrategy:
+    First = "first"
+    Best = "best"
+
+
+class CancellationToken:
+    """Shared cancellation flag plus an optional wall-clock deadline.
+
+    The event is a multiprocessing.Event when the token is shared with
+    worker processes through inheritance, searches poll is_cancelled().
+    """
+
+    def __init__(self, deadline: Optional[float] = None, event=None):
+        self.deadline = deadline
+        self.event = event
+
+    @classmethod
+    def with_budget(cls, time_budget: Optional[float], event=None):
+        deadline = None if time_budget is None else time.time() + time_budget
+        return cls(deadline=deadline, event=event)
+
+    def cancel(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.deadline = time.time()
+
+    def is_cancelled(self) -> bool:
+        if self.event is not None and self.event.is_set():
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+
+def _picklable_error(error: Exception) -> Exception:
+    """error, or a RuntimeError with its traceback when it cannot be sent
+    back from a worker process."""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError("".join(traceback.format_exception(error)))
+
+
+def known_words(word_dictionary, words: Sequence[str]) -> List[str]:
+    """words unidecoded and lowercased like the dictionary, once each.
+    Raises a ValueError naming the ones the dictionary does not hold."""
+    known = list(dict.fromkeys(unidecode(word.strip()).lower() for word in words))
+    unknown = []
+    for word in known:
+        try:
+            word_dictionary.word_id(word)
+        except KeyError:
+            unknown.append(word)
+    if unknown:
+        raise ValueError(f"Not in the dictionary: {', '.join(unknown)}")
+    return known
+
+
 class CrossWordGame:
+    max_iterations = 100
+    # Length range of picked words.
+    min_length = 4
+    max_length = 8
+
     def __init__(
         self,
         word_picker: WordPicker,
@@ -245,230 +1211,537 @@ class CrossWordGame:
         max_pathes=100,
         threads=8,
         seed_orientation=WordOrientation.Horizontal,
+        engine=FillEngine.Random,
+        time_budget: Optional[float] = None,
+        strategy=GenerationStrategy.Best,
+        seed: Optional[int] = None,
+        difficulty: Optional[str] = None,
+        words: Optional[Sequence[str]] = None,
+        cache=None,
+        objective=None,
+        constraints: Optional[WordConstraints] = None,
     ):
+        """
+        With GenerationStrategy.First the first valid grid is returned and
+        the other workers are cancelled. With GenerationStrategy.Best the
+        smallest grid is returned, when a time_budget (seconds) is given
+        workers keep searching for smaller grids until it runs out.
+
+        With a seed, attempt i draws from its own random stream derived from
+        (seed, i), and the game is the lowest successful attempt whatever
+        the strategy, so it is identical regardless of the number of threads.
+
+        words fixes the word set instead of picking it, or with the growth
+        engine the words among num_words to place first. They are normalized
+        like the dictionary and a ValueError is raised for the ones it does
+        not hold. With a cache (a PuzzleCache) a word set solved before is
+        not searched again, and word graphs reuse the links of word pairs
+        already seen.
+
+        With an objective (a density.DensityObjective) every grid is made
+        denser by local search, and the best grid is the one scoring highest
+        on it instead of the smallest one. Grids that do not fit its maximum
+        dimensions are rejected.
+
+        constraints (a WordConstraints) replace the picker's own for the
+        picked word sets, a ValueError is raised up front when no word set
+        can meet them. The growth engine does not pick word sets, it
+        ignores them.
+        """
         self.grid: Optional[Grid] = None
+        self.reproducible = seed is not None
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
         self.word_picker = word_picker
         self.num_words = num_words
         self.max_pathes = max_pathes
         self.threads = threads
-        self.parallelized_generate_game(threads=self.threads)
+        self.seed_orientation = seed_orientation
+        self.engine = engine
+        self.time_budget = time_budget
+        self.strategy = strategy
+        self.difficulty = difficulty
+        self.fixed_words = (
+            known_words(word_picker.word_dictionary, words) if words else None
+        )
+        if self.fixed_words and engine != FillEngine.Growth:
+            self.num_words = len(self.fixed_words)
+        elif self.fixed_words:
+            # Growing fills the slots left around the fixed words.
+            self.num_words = max(num_words, len(self.fixed_words))
+        self.cache = cache
+        self.objective = objective
+        self.constraints = constraints
+        if not self.fixed_words and self.engine != FillEngine.Growth:
+            # Fails once here rather than in every attempt.
+            word_picker.check_pickable(
+                self.num_words,
+                max_length=self.max_length,
+                min_length=self.min_length,
+                difficulty=difficulty,
+                constraints=constraints,
+            )
+        if self.threads > 1:
+            self.parallelized_generate_game(threads=self.threads)
+        else:
+            self.generate_game()
+
+    def to_dict(self):
+        """Compact, JSON serializable representation of the game.
+
+        Grid rows are strings, mask cells hold the order number of the word
+        covering them (-1 for blocked cells).
+        """
+        mask = self.get_mask()
+        return {
+            "size": [self.grid.x_size, self.grid.y_size],
+            "grid": ["".join(row) for row in self.grid.grid],
+            "mask": [
+                [-1 if cell == "*" else int(cell) for cell in row] for row in mask.grid
+            ],
+            "words": [
+                [
+                    pword.order_number,
+                    pword.word,
+                    pword.x_start,
+                    pword.y_start,
+                    pword.orientation,
+                ]
+                for pword in self.grid.placed_words
+            ],
+            "hints": self.get_hints(),
+        }
 
     def to_json(self):
-        raise NotImplementedError()
-        return json.dumps({})
+        return json.dumps(self.to_dict(), separators=(",", ":"))
 
     def get_mask(self):
         return self.grid.get_mask()
     
 
     def get_hints(self):
+        rng = random.Random(f"{self.seed}:hints")
         hints = []
         for pword in self.grid.placed_words:
             available_hints = self.word_picker.word_dictionary[pword.word].hint
-            chosen_hint = random.choice(available_hints)
+            chosen_hint = rng.choice(available_hints)
             hints.append((pword.order_number, chosen_hint))
         return hints
 
     def generate_game(self, threads=1):
-        self.grid = self._generate_game(self.max_pathes, threads=self.threads)
+        cancel = CancellationToken.with_budget(self.time_budget)
+        _, self.grid = self._generate_game(
+            self.max_pathes, threads=self.threads, cancel=cancel
+        )
 
     def parallelized_generate_game(self, threads=8):
-        print("Picking random words...")
-        self.words = self.word_picker.pick_n_random_words(
-            self.num_words, max_length=8, min_length=4
-        )
-        print(f"Running with {threads}")
-        queues = []
+        telemetry.log(f"Running with {threads}")
         processes = []
 
-        threads_queue = mp.Queue()
+        cancel = CancellationToken.with_budget(self.time_budget, event=mp.Event())
+        results_queue = mp.Queue()
+        # Lowest successful attempt so far, workers skip attempts above it.
+        best_attempt = mp.Value("i", self.max_iterations)
+        # Seeded attempts must not depend on the number of workers.
+        max_pathes = (
+            self.max_pathes if self.reproducible else self.max_pathes // threads
+        )
         for i in range(threads):
-            queue = mp.Queue()
-            queues.append(queue)
-            args = (self.max_pathes // threads, queue, 1, threads_queue)
+            args = (
+                max_pathes,
+                results_queue,
+                1,
+                cancel,
+                i,
+                threads,
+                best_attempt,
+            )
             p = mp.Process(target=self._generate_game, args=args)
             processes.append(p)
-            print(f"Starting worker {i}")
+            telemetry.log(f"Starting worker {i}")
             p.start()
 
-        print("Collecting results...")
+        telemetry.log("Collecting results...")
         results = []
+        errors = []
         for i in range(threads):
-            result = queues[i].get()
+            try:
+                result = results_queue.get(timeout=cancel.remaining())
+            except queue.Empty:
+                # Out of time: stop the workers, they still report what they found.
+                cancel.cancel()
+                result = results_queue.get()
+            attempt, grid, metrics, error = result
+            telemetry.merge(metrics)
+            if error is not None:
+                telemetry.count("game.worker_errors")
+                errors.append(error)
+                # The other workers would most likely fail the same way.
+                cancel.cancel()
+            result = attempt, grid
+            if (
+                grid
+                and self.strategy == GenerationStrategy.First
+                and not self.reproducible
+            ):
+                cancel.cancel()
             results.append(result)
 
-        best_result = min(
-            [valid for valid in results if valid], key=(attrgetter("area"))
-        )
+        valid_results = [result for result in results if result[1]]
+        if self.reproducible:
+            best_result = min(valid_results, key=itemgetter(0), default=(None, None))
+        elif self.strategy == GenerationStrategy.First:
+            best_result = valid_results[0] if valid_results else (None, None)
+        else:
+            best_result = min(
+                valid_results,
+                key=lambda result: self._grid_rank(result[1]),
+                default=(None, None),
+            )
         for i in range(threads):
             processes[i].join()
-            print(f"Finished worker {i}")
-        self.grid = best_result
+            telemetry.log(f"Finished worker {i}")
+        if errors and best_result[1] is None:
+            raise errors[0]
+        self.grid = best_result[1]
 
-    def _generate_game(self, max_pathes, mp_queue=None, threads=1, threads_queue=None):
-        max_iterations = 100
-        i = 0
-        print("Generating game...")
+    def _generate_game(
+        self,
+        max_pathes,
+        mp_queue=None,
+        threads=1,
+        cancel: Optional[CancellationToken] = None,
+        worker=0,
+        stride=1,
+        best_attempt=None,
+    ) -> Tuple[Optional[int], Optional[Grid]]:
+        """Runs attempts worker, worker + stride, ... until one succeeds.
+
+        Returns the successful attempt and its grid. A worker (with an
+        mp_queue) always puts (attempt, grid, metrics, error) in it, error
+        being what the attempts raised, so the parent never waits for it.
+        """
+        if not mp_queue:
+            return self._run_attempts(
+                max_pathes, threads, cancel, worker, stride, best_attempt
+            )
+        # Forked workers report only what they recorded themselves.
+        telemetry.reset()
+        found_attempt, best_grid, error = None, None, None
+        try:
+            found_attempt, best_grid = self._run_attempts(
+                max_pathes, threads, cancel, worker, stride, best_attempt
+            )
+        except Exception as exc:
+            error = _picklable_error(exc)
+        finally:
+            mp_queue.put((found_attempt, best_grid, telemetry.collect(), error))
+        return found_attempt, best_grid
+
+    def _run_attempts(
+        self, max_pathes, threads, cancel, worker, stride, best_attempt
+    ) -> Tuple[Optional[int], Optional[Grid]]:
+        telemetry.log("Generating game...")
         grid = None
-        current_threads = threads
-        while i < max_iterations and not grid:
+        best_grid = None
+        found_attempt = None
+        # Only the best strategy with a time budget keeps improving its grid.
+        keep_searching = (
+            not self.reproducible
+            and self.strategy == GenerationStrategy.Best
+            and self.time_budget is not None
+        )
+        worker_rng = random.Random(f"{self.seed}:worker:{worker}")
+        for attempt in range(worker, self.max_iterations, stride):
+            if best_grid and not keep_searching:
+                break
+            if cancel and cancel.is_cancelled():
+                telemetry.log("Cancelled.")
+                telemetry.count("game.cancelled")
+                break
+            if best_attempt is not None and attempt > best_attempt.value:
+                break
+            rng = (
+                random.Random(f"{self.seed}:{attempt}")
+                if self.reproducible
+                else worker_rng
+            )
+            telemetry.count("game.attempts")
             try:
-                i += 1
-                if threads_queue:
-                    try:
-
-                        is_thread_available = threads_queue.get_nowait()
-                        if is_thread_available:
-                            print("Break early!!")
-                            threads_queue.put_nowait(is_thread_available)
-                            mp_queue.put(None)
-                            return None
-                            current_threads += 1
-                    except Exception:
-                        pass
-                print(f"Iteration: {i}, using threads {current_threads}")
-                self.words = self.word_picker.pick_n_random_words(
-                    self.num_words, max_length=8, min_length=4
+                with telemetry.timer("game.attempt"):
+                    grid = self._attempt(max_pathes, threads, cancel, rng, attempt)
+                if best_grid is None or self._grid_rank(grid) < self._grid_rank(
+                    best_grid
+                ):
+                    best_grid = grid
+                    found_attempt = attempt
+            except InvalidWordSetError:
+                telemetry.log("Invalid grid :(")
+                telemetry.count("game.invalid_word_set")
+                if not (cancel and cancel.is_cancelled()):
+                    self._cache_failure()
+        if best_attempt is not None and found_attempt is not None:
+            with best_attempt.get_lock():
+                best_attempt.value = min(best_attempt.value, found_attempt)
+        self.grid = best_grid
+        if best_grid:
+            telemetry.log("Generated Successfully!")
+        else:
+            telemetry.log("Failed to generate game.")
+        return found_attempt, best_grid
+
+    def _attempt(self, max_pathes, threads, cancel, rng, attempt) -> Grid:
+        """Picks a word set and lays it out, raises InvalidWordSetError."""
+        telemetry.log(f"Iteration: {attempt}, using threads {threads}")
+        with telemetry.timer("game.stage", stage="pick_words"):
+            if self.fixed_words:
+                self.words = list(self.fixed_words)
+            elif self.engine == FillEngine.Growth:
+                self.words = []
+            else:
+                self.words = None
+                try:
+                    self.words = self.word_picker.pick_n_random_words(
+                        self.num_words,
+                        max_length=self.max_length,
+                        min_length=self.min_length,
+                        rng=rng,
+                        difficulty=self.difficulty,
+                        constraints=self.constraints,
+                    )
+                except ValueError as error:
+                    # Picks can fail by chance (e.g. connected picks running
+                    # out of crossings), the next attempt draws again.
+                    raise InvalidWordSetError(str(error)) from error
+        cached_grid = self._cached_grid()
+        if cached_grid is not None:
+            telemetry.log("Cached grid.")
+            telemetry.count("game.cache_hits")
+            return cached_grid
+        if self._cached_failure():
+            raise InvalidWordSetError("Word set failed before.")
+        if self.engine == FillEngine.Backtracking:
+            telemetry.log("Filling grid...")
+            with telemetry.timer("game.stage", stage="fill"):
+                grid = self._fill_grid(cancel)
+        elif self.engine == FillEngine.Growth:
+            telemetry.log("Growing grid...")
+            with telemetry.timer("game.stage", stage="grow"):
+                grid = self._grow_grid(rng, cancel)
+        else:
+            telemetry.log("Building word graph...")
+            with telemetry.timer("game.stage", stage="build_graph"):
+                self.word_graph = WordGraph(
+                    self.words,
+                    link_cache=self.word_picker.compatibility or self.cache,
                 )
-                print("Building word graph...")
-
-                self.word_graph = WordGraph(self.words)
-                print("Finding pathes...")
+            telemetry.log("Finding pathes...")
+            with telemetry.timer("game.stage", stage="search"):
                 self.word_graph.parallelized_generate_all_pathes(
                     max_pathes=max_pathes,
                     max_iterations=100000,
-                    threads=current_threads,
+                    threads=threads,
+                    cancel=cancel,
+                    rng=rng,
                 )
-                print("Generating grid...")
-                grid = self._generate_grid()
-            except InvalidWordSetError:
-                print("Invalid grid :(")
-                pass
-        if grid:
-            print("Generated Successfully!")
-            if threads_queue:
-                threads_queue.put_nowait(True)
-            if mp_queue:
-                mp_queue.put(grid)
-            return grid
-        print(f"Failed to generate game after {max_iterations} tries.")
-
-    def _generate_grid(self):
-        current_grid = None
-        print("Generating grid...")
-        for idx, path in enumerate(self.word_graph.pathes):
+            picked_path = self._picked_path()
+            if picked_path:
+                # Known to lay out, so the word set cannot fail.
+                self.word_graph.path_ids.insert(0, picked_path)
+                self.word_graph.pathes.insert(
+                    0, [self.word_graph.links[i] for i in picked_path]
+                )
+            with telemetry.timer("game.stage", stage="generate_grid"):
+                grid = self._generate_grid(cancel)
+        if self.objective is not None:
+            with telemetry.timer("game.stage", stage="densify"):
+                grid = self._densify(grid, rng, cancel)
+        if self._cacheable():
+            # Grown grids are looked up by their fixed words, not all of them.
+            self.cache.put_grid(
+                self.fixed_words or self.words, grid, **self._cache_params()
+            )
+        return grid
+
+    def _picked_path(self) -> Optional[Tuple[int, ...]]:
+        """Link ids of the crossings the picker laid the words out with."""
+        if self.fixed_words or not self.word_picker.picked_links:
+            return None
+        graph = self.word_graph
+        node_ids = {node.word: node_id for node_id, node in enumerate(graph.nodes)}
+        path = []
+        for anchor, index_a, word, index_b in self.word_picker.picked_links:
+            path.extend(
+                link_id
+                for link_id in graph.letter_links[node_ids[anchor]][index_a]
+                if graph.link_target[link_id] == node_ids[word]
+                and graph.link_index_b[link_id] == index_b
+            )
+        return tuple(path)
+
+    def _cache_params(self) -> dict:
+        params = {
+            "num_words": self.num_words,
+            "max_pathes": self.max_pathes,
+            "engine": self.engine,
+        }
+        if self.objective is not None:
+            params["objective"] = asdict(self.objective)
+        return params
+
+    def _grid_rank(self, grid: Grid):
+        """Sort key of grids, the best grid first."""
+        if self.objective is None:
+            return grid.area
+        from grid_generator.src.density import grid_metrics
+
+        return -self.objective.score(grid_metrics(grid))
+
+    def _densify(self, grid: Grid, rng, cancel) -> Grid:
+        from grid_generator.src.density import densify, grid_metrics
+
+        grid = densify(grid, self.objective, rng=rng, cancel=cancel)
+        if not self.objective.fits(grid_metrics(grid)):
+            raise InvalidWordSetError("Grid does not fit the maximum dimensions.")
+        self.grid = grid
+        return grid
+
+    def _cacheable(self) -> bool:
+        # Growing picks the word set along with the grid, there is no word
+        # set to look up beforehand.
+        return self.cache is not None and (
+            self.engine != FillEngine.Growth or bool(self.fixed_words)
+        )
+
+    def _cached_grid(self) -> Optional[Grid]:
+        if not self._cacheable():
+            return None
+        return self.cache.get_grid(self.words, **self._cache_params())
+
+    def _cached_failure(self) -> bool:
+        # A fixed word set is always searched, it has no alternative.
+        if not self._cacheable() or self.fixed_words:
+            return False
+        return self.cache.has_failed(self.words, **self._cache_params())
+
+    def _cache_failure(self):
+        if self._cacheable() and not self.fixed_words and self.words:
+            self.cache.put_failure(self.words, **self._cache_params())
+
+    def _fill_grid(self, cancel: Optional[CancellationToken] = None):
+        """Places the picked words with the backtracking engine."""
+        from grid_generator.src.fill_engine import BacktrackingFiller
+
+        grid = BacktrackingFiller().fill(
+            self.words, seed_orientation=self.seed_orientation, cancel=cancel
+        )
+        if grid is None:
+            raise InvalidWordSetError("Backtracking could not place the word set.")
+        self.grid = grid
+        return grid
+
+    def _grow_grid(self, rng, cancel: Optional[CancellationToken] = None):
+        """Grows a grid of num_words words, including the fixed words."""
+        from grid_generator.src.growth import GrowthFiller
+
+        bounds = self.objective
+        grid = GrowthFiller(
+            self.word_picker,
+            max_width=bounds.max_width if bounds else None,
+            max_height=bounds.max_height if bounds else None,
+        ).grow(
+            self.num_words,
+            words=self.fixed_words or (),
+            rng=rng,
+            difficulty=self.difficulty,
+            seed_orientation=self.seed_orientation,
+            cancel=cancel,
+        )
+        if grid is None:
+            raise InvalidWordSetError("The grid stopped growing before num_words.")
+        self.words = [pword.word for pword in grid.placed_words]
+        self.grid = grid
+        return grid
+
+    def _generate_grid(self, cancel: Optional[CancellationToken] = None):
+        """Smallest valid grid among the pathes of the word graph.
+
+        Pathes are scored from their link arrays first, only the ones that
+        may be valid are materialized, smallest area first, until one is.
+        """
+        from grid_generator.src.path_scoring import score_pathes
+
+        telemetry.log("Generating grid...")
+        scores = score_pathes(self.word_graph, self.word_graph.path_ids)
+        telemetry.count("grid.pathes", len(self.word_graph.path_ids))
+        telemetry.count(
+            "grid.pathes_rejected", len(self.word_graph.path_ids) - len(scores)
+        )
+        for _, _, idx in scores:
+            if cancel and cancel.is_cancelled():
+                break
+            telemetry.count("grid.materialized")
             try:
-                g = self._node_links_to_grid(path)
-                # print(g.placed_words, self.words)
-                if len(g.placed_words) == len(self.words) and g.is_valid():
-                    print("Valid path!")
-                    # print("Pre-resize:", g.x_size, g.y_size)
-                    g.resize_to_minimum_size()
-                    # print("Resized:", g.x_size, g.y_size)
-                    if not current_grid and g:
-                        current_grid = g
-                    else:
-                        if g.area < current_grid.area:
-                            current_grid = g
-            except GridConflictingCell as e:
-                pass
-        if current_grid:
-            self.grid = current_grid
-            return current_grid
+                g = self._node_links_to_grid(self.word_graph.pathes[idx])
+            except UnplaceablePathError:
+                telemetry.count("grid.unplaceable")
+                continue
+            except GridConflictingCell:
+                telemetry.count("grid.conflicting_cell")
+                continue
+            if len(g.placed_words) == len(self.words) and g.is_valid():
+                telemetry.log("Valid path!")
+                telemetry.count("grid.accepted")
+                self.grid = g
+                return g
+            telemetry.count("grid.invalid")
         raise InvalidWordSetError("Invalid word set/pathes, could not create a grid.")
 
-    def _node_links_to_grid(self, links: List[any]):
-        grid = Grid(1000, 1000)
-        # Take first link and use it to seed the Grid
-        node_link: NodeLink = links[0]
-        raw_word = node_link.origin_node.word
-        word_in_grid = WordInGrid(
-            x_start=(grid.x_size - len(raw_word)) // 2,
-            x_end=((grid.x_size - len(raw_word)) // 2) + len(raw_word),
-            y_start=(grid.x_size // 2),
-            y_end=(grid.x_size // 2),
-            word=raw_word,
-            orientation=WordOrientation.Horizontal,
+    def _node_links_to_grid(self, links: List["NodeLink"]) -> Grid:
+        """Grid of the words of self.words laid out along a path of links.
+
+        Raises UnplaceablePathError when the links do not place every word
+        at a single position, GridConflictingCell when placed words clash.
+        """
+        from grid_generator.src.path_scoring import place_path
+
+        node_ids = {word: node_id for node_id, word in enumerate(self.words)}
+        placed = place_path(
+            len(self.words),
+            [
+                (
+                    node_ids[link.origin_node.word],
+                    node_ids[link.target_node.word],
+                    link.index_a,
+                    link.index_b,
+                )
+                for link in links
+            ],
         )
-        grid.insert_word(word_in_grid)
-        words_in_grid = {node_link.origin_node.word: word_in_grid}
-        used_links = set()
-        # Insert remainining links.
-        j = 0
-        while len(used_links) < len(links) and j < len(links):
-            # Find a link that was not yet consumed
-            # And that is connected to a word that is already in the grid.
-            j += 1
-            for idx, link in enumerate(links):
-                if idx not in used_links:
-                    if (
-                        link.origin_node.word in words_in_grid
-                        and link.target_node.word not in words_in_grid
-                    ):
-                        # Add link words to grid
-                        used_links.add(idx)
-                        previous_word = words_in_grid[link.origin_node.word]
-                        new_orientation = (
-                            WordOrientation.Horizontal
-                            if previous_word.orientation == WordOrientation.Vertical
-                            else WordOrientation.Vertical
-                        )
-                        new_word = link.target_node.word
-                        if new_orientation == WordOrientation.Vertical:
-                            new_x_start = previous_word.x_start + link.index_a
-                            new_x_end = new_x_start
-                            new_y_start = previous_word.y_start - link.index_b
-                            new_y_end = new_y_start + len(new_word)
-                        else:
-                            new_x_start = previous_word.x_start - link.index_b
-                            new_x_end = new_x_start + len(new_word)
-                            new_y_start = previous_word.y_start + link.index_a
-                            new_y_end = new_y_start
-
-                        new_word_in_grid = WordInGrid(
-                            x_start=new_x_start,
-                            x_end=new_x_end,
-                            y_start=new_y_start,
-                            y_end=new_y_end,
-                            word=new_word,
-                            orientation=new_orientation,
-                        )
-                        grid.insert_word(new_word_in_grid)
-                        words_in_grid[link.target_node.word] = new_word_in_grid
-                    elif (
-                        link.target_node.word in words_in_grid
-                        and link.origin_node.word not in words_in_grid
-                    ):
-                        used_links.add(idx)
-                        previous_word = words_in_grid[link.target_node.word]
-                        new_orientation = (
-                            WordOrientation.Horizontal
-                            if previous_word.orientation == WordOrientation.Vertical
-                            else WordOrientation.Vertical
-                        )
-                        new_word = link.origin_node.word
-                        if new_orientation == WordOrientation.Vertical:
-                            new_x_start = previous_word.x_start + link.index_b
-                            new_x_end = new_x_start
-                            new_y_start = previous_word.y_start - link.index_a
-                            new_y_end = new_y_start + len(new_word)
-                        else:
-                            new_x_start = previous_word.x_start - link.index_a
-                            new_x_end = new_x_start + len(new_word)
-                            new_y_start = previous_word.y_start + link.index_b
-                            new_y_end = new_y_start
-
-                        new_word_in_grid = WordInGrid(
-                            x_start=new_x_start,
-                            x_end=new_x_end,
-                            y_start=new_y_start,
-                            y_end=new_y_end,
-                            word=new_word,
-                            orientation=new_orientation,
-                        )
-                        grid.insert_word(new_word_in_grid)
-                        words_in_grid[link.origin_node.word] = new_word_in_grid
-        return grid
+        if placed is None:
+            raise UnplaceablePathError("Links do not place every word once.")
+        layout, order = placed
+        words_in_grid = []
+        for node_id in order:
+            word = self.words[node_id]
+            x, y, vertical = layout[node_id]
+            words_in_grid.append(
+                WordInGrid(
+                    x_start=x,
+                    x_end=x if vertical else x + len(word),
+                    y_start=y,
+                    y_end=y + len(word) if vertical else y,
+                    word=word,
+                    orientation=WordOrientation.Vertical
+                    if vertical
+                    else WordOrientation.Horizontal,
+                )
+            )
+        # Coordinates are only materialized once, in a grid sized to the
+        # bounding box of the path. Insertion checks every word, so a bad
+        # path is abandoned at its first illegal word.
+        return Grid.from_words(words_in_grid)
 
     def __repr__(self):
         return self.grid.__repr__()
@@ -554,9 +1827,7 @@ class LinkableLetter:
                             and link.target_node == self.parent_node
                         ):
                             if str(link) not in added_links:
-                                mirrored_links.append(
-                                    (deepcopy(letter), deepcopy(link))
-                                )
+                                mirrored_links.append((letter, link))
                                 added_links.add(str(link))
 
         return mirrored_links
@@ -579,37 +1850,108 @@ class LinkableLetter:
         return mirrored_links
 
 
-class WordGraph:
-    def __init__(self, word_list):
-        self.nodes = [WordNode(word) for word in word_list]
+class SearchState:
+    """Mutable per-attempt state of the path search.
 
-        node_combinations = product(self.nodes, self.nodes)
+    Everything is kept in integer bitsets so resetting between attempts is
+    constant time, and the WordGraph itself is never modified or copied.
+    """
 
-        for a_node, b_node in node_combinations:
-            if a_node == b_node:
-                continue
+    def __init__(self):
+        self.visited = 0
+        self.used_links = 0
+        self.linked_pairs = 0
+
+    def reset(self):
+        self.visited = 0
+        self.used_links = 0
+        self.linked_pairs = 0
+
+
+class WordGraph:
+    """Word nodes and the links between their shared letters.
+
+    The graph is immutable once built. Besides the WordNode / NodeLink
+    objects, links are flattened into parallel arrays indexed by link id
+    (link_origin, link_target, link_index_a, link_index_b), and
+    letter_links[node_id][letter_index] lists the link ids leaving that
+    letter. Searches keep their own state in a SearchState.
+    """
+
+    def __init__(self, word_list, link_cache=None):
+        """link_cache (a PuzzleCache or a CompatibilityMatrix) provides the
+        links of every word pair, the resulting graph is the same either way."""
+        self.nodes = [WordNode(word) for word in word_list]
+        if link_cache is not None:
+            self._insert_cached_links(link_cache)
+        else:
+            self._insert_indexed_links()
 
-            for a_idx, char in enumerate(a_node.word):
-                matches = [m for m in re.finditer(char, b_node.word)]
-                for m in matches:
-                    a_node.insert_link(
-                        NodeLink(
-                            char=char,
-                            index_a=a_idx,
-                            index_b=m.start(),
-                            origin_node=a_node,
-                            target_node=b_node,
-                        )
+        node_ids = {node.word: node_id for node_id, node in enumerate(self.nodes)}
+        self.links: List[NodeLink] = []
+        self.link_origin = array("H")
+        self.link_target = array("H")
+        self.link_index_a = array("B")
+        self.link_index_b = array("B")
+        self.letter_links: List[List[Tuple[int, ...]]] = []
+        for node_id, node in enumerate(self.nodes):
+            node_letter_links = []
+            for letter in node.linkable_letters:
+                link_ids = []
+                for link in letter.links:
+                    link_ids.append(len(self.links))
+                    self.links.append(link)
+                    self.link_origin.append(node_id)
+                    self.link_target.append(node_ids[link.target_node.word])
+                    self.link_index_a.append(link.index_a)
+                    self.link_index_b.append(link.index_b)
+                node_letter_links.append(tuple(link_ids))
+            self.letter_links.append(node_letter_links)
+        telemetry.count("graph.links", len(self.links))
+
+    def _insert_indexed_links(self):
+        # Words sharing a letter are found by joining the postings of that
+        # letter, instead of scanning every (node, node, char) triple.
+        letter_index = LetterPositionIndex([node.word for node in self.nodes])
+        for char in letter_index.letters():
+            occurrences = list(letter_index.occurrences(char))
+            for (a_id, a_idx), (b_id, b_idx) in product(occurrences, occurrences):
+                if a_id == b_id:
+                    continue
+                a_node = self.nodes[a_id]
+                b_node = self.nodes[b_id]
+                a_node.insert_link(
+                    NodeLink(
+                        char=char,
+                        index_a=a_idx,
+                        index_b=b_idx,
+                        origin_node=a_node,
+                        target_node=b_node,
                     )
-                    b_node.insert_link(
-                        NodeLink(
-                            char=char,
-                            index_a=m.start(),
-                            index_b=a_idx,
-                            origin_node=b_node,
-                            target_node=a_node,
-                        )
+                )
+
+    def _insert_cached_links(self, link_cache):
+        for a_node in self.nodes:
+            pair_links = []
+            for b_id, b_node in enumerate(self.nodes):
+                if b_node is a_node:
+                    continue
+                for char, a_idx, b_idx in link_cache.pair_links(
+                    a_node.word, b_node.word
+                ):
+                    pair_links.append((b_idx, len(b_node.word), b_id, char, a_idx))
+            # Same link order as the index join, so searches stay reproducible.
+            pair_links.sort()
+            for b_idx, _, b_id, char, a_idx in pair_links:
+                a_node.insert_link(
+                    NodeLink(
+                        char=char,
+                        index_a=a_idx,
+                        index_b=b_idx,
+                        origin_node=a_node,
+                        target_node=self.nodes[b_id],
                     )
+                )
 
     def __repr__(self):
         s = ""
@@ -617,47 +1959,91 @@ class WordGraph:
             s += str(node)
         return s
 
+    def generate_all_pathes(
+        self, max_pathes=100, max_iterations=100, cancel=None, rng=None
+    ) -> Dict[Tuple[int, ...], List[NodeLink]]:
+        """Same as parallelized_generate_all_pathes, in the current process."""
+        result = iterative_randomized_search(
+            self, len(self.nodes) - 1, max_pathes, max_iterations, cancel, rng
+        )
+        complete_pathes = {
+            key: path for key, path in result.items() if len(path) == len(self.nodes) - 1
+        }
+        self.pathes = list(complete_pathes.values())
+        self.path_ids = list(complete_pathes.keys())
+        return complete_pathes
+
     def parallelized_generate_all_pathes(
-        self, max_pathes=100, max_iterations=100, ignore_visited=False, threads=8
+        self,
+        max_pathes=100,
+        max_iterations=100,
+        ignore_visited=False,
+        threads=8,
+        cancel: Optional[CancellationToken] = None,
+        rng: Optional[random.Random] = None,
     ) -> List[List[NodeLink]]:
         """
         Should generate all possible pathes.
 
         Maybe implement as a WordPath
         """
+        if threads <= 1:
+            return self.generate_all_pathes(
+                max_pathes=max_pathes,
+                max_iterations=max_iterations,
+                cancel=cancel,
+                rng=rng,
+            )
 
-        input_graph = deepcopy(self)
+        from grid_generator.src.shared import publish_graph
+
+        input_graph = self
         complete_pathes = {}
         incomplete_pathes = {}
         t0 = datetime.now()
         pathes_for_one_root_node: Dict[str, List[NodeLink]] = {}
-        print("Starting search!")
+        telemetry.log("Starting search!")
         queues = []
         processes = []
-        for i in range(threads):
-            queue = mp.Queue()
-            args = (
-                deepcopy(input_graph),
-                len(input_graph.nodes) - 1,
-                queue,
-                max_pathes // threads,
-                max_iterations,
-            )
-            queues.append(queue)
-            p = mp.Process(target=parallelized_randomized_search, args=args)
-            processes.append(p)
-            print(f"Starting worker {i}")
-            p.start()
-
-        print("Collecting results...")
         super_result = {}
-        for i in range(threads):
-            result = queues[i].get()
-            super_result.update(result)
-
-        for i in range(threads):
-            processes[i].join()
-            print(f"Finished worker {i}")
+        errors = []
+        # Workers map the link arrays instead of receiving a copy of the graph.
+        memory, handle = publish_graph(input_graph)
+        try:
+            # Forked workers would otherwise share the same random state.
+            base_seed = (rng or random).getrandbits(64)
+            for i in range(threads):
+                worker_queue = mp.Queue()
+                args = (
+                    handle,
+                    len(input_graph.nodes) - 1,
+                    worker_queue,
+                    max_pathes // threads,
+                    max_iterations,
+                    cancel,
+                    f"{base_seed}:{i}",
+                )
+                queues.append(worker_queue)
+                p = mp.Process(target=parallelized_randomized_search, args=args)
+                processes.append(p)
+                telemetry.log(f"Starting worker {i}")
+                p.start()
+
+            telemetry.log("Collecting results...")
+            for worker_queue in queues:
+                path_ids, metrics, error = worker_queue.get()
+                telemetry.merge(metrics)
+                if error is not None:
+                    telemetry.count("graph.worker_errors")
+                    telemetry.log(f"Path search worker failed: {error!r}")
+                    errors.append(error)
+                for key in path_ids:
+                    super_result[key] = [input_graph.links[link_id] for link_id in key]
+        finally:
+            for i, process in enumerate(processes):
+                process.join()
+                telemetry.log(f"Finished worker {i}")
+            memory.release()
 
         for key, path in super_result.items():
             if len(path) == len(input_graph.nodes) - 1:
@@ -666,30 +2052,52 @@ class WordGraph:
                 incomplete_pathes[key] = path
         t1 = datetime.now()
         elapsed_time = t1 - t0
-        print(f"Elapsed time: {elapsed_time}")
-        print("Total complete pathes:", len(complete_pathes))
+        telemetry.log(f"Elapsed time: {elapsed_time}")
+        telemetry.log("Total complete pathes:", len(complete_pathes))
+        if errors and not complete_pathes:
+            raise errors[0]
         self.pathes = []
-        for _, item in complete_pathes.items():
+        self.path_ids = []
+        for key, item in complete_pathes.items():
             self.pathes.append(item)
+            self.path_ids.append(key)
         return complete_pathes
 
 
 def parallelized_randomized_search(
-    input_graph,
+    graph_handle,
     target_len,
     mp_queue,
     max_pathes=10,
     max_iterations=1000,
+    cancel=None,
+    seed=None,
 ):
-    # print("Worker started!")
-    result = iterative_randomized_search(
-        input_graph,
-        target_len,
-        max_pathes,
-        max_iterations,
-    )
-    mp_queue.put(result)
-    # print("Worker ended!")
+    """Worker of WordGraph.parallelized_generate_all_pathes, searches the
+    published graph of graph_handle. Always puts (path_ids, metrics, error),
+    error being what the search raised, so the parent never waits for it."""
+    from grid_generator.src.shared import SharedGraph
+
+    telemetry.reset()
+    path_ids = []
+    error = None
+    try:
+        graph = SharedGraph(graph_handle)
+        try:
+            path_ids = randomized_path_ids(
+                graph,
+                target_len,
+                max_pathes,
+                max_iterations,
+                cancel,
+                random.Random(seed),
+            )
+        finally:
+            graph.close()
+    except Exception as exc:
+        error = _picklable_error(exc)
+    finally:
+        mp_queue.put((path_ids, telemetry.collect(), error))
 
 
 def iterative_randomized_search(
@@ -697,41 +2105,69 @@ def iterative_randomized_search(
     target_len,
     max_pathes=10,
     max_iterations=1000,
-):
+    cancel: Optional[CancellationToken] = None,
+    rng: Optional[random.Random] = None,
+) -> Dict[Tuple[int, ...], List[NodeLink]]:
+    """Pathes of target_len links, keyed by their link ids."""
+    return {
+        key: [input_graph.links[link_id] for link_id in key]
+        for key in randomized_path_ids(
+            input_graph, target_len, max_pathes, max_iterations, cancel, rng
+        )
+    }
+
+
+def randomized_path_ids(
+    input_graph,
+    target_len,
+    max_pathes=10,
+    max_iterations=1000,
+    cancel: Optional[CancellationToken] = None,
+    rng: Optional[random.Random] = None,
+) -> List[Tuple[int, ...]]:
+    """Link ids of distinct random pathes of target_len links, in the order
+    they were found. Only reads the flat link arrays of input_graph, so it
+    runs on a WordGraph as well as on a SharedGraph."""
+    rng = rng or random
     path_dict = {}
     current_iteration = 0
+    num_nodes = len(input_graph.nodes)
+    state = SearchState()
     while len(path_dict) < max_pathes and current_iteration < max_iterations:
-        print(
+        if cancel is not None and cancel.is_cancelled():
+            break
+        telemetry.log(
             f"Number of pathes: {len(path_dict)}. Iteration: {current_iteration}",
             end="\r",
         )
-        nodes = deepcopy(input_graph.nodes)
-        current_path: List[NodeLink] = []
-        linked_pairs = set()
+        state.reset()
+        current_path: List[int] = []
         current_iteration += 1
-        while len(current_path) < target_len and nodes:
-            idx = random.randrange(0, len(nodes))
-            input_node = nodes.pop(idx)
-            if not input_node.visited and input_node.linkable_letters:
-                l_idx = random.randrange(0, len(input_node.linkable_letters))
-                linkable_letter = input_node.linkable_letters.pop(l_idx)
-                if linkable_letter.links and not linkable_letter.linked:
-                    llidx = random.randrange(0, len(linkable_letter.links))
-                    link = linkable_letter.links.pop(llidx)
-                    pair_to_link = [input_node.word, link.target_node.word]
-                    pair_to_link.sort()
-                    hsh = f"{pair_to_link[0]}_{pair_to_link[1]}"
-                    if not link.used and hsh not in linked_pairs:
-                        current_path.append(link)
-                        linked_pairs.add(hsh)
-                        input_node.visited = True
-                        linkable_letter.linked = True
-                        link.used = True
-                        link.parent_letter.linked = True
-                        if len(current_path) == target_len:
-                            path_to_key = path_to_string(current_path)
-                            path_dict[path_to_key] = current_path
-    return path_dict
+        node_order = rng.sample(range(num_nodes), num_nodes)
+        for node_id in node_order:
+            if len(current_path) == target_len:
+                break
+            node_bit = 1 << node_id
+            letters = input_graph.letter_links[node_id]
+            if state.visited & node_bit or not letters:
+                continue
+            link_ids = letters[rng.randrange(0, len(letters))]
+            if not link_ids:
+                continue
+            link_id = link_ids[rng.randrange(0, len(link_ids))]
+            link_bit = 1 << link_id
+            a, b = sorted((node_id, input_graph.link_target[link_id]))
+            pair_bit = 1 << (a * num_nodes + b)
+            if not state.used_links & link_bit and not state.linked_pairs & pair_bit:
+                current_path.append(link_id)
+                state.linked_pairs |= pair_bit
+                state.visited |= node_bit
+                state.used_links |= link_bit
+        if len(current_path) == target_len:
+            path_dict[tuple(current_path)] = None
+    telemetry.count("search.iterations", current_iteration)
+    telemetry.count("search.pathes", len(path_dict))
+    return list(path_dict)
 
 
 def path_to_string(path: List[NodeLink]):
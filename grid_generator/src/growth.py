@@ -0,0 +1,260 @@
+"""Large puzzles, grown one word at a time from a seed word.
+
+Path search samples spanning trees of crossings for a word set picked
+beforehand, its success rate collapses past a dozen words. GrowthFiller
+places a seed word on a fill_engine Board instead and attaches every next
+word across a letter already on the board, so the grid is valid at every
+step and a 50 word grid takes a few hundred placements.
+
+A SlotIndex keeps the free crossing slots of the board: cells holding a
+letter that only one word goes through yet, by letter, with the
+orientation a crossing word would take. Words of a given word list are
+matched against the slots of their letters. Words drawn from the
+dictionary come from its letter index, (slot letter, position, length)
+postings narrowed to the picker's frequency band, so no candidate is
+scanned that cannot cross the slot.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+import random
+
+from grid_generator.src.fill_engine import Board
+from grid_generator.src.grid_generator import (
+    Grid,
+    WordInGrid,
+    WordOrientation,
+    WordPicker,
+)
+from grid_generator.src.telemetry import telemetry
+
+
+Cell = Tuple[int, int]
+# Start x, start y and orientation of a word.
+Placement = Tuple[int, int, str]
+
+_STEP = {
+    WordOrientation.Horizontal: (1, 0),
+    WordOrientation.Vertical: (0, 1),
+}
+_ACROSS = {
+    WordOrientation.Horizontal: WordOrientation.Vertical,
+    WordOrientation.Vertical: WordOrientation.Horizontal,
+}
+
+
+class SlotIndex:
+    """Free crossing slots of a board, letter -> {cell: free orientation}."""
+
+    def __init__(self):
+        self.by_letter: Dict[str, Dict[Cell, str]] = defaultdict(dict)
+        # Illegal placements tried through a slot, see fail.
+        self.failures: Dict[Cell, int] = defaultdict(int)
+
+    def __len__(self):
+        return sum(len(slots) for slots in self.by_letter.values())
+
+    def add_word(self, board: Board, word_in_grid: WordInGrid):
+        """Updates the slots of the cells word_in_grid goes through."""
+        dx, dy = _STEP[word_in_grid.orientation]
+        for idx, letter in enumerate(word_in_grid.word):
+            cell = (word_in_grid.x_start + idx * dx, word_in_grid.y_start + idx * dy)
+            if len(board.orientations[cell]) > 1:
+                self.by_letter[letter].pop(cell, None)
+            else:
+                self.by_letter[letter][cell] = _ACROSS[word_in_grid.orientation]
+
+    def slots(self) -> List[Tuple[str, Cell, str]]:
+        return [
+            (letter, cell, orientation)
+            for letter, slots in self.by_letter.items()
+            for cell, orientation in slots.items()
+        ]
+
+    def placements(self, word: str) -> List[Placement]:
+        """Placements of word crossing it over a free slot of its letters."""
+        placements = []
+        for idx, letter in enumerate(word):
+            for (x, y), orientation in self.by_letter.get(letter, {}).items():
+                dx, dy = _STEP[orientation]
+                placements.append((x - idx * dx, y - idx * dy, orientation))
+        return placements
+
+    def fail(self, letter: str, cell: Cell, max_failures=16):
+        """Counts an illegal placement through a slot, a slot failing
+        max_failures times is most likely boxed in and is dropped."""
+        self.failures[cell] += 1
+        if self.failures[cell] >= max_failures:
+            self.by_letter[letter].pop(cell, None)
+
+
+class GrowthFiller:
+    """Grows a grid from a seed word, see the module docstring.
+
+    Every step collects up to `candidates` legal placements and keeps the
+    one that grows the bounding box least, then crosses the most words.
+    Placements making the grid wider than max_width or higher than
+    max_height are never made. Growth stops when `retries` scans of the
+    free slots in a row place no word.
+    """
+
+    def __init__(
+        self,
+        word_picker: WordPicker,
+        min_length=4,
+        max_length=8,
+        candidates=16,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None,
+        retries=3,
+    ):
+        self.word_picker = word_picker
+        self.min_length = min_length
+        self.max_length = max_length
+        self.candidates = candidates
+        self.max_width = max_width
+        self.max_height = max_height
+        self.retries = retries
+
+    def grow(
+        self,
+        num_words,
+        words: Sequence[str] = (),
+        rng: Optional[random.Random] = None,
+        difficulty: Optional[str] = None,
+        seed_orientation=WordOrientation.Horizontal,
+        cancel=None,
+    ) -> Optional[Grid]:
+        """Grid of num_words words including every word of words, None when
+        the grid stops growing before."""
+        rng = rng or random.Random()
+        board = Board()
+        slots = SlotIndex()
+        required = sorted(set(words), key=lambda word: (-len(word), word))
+        if required:
+            seed = required.pop(0)
+        else:
+            seed = self._seed_word(rng, difficulty)
+            if seed is None:
+                return None
+        slots.add_word(board, board.place(seed, 0, 0, seed_orientation))
+
+        while required:
+            if cancel is not None and cancel.is_cancelled():
+                return None
+            placed = self._place_required(board, slots, required, rng)
+            if placed is None:
+                telemetry.count("growth.stalled")
+                return None
+            required.remove(placed)
+
+        band = self.word_picker.band(difficulty or self.word_picker.difficulty)
+        while len(board.placed) < num_words:
+            if cancel is not None and cancel.is_cancelled():
+                return None
+            # Words are drawn at random, a slot may just have been unlucky.
+            if not any(
+                self._place_from_dictionary(board, slots, band, rng)
+                for _ in range(self.retries)
+            ):
+                telemetry.count("growth.stalled")
+                return None
+        telemetry.count("growth.words", len(board.placed))
+        return board.to_grid()
+
+    def _seed_word(self, rng, difficulty) -> Optional[str]:
+        buckets = self.word_picker.buckets(difficulty or self.word_picker.difficulty)
+        word_id = buckets.sample(rng, self.min_length, self.max_length)
+        if word_id is None:
+            return None
+        return self.word_picker.word_dictionary.unique_words[word_id]
+
+    @staticmethod
+    def _size_with(board: Board, word: str, placement: Placement) -> Tuple[int, int]:
+        x, y, orientation = placement
+        dx, dy = _STEP[orientation]
+        end_x = x + (len(word) - 1) * dx
+        end_y = y + (len(word) - 1) * dy
+        width = max(board.max_x, end_x) - min(board.min_x, x) + 1
+        height = max(board.max_y, end_y) - min(board.min_y, y) + 1
+        return width, height
+
+    def _rank(self, board: Board, word: str, placement: Placement, crossings: int):
+        """Sort key of a legal placement, None if it does not fit the bounds.
+
+        The longest side grows last, so grids stay about square instead of
+        growing along the seed word.
+        """
+        width, height = self._size_with(board, word, placement)
+        if (self.max_width is not None and width > self.max_width) or (
+            self.max_height is not None and height > self.max_height
+        ):
+            return None
+        return max(width, height), width * height, -crossings
+
+    def _place_required(
+        self, board: Board, slots: SlotIndex, required: List[str], rng
+    ) -> Optional[str]:
+        """Places the required word with the best placement, returns it."""
+        best = None
+        for word in required:
+            for placement in slots.placements(word):
+                crossings = board.crossings(word, *placement)
+                if crossings <= 0:
+                    continue
+                rank = self._rank(board, word, placement, crossings)
+                if rank is None:
+                    continue
+                # Ties are broken at random, so a retry grows another grid.
+                rank += (rng.random(),)
+                if best is None or rank < best[0]:
+                    best = (rank, word, placement)
+        if best is None:
+            return None
+        _, word, placement = best
+        slots.add_word(board, board.place(word, *placement))
+        return word
+
+    def _place_from_dictionary(
+        self, board: Board, slots: SlotIndex, band: range, rng: random.Random
+    ) -> bool:
+        """Attaches a dictionary word of the band to a random free slot."""
+        word_dictionary = self.word_picker.word_dictionary
+        postings = word_dictionary.letter_index.postings
+        unique_words = word_dictionary.unique_words
+        free = slots.slots()
+        rng.shuffle(free)
+        found = []
+        for letter, (x, y), orientation in free:
+            dx, dy = _STEP[orientation]
+            for _ in range(4):
+                length = rng.randint(self.min_length, self.max_length)
+                position = rng.randrange(length)
+                ids = postings.get((letter, position, length))
+                if not ids:
+                    continue
+                # Postings are sorted word ids, a band is a slice of them.
+                low = bisect_left(ids, band.start)
+                high = bisect_left(ids, band.stop)
+                if low == high:
+                    continue
+                word = unique_words[ids[rng.randrange(low, high)]]
+                if word in board.placed:
+                    continue
+                placement = (x - position * dx, y - position * dy, orientation)
+                crossings = board.crossings(word, *placement)
+                if crossings <= 0:
+                    slots.fail(letter, (x, y))
+                    continue
+                rank = self._rank(board, word, placement, crossings)
+                if rank is None:
+                    continue
+                found.append((rank, word, placement))
+                break
+            if len(found) >= self.candidates:
+                break
+        if not found:
+            return False
+        _, word, placement = min(found)
+        slots.add_word(board, board.place(word, *placement))
+        return True
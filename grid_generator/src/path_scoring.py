@@ -0,0 +1,124 @@
+"""Scores candidate pathes from the flat link arrays of a WordGraph.
+
+Word coordinates follow the link chain (origin, target, index_a, index_b)
+with place_path, as CrossWordGame._node_links_to_grid does, without building
+a Grid. That gives the bounding box area of every path and rejects pathes
+whose words overwrite a different letter, run along a parallel word, or
+extend another word at either end. Those pathes can never make a valid
+grid, the remaining ones are materialized smallest first.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Start x, start y and whether the word is vertical, per node id.
+Layout = List[Optional[Tuple[int, int, bool]]]
+
+
+# Origin node, target node, crossing index in the origin word and in the
+# target word of a link.
+Edge = Tuple[int, int, int, int]
+
+
+def place_path(
+    num_nodes: int, edges: Sequence[Edge]
+) -> Optional[Tuple[Layout, List[int]]]:
+    """Places the nodes of a path breadth first, every node exactly once.
+
+    The origin of the first edge is horizontal at (0, 0), every other node
+    is placed across the first placed node it is linked to. Returns the
+    layout and the placement order, None as soon as an edge between two
+    placed nodes does not match their positions, or when a node is never
+    reached.
+    """
+    adjacency: List[List[Tuple[int, int, int]]] = [[] for _ in range(num_nodes)]
+    for origin, target, index_a, index_b in edges:
+        adjacency[origin].append((target, index_a, index_b))
+        adjacency[target].append((origin, index_b, index_a))
+    layout: Layout = [None] * num_nodes
+    start = edges[0][0]
+    layout[start] = (0, 0, False)
+    order = [start]
+    for node in order:
+        x, y, vertical = layout[node]
+        for other, own_index, other_index in adjacency[node]:
+            if vertical:
+                placement = (x - other_index, y + own_index, False)
+            else:
+                placement = (x + own_index, y - other_index, True)
+            if layout[other] is None:
+                layout[other] = placement
+                order.append(other)
+            elif layout[other] != placement:
+                return None
+    if len(order) < num_nodes:
+        return None
+    return layout, order
+
+
+def layout_path(graph, link_ids: Sequence[int]) -> Optional[Layout]:
+    """Places the nodes of a path, None if the path cannot be placed."""
+    if not link_ids:
+        return None
+    placed = place_path(
+        len(graph.nodes),
+        [
+            (
+                graph.link_origin[link_id],
+                graph.link_target[link_id],
+                graph.link_index_a[link_id],
+                graph.link_index_b[link_id],
+            )
+            for link_id in link_ids
+        ],
+    )
+    return placed[0] if placed is not None else None
+
+
+def score_layout(words: Sequence[str], layout: Layout) -> Optional[Tuple[int, float]]:
+    """(bounding box area, letters per cell) of a layout, None on a conflict."""
+    cells: Dict[Tuple[int, int], Tuple[str, int]] = {}
+    min_x = min_y = 0
+    max_x = max_y = 0
+    letters = 0
+    for word, (x, y, vertical) in zip(words, layout):
+        dx, dy = (0, 1) if vertical else (1, 0)
+        bit = 2 if vertical else 1
+        for idx, char in enumerate(word):
+            cell = (x + idx * dx, y + idx * dy)
+            existing = cells.get(cell)
+            if existing is None:
+                cells[cell] = (char, bit)
+                letters += 1
+            elif existing[0] != char or existing[1] & bit:
+                return None
+            else:
+                cells[cell] = (char, existing[1] | bit)
+        end_x = x + (len(word) - 1) * dx
+        end_y = y + (len(word) - 1) * dy
+        min_x, min_y = min(min_x, x), min(min_y, y)
+        max_x, max_y = max(max_x, end_x), max(max_y, end_y)
+    for word, (x, y, vertical) in zip(words, layout):
+        dx, dy = (0, 1) if vertical else (1, 0)
+        if (x - dx, y - dy) in cells or (
+            x + len(word) * dx,
+            y + len(word) * dy,
+        ) in cells:
+            return None
+    area = (max_x - min_x + 1) * (max_y - min_y + 1)
+    return area, letters / area
+
+
+def score_pathes(graph, path_ids: Sequence[Sequence[int]]) -> List[Tuple[int, float, int]]:
+    """(area, density, path index) of every path that may make a valid
+    grid, smallest area first, ties in path order."""
+    words = [node.word for node in graph.nodes]
+    scores = []
+    for path_idx, link_ids in enumerate(path_ids):
+        layout = layout_path(graph, link_ids)
+        if layout is None:
+            continue
+        score = score_layout(words, layout)
+        if score is not None:
+            scores.append((score[0], score[1], path_idx))
+    scores.sort(key=lambda score: (score[0], score[2]))
+    return scores
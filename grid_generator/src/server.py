@@ -0,0 +1,325 @@
+"""Asyncio HTTP endpoint serving puzzles from a warm GeneratorService.
+
+Puzzles of every prefetched (num_words, difficulty) are generated ahead of
+time into a bounded buffer, refilled in the background as it is drained,
+so most requests are answered with JSON serialized beforehand. When the
+buffer of a request is empty, or it asks for a size that is not
+prefetched, the puzzle is generated on demand within a deadline.
+
+    GET /puzzle?num_words=6&difficulty=easy   one puzzle, JSON
+    GET /health                               buffer fill levels, JSON
+    GET /metrics                              telemetry, Prometheus text
+
+Only the parts of HTTP/1.1 these endpoints need are implemented: request
+bodies are ignored and connections are kept alive unless the client asks
+otherwise.
+"""
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import json
+import time
+
+from grid_generator.src.grid_generator import (
+    Difficulty,
+    FillEngine,
+    GenerationStrategy,
+)
+from grid_generator.src.service import GeneratorService
+from grid_generator.src.telemetry import render_prometheus, telemetry
+
+
+# Puzzle size and difficulty band of a buffer.
+BufferKey = Tuple[int, Optional[str]]
+
+MIN_WORDS = 2
+MAX_WORDS = 30
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PuzzleServer:
+    """Serves puzzles generated by service, see the module docstring.
+
+    Every key of prefetch gets a buffer of up to buffer_size puzzles.
+    On-demand generation gives up after deadline seconds. Refills keep
+    reserved_workers workers of the service free for on-demand puzzles,
+    and start no new game while one is pending, so on-demand puzzles do
+    not queue behind them.
+    """
+
+    def __init__(
+        self,
+        service: GeneratorService,
+        prefetch: Iterable[BufferKey] = ((6, None),),
+        buffer_size=8,
+        deadline=5.0,
+        max_pathes=100,
+        engine=FillEngine.Random,
+        reserved_workers=1,
+    ):
+        self.service = service
+        self.buffer_size = buffer_size
+        self.deadline = deadline
+        self.max_pathes = max_pathes
+        self.engine = engine
+        self.buffers: Dict[BufferKey, Deque[bytes]] = {
+            key: deque(maxlen=buffer_size) for key in prefetch
+        }
+        self.refill_slots = max(1, service.workers - reserved_workers)
+        self._refilling = 0
+        self._on_demand = 0
+        # Set when a refill may start a game: a puzzle was taken, a game
+        # completed or an on-demand request finished.
+        self._wake: Dict[BufferKey, asyncio.Event] = {}
+        self._tasks = []
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host="127.0.0.1", port=8080) -> int:
+        """Starts filling the buffers and listening, returns the bound port
+        (port=0 picks a free one)."""
+        for key in self.buffers:
+            self._wake[key] = asyncio.Event()
+            self._tasks.append(asyncio.create_task(self._refill(key)))
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _submit(self, key: BufferKey, time_budget=None) -> asyncio.Future:
+        num_words, difficulty = key
+        return asyncio.wrap_future(
+            self.service.submit_puzzle(
+                num_words=num_words,
+                max_pathes=self.max_pathes,
+                engine=self.engine,
+                difficulty=difficulty,
+                time_budget=time_budget,
+                # Within a deadline the first grid found is good enough.
+                strategy=GenerationStrategy.First
+                if time_budget is not None
+                else GenerationStrategy.Best,
+            )
+        )
+
+    @staticmethod
+    def _encode(puzzle: dict, difficulty: Optional[str]) -> bytes:
+        puzzle["difficulty"] = difficulty
+        return json.dumps(puzzle, separators=(",", ":")).encode("utf-8")
+
+    def _wake_all(self):
+        for wake in self._wake.values():
+            wake.set()
+
+    async def _refill(self, key: BufferKey):
+        """Keeps the buffer of key full, with as many games in flight as it
+        misses and the refill slots allow."""
+        buffer = self.buffers[key]
+        wake = self._wake[key]
+        pending = set()
+        try:
+            while True:
+                wake.clear()
+                while (
+                    len(buffer) + len(pending) < self.buffer_size
+                    and self._refilling < self.refill_slots
+                    and not self._on_demand
+                ):
+                    self._refilling += 1
+                    pending.add(self._submit(key))
+                waiter = asyncio.ensure_future(wake.wait())
+                done, _ = await asyncio.wait(
+                    pending | {waiter}, return_when=asyncio.FIRST_COMPLETED
+                )
+                waiter.cancel()
+                for future in done - {waiter}:
+                    pending.discard(future)
+                    self._refilling -= 1
+                    self._wake_all()
+                    if future.cancelled():
+                        continue
+                    if future.exception() is not None:
+                        telemetry.count("server.prefetch_errors")
+                        continue
+                    puzzle = future.result()
+                    if puzzle is not None:
+                        buffer.append(self._encode(puzzle, key[1]))
+                        telemetry.count("server.prefetched")
+        finally:
+            for future in pending:
+                future.cancel()
+            self._refilling -= len(pending)
+
+    async def get_puzzle(self, num_words=6, difficulty=None) -> bytes:
+        """JSON of a puzzle, from the buffer when possible.
+
+        Raises HTTPError(503) when on-demand generation misses the deadline
+        or fails.
+        """
+        key = (num_words, difficulty)
+        buffer = self.buffers.get(key)
+        if buffer:
+            puzzle = buffer.popleft()
+            self._wake[key].set()
+            telemetry.count("server.puzzles", source="buffer")
+            return puzzle
+        telemetry.count("server.puzzles", source="on_demand")
+        self._on_demand += 1
+        try:
+            # The worker stops searching at the deadline too.
+            future = self._submit(key, time_budget=self.deadline)
+            puzzle = await asyncio.wait_for(future, self.deadline + 1)
+        except asyncio.TimeoutError:
+            puzzle = None
+        except Exception:
+            telemetry.count("server.on_demand_errors")
+            puzzle = None
+        finally:
+            self._on_demand -= 1
+            self._wake_all()
+        if puzzle is None:
+            telemetry.count("server.unavailable")
+            raise HTTPError(503, "No puzzle could be generated in time.")
+        return self._encode(puzzle, difficulty)
+
+    def health(self) -> dict:
+        return {
+            "buffers": [
+                {"num_words": num_words, "difficulty": difficulty, "ready": len(buffer)}
+                for (num_words, difficulty), buffer in self.buffers.items()
+            ],
+            "buffer_size": self.buffer_size,
+        }
+
+    async def _route(self, method, target) -> Tuple[bytes, str]:
+        """Response body and content type of a request."""
+        url = urlsplit(target)
+        if method != "GET":
+            raise HTTPError(405, f"Method {method} not allowed.")
+        if url.path == "/puzzle":
+            query = parse_qs(url.query)
+            try:
+                num_words = int(query.get("num_words", ["6"])[0])
+            except ValueError:
+                raise HTTPError(400, "num_words must be an integer.")
+            if not MIN_WORDS <= num_words <= MAX_WORDS:
+                raise HTTPError(
+                    400, f"num_words must be between {MIN_WORDS} and {MAX_WORDS}."
+                )
+            difficulty = query.get("difficulty", [None])[0]
+            if difficulty is not None and difficulty not in Difficulty.bands:
+                raise HTTPError(
+                    400, f"difficulty must be one of {sorted(Difficulty.bands)}."
+                )
+            return await self.get_puzzle(num_words, difficulty), "application/json"
+        if url.path == "/health":
+            return json.dumps(self.health()).encode("utf-8"), "application/json"
+        if url.path == "/metrics":
+            body = render_prometheus(telemetry.snapshot()).encode("utf-8")
+            return body, "text/plain; version=0.0.4"
+        raise HTTPError(404, f"No route for {url.path}.")
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                t0 = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    method, target, version = "", "", "HTTP/1.0"
+                keep_alive = headers.get("connection", "").lower() != "close" and (
+                    version == "HTTP/1.1"
+                    or headers.get("connection", "").lower() == "keep-alive"
+                )
+                try:
+                    if not method:
+                        raise HTTPError(400, "Malformed request line.")
+                    status = 200
+                    body, content_type = await self._route(method, target)
+                except HTTPError as error:
+                    status = error.status
+                    body = json.dumps({"error": error.message}).encode("utf-8")
+                    content_type = "application/json"
+                except Exception:
+                    telemetry.count("server.errors")
+                    status = 500
+                    body = json.dumps({"error": "Internal error."}).encode("utf-8")
+                    content_type = "application/json"
+                head = (
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n"
+                )
+                writer.write(head.encode("latin-1") + body)
+                await writer.drain()
+                telemetry.observe(
+                    "server.request", time.perf_counter() - t0, status=status
+                )
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(
+    dictionary_path,
+    host="127.0.0.1",
+    port=8080,
+    workers=None,
+    prefetch: Iterable[BufferKey] = ((6, None),),
+    buffer_size=8,
+    deadline=5.0,
+    **picker_kwargs,
+):
+    """Runs a PuzzleServer until cancelled."""
+    with GeneratorService(dictionary_path, workers=workers, **picker_kwargs) as service:
+        async with PuzzleServer(
+            service, prefetch=prefetch, buffer_size=buffer_size, deadline=deadline
+        ) as server:
+            port = await server.start(host, port)
+            print(f"Serving puzzles on http://{host}:{port}")
+            await server.server.serve_forever()
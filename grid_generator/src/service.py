@@ -0,0 +1,209 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
+import multiprocessing as mp
+import os
+import time
+
+from grid_generator.src.grid_generator import (
+    CrossWordGame,
+    FillEngine,
+    GenerationStrategy,
+    Grid,
+    WordPicker,
+)
+from grid_generator.src.telemetry import telemetry
+
+
+# The picker of the service owning this worker process, see _init_worker.
+_worker_word_picker: Optional[WordPicker] = None
+# Per worker memory tier, the disk tier is shared by every worker.
+_worker_cache = None
+
+
+def _init_worker(word_picker: WordPicker, cache_dir=None):
+    """word_picker is inherited from the parent when the pool forks, or
+    unpickled onto the parent's shared memory."""
+    global _worker_word_picker, _worker_cache
+    # Forked workers start with a copy of the parent's metrics.
+    telemetry.reset()
+    _worker_word_picker = word_picker
+    if cache_dir is not None:
+        from grid_generator.src.cache import PuzzleCache
+
+        _worker_cache = PuzzleCache(cache_dir)
+
+
+def _run_task(function, *args):
+    """Runs a task in a worker, returns its result and the worker's metrics."""
+    with telemetry.timer("worker.busy", worker=os.getpid()):
+        result = function(*args)
+    telemetry.count("worker.tasks", worker=os.getpid())
+    return result, telemetry.collect()
+
+
+def _generate_grid(
+    num_words, max_pathes, engine, words=None, objective=None
+) -> Optional[Grid]:
+    game = CrossWordGame(
+        _worker_word_picker,
+        num_words=num_words,
+        max_pathes=max_pathes,
+        threads=1,
+        engine=engine,
+        words=words,
+        cache=_worker_cache,
+        objective=objective,
+    )
+    return game.grid
+
+
+def _generate_puzzle(
+    num_words,
+    max_pathes,
+    engine,
+    seed,
+    words=None,
+    objective=None,
+    difficulty=None,
+    time_budget=None,
+    strategy=GenerationStrategy.Best,
+) -> Optional[dict]:
+    t0 = time.perf_counter()
+    game = CrossWordGame(
+        _worker_word_picker,
+        num_words=num_words,
+        max_pathes=max_pathes,
+        threads=1,
+        engine=engine,
+        seed=seed,
+        words=words,
+        cache=_worker_cache,
+        objective=objective,
+        difficulty=difficulty,
+        time_budget=time_budget,
+        strategy=strategy,
+    )
+    if game.grid is None:
+        return None
+    puzzle = game.to_dict()
+    puzzle["seed"] = game.seed
+    puzzle["elapsed"] = round(time.perf_counter() - t0, 6)
+    return puzzle
+
+
+class GeneratorService:
+    """Long-lived pool of generation workers.
+
+    Every worker holds its own WordPicker, loaded once for the lifetime of
+    the pool, and serves many game requests. The dictionary is loaded once
+    in the parent: forked workers share it copy-on-write, spawned workers
+    map it from shared memory (see WordPicker.__getstate__). With a
+    cache_dir, workers cache grids per word set (see PuzzleCache). Metrics
+    recorded by the workers are merged into this process' telemetry as
+    their tasks complete.
+
+    Usage:
+        with GeneratorService("data/enriched_dictionary_en.json") as service:
+            futures = [service.submit(num_words=6) for _ in range(10)]
+            grids = [future.result() for future in futures]
+    """
+
+    def __init__(self, dictionary_path, workers=None, cache_dir=None, **picker_kwargs):
+        # Every service hands its own picker to its workers. It is kept so
+        # the shared memory of the dictionary outlives spawned workers.
+        self.word_picker = WordPicker(dictionary_path, **picker_kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context(),
+            initializer=_init_worker,
+            initargs=(self.word_picker, cache_dir),
+        )
+        self.started = time.perf_counter()
+
+    def _submit(self, function, *args) -> Future:
+        future = Future()
+        task = self.executor.submit(_run_task, function, *args)
+
+        def done(task: Future):
+            if task.cancelled():
+                future.cancel()
+                return
+            if task.exception() is None:
+                result, metrics = task.result()
+                telemetry.merge(metrics)
+            if not future.set_running_or_notify_cancel():
+                return
+            if task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(result)
+
+        task.add_done_callback(done)
+        # Cancelling the returned future drops the task if it did not start.
+        future.add_done_callback(lambda future: future.cancelled() and task.cancel())
+        return future
+
+    def submit(
+        self,
+        num_words=6,
+        max_pathes=100,
+        engine=FillEngine.Random,
+        words: Optional[Sequence[str]] = None,
+        objective=None,
+    ) -> "Future[Optional[Grid]]":
+        """Queues a game, the future resolves to its Grid (None on failure).
+
+        words fixes the word set instead of picking num_words words, see
+        CrossWordGame for objective.
+        """
+        return self._submit(
+            _generate_grid, num_words, max_pathes, engine, words, objective
+        )
+
+    def submit_puzzle(
+        self,
+        num_words=6,
+        max_pathes=100,
+        engine=FillEngine.Random,
+        seed=None,
+        words: Optional[Sequence[str]] = None,
+        objective=None,
+        difficulty: Optional[str] = None,
+        time_budget: Optional[float] = None,
+        strategy=GenerationStrategy.Best,
+    ) -> "Future[Optional[dict]]":
+        """Queues a game, the future resolves to CrossWordGame.to_dict() plus
+        its seed and generation time (None on failure). See CrossWordGame
+        for the other arguments."""
+        return self._submit(
+            _generate_puzzle,
+            num_words,
+            max_pathes,
+            engine,
+            seed,
+            words,
+            objective,
+            difficulty,
+            time_budget,
+            strategy,
+        )
+
+    def utilization(self) -> Dict[str, float]:
+        """Busy fraction of every worker since the service started, from the
+        metrics of its completed tasks."""
+        uptime = time.perf_counter() - self.started
+        return {
+            dict(labels)["worker"]: total / uptime
+            for (name, labels), (_, total, _) in telemetry.timers.items()
+            if name == "worker.busy"
+        }
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,167 @@
+"""Read-only buffers shared with worker processes by name.
+
+A buffer is published once into multiprocessing.shared_memory by the
+parent, and a SharedBuffer handle (its name and size) is all that is sent
+to the workers, which map the same pages. Two buffers are published this
+way, both in the section layout of compiled_dictionary:
+
+    the dictionary of a WordPicker, when the picker is pickled for a
+    spawned worker (see WordPicker.__getstate__)
+
+    the link arrays of a WordGraph, for the workers of a parallel path
+    search (see WordGraph.parallelized_generate_all_pathes)
+
+Workers then start in a time and memory that do not depend on the size of
+the dictionary. The process that published a buffer unlinks it.
+"""
+from array import array
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Tuple
+import sys
+import weakref
+
+from grid_generator.src.compiled_dictionary import (
+    CompiledWordDictionary,
+    compiled_bytes,
+    pack_sections,
+    read_sections,
+)
+
+
+GRAPH_MAGIC = b"CWGRAPH1"
+
+_GRAPH_SECTION_TYPES = {
+    "origin": "H",
+    "target": "H",
+    "index_a": "B",
+    "index_b": "B",
+    # letter_links: node n spans letters nodes[n] to nodes[n + 1], letter l
+    # spans the link ids links[letters[l]] to links[letters[l + 1]].
+    "nodes": "I",
+    "letters": "I",
+    "links": "I",
+}
+
+
+@dataclass(frozen=True)
+class SharedBuffer:
+    name: str
+    size: int
+
+
+class _AttachedMemory(shared_memory.SharedMemory):
+    # Views of an attached buffer usually live as long as the worker, they
+    # may still be referenced when the interpreter tears the segment down.
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+class _PublishedMemory(shared_memory.SharedMemory):
+    def release(self):
+        """Closes and unlinks the segment now rather than when collected."""
+        if self._finalizer.detach() is not None:
+            self.close()
+            self.unlink()
+
+
+def publish(data) -> Tuple[_PublishedMemory, SharedBuffer]:
+    """Copies data (bytes-like) into a new shared memory segment, which is
+    unlinked by release() or once the returned memory is garbage collected."""
+    size = len(data)
+    memory = _PublishedMemory(create=True, size=max(1, size))
+    memory.buf[:size] = data
+    memory._finalizer = weakref.finalize(memory, _unlink, memory.name)
+    return memory, SharedBuffer(memory.name, size)
+
+
+def _unlink(name):
+    try:
+        segment = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def attach(handle: SharedBuffer) -> shared_memory.SharedMemory:
+    """Maps a published segment, the attaching process never unlinks it."""
+    if sys.version_info >= (3, 13):
+        return _AttachedMemory(handle.name, track=False)
+    # Before 3.13 attaching registers the segment again, with the resource
+    # tracker the workers inherit from the publisher: it stays registered
+    # once, until the publisher unlinks it.
+    return _AttachedMemory(handle.name)
+
+
+def publish_dictionary(word_dictionary) -> Tuple[_PublishedMemory, SharedBuffer]:
+    """Publishes the compiled form of word_dictionary, mapped as is when it
+    is already compiled."""
+    if isinstance(word_dictionary, CompiledWordDictionary):
+        return publish(word_dictionary.buffer)
+    return publish(compiled_bytes(word_dictionary))
+
+
+def attach_dictionary(handle: SharedBuffer) -> CompiledWordDictionary:
+    memory = attach(handle)
+    word_dictionary = CompiledWordDictionary(buffer=memory.buf[: handle.size])
+    word_dictionary.shared_memory = memory
+    return word_dictionary
+
+
+def publish_graph(graph) -> Tuple[_PublishedMemory, SharedBuffer]:
+    """Publishes the flat link arrays of a WordGraph."""
+    node_off = [0]
+    letter_off = [0]
+    link_ids = []
+    for node_letters in graph.letter_links:
+        for letter_link_ids in node_letters:
+            link_ids.extend(letter_link_ids)
+            letter_off.append(len(link_ids))
+        node_off.append(len(letter_off) - 1)
+    sections = {
+        "origin": graph.link_origin,
+        "target": graph.link_target,
+        "index_a": graph.link_index_a,
+        "index_b": graph.link_index_b,
+        "nodes": array("I", node_off),
+        "letters": array("I", letter_off),
+        "links": array("I", link_ids),
+    }
+    return publish(pack_sections(GRAPH_MAGIC, sections, _GRAPH_SECTION_TYPES))
+
+
+class SharedGraph:
+    """The link arrays of a published WordGraph, as the randomized path
+    search reads them. Link ids are those of the published graph."""
+
+    def __init__(self, handle: SharedBuffer):
+        self.memory = attach(handle)
+        sections = read_sections(
+            self.memory.buf[: handle.size], GRAPH_MAGIC, _GRAPH_SECTION_TYPES
+        )
+        self.link_origin = sections["origin"]
+        self.link_target = sections["target"]
+        self.link_index_a = sections["index_a"]
+        self.link_index_b = sections["index_b"]
+        node_off = sections["nodes"]
+        letter_off = sections["letters"]
+        link_ids = sections["links"]
+        self.letter_links = [
+            [
+                link_ids[letter_off[letter] : letter_off[letter + 1]]
+                for letter in range(node_off[node], node_off[node + 1])
+            ]
+            for node in range(len(node_off) - 1)
+        ]
+        self.nodes = range(len(self.letter_links))
+
+    def close(self):
+        """Releases the views, then the mapping."""
+        self.letter_links = []
+        self.link_origin = self.link_target = None
+        self.link_index_a = self.link_index_b = None
+        self.memory.close()
@@ -0,0 +1,190 @@
+"""Counters, stage timers and progress messages of the grid generator.
+
+Every process has a single Telemetry, ``telemetry``. Library code counts
+events and times stages on it, and what it recorded is written to a sink
+(in memory, JSON lines or Prometheus text) on flush(). Worker processes
+send what they recorded back with their results, see collect() and merge().
+Progress messages go through telemetry.log and are only printed when
+verbose.
+"""
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import time
+
+
+# Metric name and its sorted (label, value) pairs.
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name, labels) -> MetricKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+class Telemetry:
+    def __init__(self, sink=None, verbose=False):
+        self.sink = sink
+        self.verbose = verbose
+        self.counters: Dict[MetricKey, float] = {}
+        # count, total seconds, max seconds
+        self.timers: Dict[MetricKey, List[float]] = {}
+
+    def log(self, *args, **kwargs):
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def count(self, name, value=1, **labels):
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        timer = self.timers.get(key)
+        if timer is None:
+            self.timers[key] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> dict:
+        """JSON serializable copy of everything recorded."""
+        return {
+            "counters": [
+                [name, dict(labels), value]
+                for (name, labels), value in sorted(self.counters.items())
+            ],
+            "timers": [
+                [name, dict(labels), count, total, longest]
+                for (name, labels), (count, total, longest) in sorted(
+                    self.timers.items()
+                )
+            ],
+        }
+
+    def merge(self, snapshot: dict):
+        """Adds a snapshot recorded elsewhere, e.g. in a worker process."""
+        for name, labels, value in snapshot["counters"]:
+            self.count(name, value, **labels)
+        for name, labels, count, total, longest in snapshot["timers"]:
+            key = _key(name, labels)
+            timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += count
+            timer[1] += total
+            timer[2] = max(timer[2], longest)
+
+    def reset(self):
+        self.counters = {}
+        self.timers = {}
+
+    def collect(self) -> dict:
+        """Snapshot of what was recorded since the last collect, for workers."""
+        snapshot = self.snapshot()
+        self.reset()
+        return snapshot
+
+    def flush(self):
+        if self.sink is not None:
+            self.sink.write(self.snapshot())
+
+
+class MemorySink:
+    def __init__(self):
+        self.snapshots: List[dict] = []
+
+    def write(self, snapshot: dict):
+        self.snapshots.append(snapshot)
+
+
+class JsonlSink:
+    """Appends one line per flush, processes may share the file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def write(self, snapshot: dict):
+        line = json.dumps({"time": time.time(), "pid": os.getpid(), **snapshot})
+        with open(self.path, "a", encoding="utf-8") as fp:
+            fp.write(line + "\n")
+
+
+def _prometheus_name(name, prefix="crossword") -> str:
+    return f"{prefix}_{name}".replace(".", "_").replace("-", "_")
+
+
+def _prometheus_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for label, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{label}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """Prometheus text exposition of a snapshot. Counters get a _total
+    suffix, timers are summaries in seconds plus a _max gauge."""
+    # Family name -> (type, sample lines), samples of a family stay together.
+    families: Dict[str, Tuple[str, List[str]]] = {}
+
+    def add(family, kind, sample):
+        families.setdefault(family, (kind, []))[1].append(sample)
+
+    for name, labels, value in snapshot["counters"]:
+        metric = _prometheus_name(name) + "_total"
+        add(metric, "counter", f"{metric}{_prometheus_labels(labels)} {value}")
+    for name, labels, count, total, longest in snapshot["timers"]:
+        metric = _prometheus_name(name) + "_seconds"
+        rendered = _prometheus_labels(labels)
+        add(metric, "summary", f"{metric}_count{rendered} {count}")
+        add(metric, "summary", f"{metric}_sum{rendered} {total:.6f}")
+        add(f"{metric}_max", "gauge", f"{metric}_max{rendered} {longest:.6f}")
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusSink:
+    """Rewrites a text file in the format of Prometheus' textfile collector."""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def write(self, snapshot: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            fp.write(render_prometheus(snapshot))
+        os.replace(tmp_path, self.path)
+
+
+def sink_for(path) -> Optional[object]:
+    """JsonlSink for .jsonl files, PrometheusSink for .prom files."""
+    if path is None:
+        return None
+    if str(path).endswith(".jsonl"):
+        return JsonlSink(path)
+    if str(path).endswith(".prom"):
+        return PrometheusSink(path)
+    raise ValueError(f"Unknown metrics file type: {path}, use .jsonl or .prom")
+
+
+telemetry = Telemetry()
+
+
+def configure(sink=None, verbose=False) -> Telemetry:
+    """Sets the sink and verbosity of this process' telemetry."""
+    telemetry.sink = sink
+    telemetry.verbose = verbose
+    return telemetry
@@ -1,5 +1,6 @@
-import sys
+import argparse
 
+from hint_builder.backends import backends
 from hint_builder.builders import english
 
 
@@ -9,17 +10,33 @@ supported_languages = {
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m hint_builder",
+        description="Appends hints to data/hints.txt, skipping words that "
+        "already have one.",
+    )
+    parser.add_argument(
+        "language", help=f"Supported languages: {supported_languages.keys()}"
+    )
+    parser.add_argument("--backend", default="transformers", choices=sorted(backends))
+    parser.add_argument(
+        "--batch-size", type=int, default=8, help="Words per forward pass."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Batches generated at once."
+    )
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
 
-    if len(sys.argv) < 2:
-        sys.exit(f"""Usage: {sys.argv[0]} [language-code]
-    
-    Supported languages: {supported_languages.keys()}
-""")
-    
-    language = sys.argv[1]
+    language = args.language
     try:
         dictionary_builder = supported_languages[language]
     except KeyError as exc:
         raise KeyError(f"Unsupported language: {language}") from exc
 
-    dictionary_builder.run()
+    dictionary_builder.run(
+        backend=args.backend,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        limit=args.limit,
+    )
@@ -0,0 +1,99 @@
+from typing import List
+
+
+PROMPT = """<s>[INST] You're an AI assistant help me build a cross-word puzzle.
+To make a good game, we need to give good hints to the player.
+For instance, given the word "horse", one might return the hint "Four-legged animal used throughly history as a mount".
+Help me by creating more hints, hints should be separated by a newline.
+For example:
+
+horse=Four-legged animal used throughly history as a mount.
+sun=Mass of glowing hot gases, the center of our solar system.
+
+[/INST]
+"""
+
+MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+MAX_TOKENS = 32
+
+
+class HintBackend:
+    """Generates one hint per word.
+
+    generate receives up to batch_size words at once, backends able to batch
+    run them in a single forward pass.
+    """
+
+    batch_size = 1
+
+    def generate(self, words: List[str]) -> List[str]:
+        raise NotImplementedError()
+
+
+class TransformersBackend(HintBackend):
+    """Batched greedy generation with a left-padded Hugging Face model."""
+
+    def __init__(self, model=MODEL, batch_size=8, max_tokens=MAX_TOKENS):
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(model, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(
+            model, load_in_8bit=True, device_map="auto"
+        )
+
+    def generate(self, words: List[str]) -> List[str]:
+        prompts = [PROMPT + word + "=" for word in words]
+        inputs = self.tokenizer(
+            prompts, return_tensors="pt", padding=True, add_special_tokens=False
+        ).to(self.model.device)
+        outputs = self.model.generate(
+            **inputs,
+            max_new_tokens=self.max_tokens,
+            do_sample=False,
+            pad_token_id=self.tokenizer.pad_token_id,
+        )
+        generated = outputs[:, inputs["input_ids"].shape[1] :]
+        texts = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        return [text.split("\n", 1)[0].strip() for text in texts]
+
+
+class GuidanceBackend(HintBackend):
+    """The original guidance program, one word per call."""
+
+    def __init__(self, model=MODEL):
+        from transformers import AutoTokenizer, MistralForCausalLM
+        import guidance
+
+        tokenizer = AutoTokenizer.from_pretrained(model, load_in_8bit=True)
+        model = MistralForCausalLM.from_pretrained(model, load_in_8bit=True)
+        llama = guidance.llms.Transformers(model, tokenizer)
+        guidance.llm = llama
+        self.program = guidance(
+            PROMPT
+            + """{{word}}={{gen 'description' stop="\\n" max_tokens=32}}
+"""
+        )
+
+    def generate(self, words: List[str]) -> List[str]:
+        return [self.program(word=word)["description"] for word in words]
+
+
+class StubBackend(HintBackend):
+    """Local stand-in for a model, for tests and dry runs."""
+
+    def __init__(self, batch_size=8):
+        self.batch_size = batch_size
+
+    def generate(self, words: List[str]) -> List[str]:
+        return [f"Hint for {word}." for word in words]
+
+
+backends = {
+    "transformers": TransformersBackend,
+    "guidance": GuidanceBackend,
+    "stub": StubBackend,
+}
@@ -1,43 +1,190 @@
 from tqdm import tqdm
+from typing import Iterator, List, Set
 import json
+import pathlib
+import queue
+import threading
+import time
+
+from hint_builder.backends import HintBackend, backends
+
+
+def read_words(data_dir) -> Iterator[str]:
+    """Unique dictionary words, streamed from dictionary_en.jsonl when the
+    dictionary builder left one, else loaded from dictionary_en.json."""
+    jsonl_path = pathlib.Path(data_dir) / "dictionary_en.jsonl"
+    seen = set()
+    if jsonl_path.exists():
+        with open(jsonl_path, "r", encoding="utf-8") as fp:
+            entries = (json.loads(line) for line in fp if line.strip())
+            for entry in entries:
+                if entry["word"] not in seen:
+                    seen.add(entry["word"])
+                    yield entry["word"]
+        return
+    with open(pathlib.Path(data_dir) / "dictionary_en.json", "r") as fp:
+        for entry in json.load(fp):
+            if entry["word"] not in seen:
+                seen.add(entry["word"])
+                yield entry["word"]
+
+
+def read_done(hints_path) -> Set[str]:
+    """Words that already have a hint in hints.txt."""
+    done = set()
+    if not hints_path.exists():
+        return done
+    with open(hints_path, "r", encoding="utf-8") as fp:
+        for line in fp:
+            word, sep, _ = line.partition("=")
+            if sep:
+                done.add(word)
+    return done
+
+
+class ThroughputMeter:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.words = 0
+        self.batches = 0
+        self.lock = threading.Lock()
+
+    def add(self, words):
+        with self.lock:
+            self.words += words
+            self.batches += 1
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.t0
+        return {
+            "words": self.words,
+            "batches": self.batches,
+            "elapsed": round(elapsed, 3),
+            "words_per_second": round(self.words / elapsed, 3) if elapsed else 0.0,
+        }
+
+
+def generate_hints(
+    backend: HintBackend,
+    words: Iterator[str],
+    fp,
+    concurrency=1,
+    progress=None,
+    retries=2,
+    retry_delay=1.0,
+) -> dict:
+    """Generates hints for words and appends "word=hint" lines to fp.
+
+    Batches of backend.batch_size words go through a bounded queue to
+    concurrency generator threads, a single thread writes the results.
+    A batch the backend fails on is tried again up to retries times, its
+    words are then reported and left without hints, for the next run.
+    Returns throughput metrics.
+    """
+    prompts: "queue.Queue[List[str]]" = queue.Queue(maxsize=concurrency * 2)
+    results: "queue.Queue[tuple]" = queue.Queue(maxsize=concurrency * 2)
+    meter = ThroughputMeter()
+    errors = []
+    failed = []
+    log = print if progress is None else progress.write
+
+    def produce():
+        batch = []
+        for word in words:
+            batch.append(word)
+            if len(batch) == backend.batch_size:
+                prompts.put(batch)
+                batch = []
+        if batch:
+            prompts.put(batch)
+        for _ in range(concurrency):
+            prompts.put(None)
+
+    def consume():
+        while True:
+            batch = prompts.get()
+            if batch is None:
+                results.put(None)
+                return
+            for attempt in range(retries + 1):
+                if attempt:
+                    time.sleep(retry_delay * 2 ** (attempt - 1))
+                try:
+                    hints = backend.generate(batch)
+                    if len(hints) != len(batch):
+                        raise ValueError(f"{len(hints)} hints for {len(batch)} words")
+                    error = None
+                    break
+                except Exception as exc:
+                    errors.append(exc)
+                    hints, error = None, exc
+            results.put((batch, hints, error))
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [
+        threading.Thread(target=consume, daemon=True) for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    finished = 0
+    while finished < concurrency:
+        item = results.get()
+        if item is None:
+            finished += 1
+            continue
+        batch, hints, error = item
+        if hints is None:
+            failed.extend(batch)
+            log(f"No hints for {', '.join(batch)} after {retries + 1} attempts: {error!r}")
+        else:
+            for word, hint in zip(batch, hints):
+                hint = " ".join(hint.split())
+                if hint:
+                    fp.write(f"{word}={hint}\n")
+            # Flushed batches are kept by the next run.
+            fp.flush()
+            meter.add(len(batch))
+        if progress is not None:
+            progress.update(len(batch))
+
+    for thread in threads:
+        thread.join()
+    metrics = meter.summary()
+    metrics["errors"] = len(errors)
+    metrics["failed"] = len(failed)
+    return metrics
+
+
+def run(backend="transformers", batch_size=8, concurrency=1, limit=None):
+    data_dir = pathlib.Path.cwd() / "data"
+    output_path = data_dir / "hints.txt"
+
+    done = read_done(output_path)
+    pending = [word for word in read_words(data_dir) if word not in done]
+    if limit is not None:
+        pending = pending[:limit]
+    print(f"{len(done)} words already have hints, {len(pending)} to go.")
+    if not pending:
+        return
+
+    backend_cls = backends[backend]
+    hint_backend = (
+        backend_cls() if backend == "guidance" else backend_cls(batch_size=batch_size)
+    )
 
-def run():
-    from transformers import AutoTokenizer, MistralForCausalLM
-    import pathlib
-    import guidance
-
-    model = "mistralai/Mistral-7B-Instruct-v0.2"
-
-    tokenizer = AutoTokenizer.from_pretrained(model, load_in_8bit=True)
-    model = MistralForCausalLM.from_pretrained(model, load_in_8bit=True)
-    llama = guidance.llms.Transformers(model, tokenizer)
-    guidance.llm = llama
-
-    program = guidance("""<s>[INST] You're an AI assistant help me build a cross-word puzzle.
-To make a good game, we need to give good hints to the player.
-For instance, given the word "horse", one might return the hint "Four-legged animal used throughly history as a mount".
-Help me by creating more hints, hints should be separated by a newline.
-For example:
-
-horse=Four-legged animal used throughly history as a mount.
-sun=Mass of glowing hot gases, the center of our solar system.
-                       
-[/INST]
-{{word}}={{gen 'description' stop="\n" max_tokens=32}}
-""")
-    input_dictionary_path = (pathlib.Path.cwd() / "data" / "dictionary_en.json")
-    with open(input_dictionary_path, "r") as fp:
-        input_dictionary = json.load(fp)
-
-    output_path = (pathlib.Path.cwd() / "data" / "hints.txt")
     print("Beginning generation loop")
-    with open(output_path, "w") as fp:
-        for word_obj in tqdm(input_dictionary):
-            key = word_obj["word"]
-            executed_program = program(
-                word=key,
-            )
-            output = key + "=" + executed_program["description"] + "\n"
-            print("Appending... ", output)
-            fp.write(output)
-            fp.flush()
\ No newline at end of file
+    with open(output_path, "a", encoding="utf-8") as fp, tqdm(
+        total=len(pending)
+    ) as progress:
+        metrics = generate_hints(
+            hint_backend,
+            iter(pending),
+            fp,
+            concurrency=concurrency,
+            progress=progress,
+        )
+    print("Throughput:", json.dumps(metrics))
+    if metrics["failed"]:
+        print(f"{metrics['failed']} words got no hint, run again to retry them.")
+    return metrics
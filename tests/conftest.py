@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The repository root holds the grid_generator, hint_builder, ... packages.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DICTIONARY_PATH = os.path.join(ROOT, "data", "enriched_dictionary_en.json")
+
+
+@pytest.fixture(scope="session")
+def word_picker():
+    from grid_generator.src.grid_generator import WordPicker
+
+    return WordPicker(DICTIONARY_PATH, stop_word_offset=0, most_frequents=1000)
@@ -0,0 +1,46 @@
+"""generate_batch against a service resolving puzzles immediately."""
+from concurrent.futures import Future
+import io
+import json
+
+from grid_generator.src.batch import generate_batch
+
+
+class FakeService:
+    def __init__(self):
+        self.submitted = []
+
+    def submit_puzzle(self, **kwargs) -> Future:
+        self.submitted.append(kwargs)
+        future = Future()
+        future.set_result({"seed": kwargs["seed"]})
+        return future
+
+
+def test_passes_options_to_every_puzzle():
+    service = FakeService()
+    fp = io.StringIO()
+
+    written = generate_batch(
+        service,
+        5,
+        fp,
+        seed=10,
+        max_in_flight=2,
+        difficulty="hard",
+        time_budget=1.5,
+        strategy="first",
+    )
+
+    assert written == 5
+    assert sorted(json.loads(line)["seed"] for line in fp.getvalue().splitlines()) == [
+        10,
+        11,
+        12,
+        13,
+        14,
+    ]
+    assert {
+        (kwargs["difficulty"], kwargs["time_budget"], kwargs["strategy"])
+        for kwargs in service.submitted
+    } == {("hard", 1.5, "first")}
@@ -0,0 +1,30 @@
+"""Failed word sets in PuzzleCache."""
+from grid_generator.src import cache as cache_module
+from grid_generator.src.cache import PuzzleCache
+
+WORDS = ["house", "river", "stone"]
+
+
+def test_failures_need_several_attempts(tmp_path):
+    cache = PuzzleCache(tmp_path, max_failures=2)
+    cache.put_failure(WORDS, seed_free=True)
+    assert not cache.has_failed(WORDS, seed_free=True)
+    cache.put_failure(WORDS, seed_free=True)
+    assert cache.has_failed(WORDS, seed_free=True)
+    assert not cache.has_failed(WORDS, seed_free=False)
+    # The counter is on disk, shared with other processes and later runs.
+    assert PuzzleCache(tmp_path, max_failures=2).has_failed(WORDS, seed_free=True)
+
+
+def test_failures_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = PuzzleCache(tmp_path, max_failures=1, failure_ttl=60)
+    cache.put_failure(WORDS)
+    assert cache.has_failed(WORDS)
+    now[0] += 61
+    assert not cache.has_failed(WORDS)
+    assert not PuzzleCache(tmp_path, max_failures=1, failure_ttl=60).has_failed(WORDS)
+    # An expired entry counts again from zero.
+    cache.put_failure(WORDS)
+    assert cache.has_failed(WORDS)
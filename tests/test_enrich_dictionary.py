@@ -0,0 +1,15 @@
+"""The streaming join of the dictionary with its hints."""
+from enrich_dictionary.enrichers.english import iter_enriched
+
+
+def test_keeps_dictionary_order():
+    entries = [{"word": "zeta", "v": 1}, {"word": "alpha"}, {"word": "zeta", "v": 2}, {"word": "mid"}]
+    hints = [("alpha", "a"), ("zeta", "z1"), ("mid", "m"), ("zeta", "z2"), ("zeta", "z1"), ("none", "n")]
+
+    enriched = list(iter_enriched(iter(entries), iter(hints)))
+
+    assert enriched == [
+        {"word": "zeta", "v": 2, "hint": ["z1", "z2"]},
+        {"word": "alpha", "hint": ["a"]},
+        {"word": "mid", "hint": ["m"]},
+    ]
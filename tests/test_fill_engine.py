@@ -0,0 +1,41 @@
+"""BacktrackingFiller placements."""
+from grid_generator.src.cache import grid_from_bytes, grid_to_bytes
+from grid_generator.src.fill_engine import BacktrackingFiller
+from grid_generator.src.grid_generator import CancellationToken
+
+WORDS = ["house", "river", "stone", "garden", "window", "silver"]
+
+
+def _layout(grid):
+    return sorted(
+        (pword.word, pword.x_start, pword.y_start, pword.orientation)
+        for pword in grid.placed_words
+    )
+
+
+def test_places_every_word_connected():
+    grid = BacktrackingFiller().fill(WORDS)
+    assert sorted(pword.word for pword in grid.placed_words) == sorted(WORDS)
+    assert grid.is_valid()
+    assert grid.crossings >= len(WORDS) - 1
+    # Inserting the words again goes through every placement check.
+    assert _layout(grid_from_bytes(grid_to_bytes(grid))) == _layout(grid)
+
+
+def test_is_deterministic():
+    assert _layout(BacktrackingFiller().fill(WORDS)) == _layout(
+        BacktrackingFiller().fill(list(reversed(WORDS)))
+    )
+
+
+def test_unplaceable_words():
+    # "abcd" and "efgh" only cross "aeio", on adjacent letters.
+    filler = BacktrackingFiller(max_nodes=100)
+    assert filler.fill(["abcd", "efgh", "aeio"]) is None
+    assert filler.nodes_visited <= 100
+
+
+def test_cancelled_fill():
+    cancel = CancellationToken()
+    cancel.cancel()
+    assert BacktrackingFiller().fill(WORDS, cancel=cancel) is None
@@ -0,0 +1,63 @@
+"""Grid placement rules, checked as words are inserted."""
+import pytest
+
+from grid_generator.src.grid_generator import (
+    Grid,
+    GridConflictingCell,
+    WordInGrid,
+    WordOrientation,
+)
+
+
+def horizontal(word, x, y):
+    return WordInGrid(x, x + len(word), y, y, word, orientation=WordOrientation.Horizontal)
+
+
+def vertical(word, x, y):
+    return WordInGrid(x, x, y, y + len(word), word, orientation=WordOrientation.Vertical)
+
+
+def test_crossing_words():
+    grid = Grid(x_size=10, y_size=10)
+    grid.insert_word(horizontal("house", 0, 2))
+    grid.insert_word(vertical("stone", 3, 2))
+    assert grid.crossings == 1
+    assert grid.crossing_count(3, 2) == 2
+    assert grid.is_valid()
+
+
+@pytest.mark.parametrize(
+    "second, message",
+    [
+        (horizontal("river", 0, 1), "touches"),
+        (horizontal("river", 5, 0), "extends"),
+        (vertical("river", 5, 0), "touches"),
+        (horizontal("house", 0, 0), "same orientation"),
+        (vertical("river", 0, 0), "already used"),
+    ],
+    ids=["side by side", "extension", "touching an end", "overlap", "letter"],
+)
+def test_rejected_placements(second, message):
+    grid = Grid(x_size=10, y_size=10)
+    grid.insert_word(horizontal("house", 0, 0))
+    cells = bytes(grid.cells)
+    with pytest.raises(GridConflictingCell, match=message):
+        grid.insert_word(second)
+    # A rejected word leaves the grid as it was.
+    assert bytes(grid.cells) == cells
+    assert len(grid.placed_words) == 1
+
+
+def test_words_outside_the_grid_are_rejected():
+    grid = Grid(x_size=4, y_size=4)
+    with pytest.raises(GridConflictingCell, match="outside"):
+        grid.insert_word(horizontal("house", 0, 0))
+
+
+def test_from_words_fits_the_bounding_box():
+    grid = Grid.from_words([horizontal("house", -3, 4), vertical("stone", 0, 4)])
+    assert (grid.x_size, grid.y_size) == (5, 5)
+    assert grid.area == 25
+    assert "".join(grid.grid[0]) == "house"
+    assert [row[3] for row in grid.grid] == list("stone")
+    assert grid.used_pos == {*range(5), 8, 13, 18, 23}
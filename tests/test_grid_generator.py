@@ -0,0 +1,58 @@
+"""CrossWordGame and the word picking it relies on."""
+import pytest
+
+from grid_generator.src.grid_generator import CrossWordGame, FillEngine
+
+
+def test_fixed_words_are_normalized(word_picker):
+    game = CrossWordGame(
+        word_picker, words=["House", " river", "stone", "house"], threads=1, seed=1
+    )
+    assert game.fixed_words == ["house", "river", "stone"]
+    assert sorted(pword.word for pword in game.grid.placed_words) == [
+        "house",
+        "river",
+        "stone",
+    ]
+    assert len(game.get_hints()) == 3
+
+
+def test_unknown_fixed_words_are_rejected(word_picker):
+    with pytest.raises(ValueError, match="stonex, qqq"):
+        CrossWordGame(word_picker, words=["house", "stonex", "qqq"], threads=1, seed=1)
+
+
+def test_mask_numbers_more_than_255_words(word_picker):
+    game = CrossWordGame(
+        word_picker, num_words=300, engine=FillEngine.Growth, threads=1, seed=1
+    )
+    numbers = {cell for row in game.to_dict()["mask"] for cell in row}
+    assert {255, 299} <= numbers
+    assert max(numbers) == 299
+    assert -1 in numbers
+
+
+def test_growth_fills_around_fixed_words(word_picker):
+    game = CrossWordGame(
+        word_picker,
+        num_words=12,
+        words=["house", "river", "stone"],
+        engine=FillEngine.Growth,
+        threads=1,
+        seed=1,
+    )
+    placed = [pword.word for pword in game.grid.placed_words]
+    assert len(placed) == 12
+    assert {"house", "river", "stone"} <= set(placed)
+
+
+@pytest.mark.parametrize("engine", [FillEngine.Random, FillEngine.Backtracking])
+def test_seeded_games_do_not_depend_on_threads(word_picker, engine):
+    games = [
+        CrossWordGame(word_picker, num_words=6, threads=threads, engine=engine, seed=7)
+        for threads in (1, 4, 1)
+    ]
+    assert games[0].grid is not None
+    assert games[0].to_dict() == games[1].to_dict() == games[2].to_dict()
+    other = CrossWordGame(word_picker, num_words=6, threads=1, engine=engine, seed=8)
+    assert other.to_dict() != games[0].to_dict()
@@ -0,0 +1,101 @@
+"""generate_hints against StubBackend, no model needed."""
+import io
+import threading
+import time
+
+from hint_builder.backends import StubBackend
+from hint_builder.builders.english import generate_hints
+
+
+class RecordingBackend(StubBackend):
+    """Records the batches, fails on the words of fail_on."""
+
+    def __init__(self, batch_size=8, fail_on=(), failures=1):
+        super().__init__(batch_size=batch_size)
+        self.fail_on = set(fail_on)
+        self.failures = failures
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def generate(self, words):
+        with self.lock:
+            self.batches.append(list(words))
+            if self.fail_on.intersection(words) and self.failures:
+                self.failures -= 1
+                raise RuntimeError("backend failed")
+        return super().generate(words)
+
+
+def _lines(fp):
+    return sorted(fp.getvalue().splitlines())
+
+
+def test_batches():
+    backend = RecordingBackend(batch_size=3)
+    fp = io.StringIO()
+    words = [f"word{i}" for i in range(7)]
+
+    metrics = generate_hints(backend, iter(words), fp, concurrency=2)
+
+    assert sorted(len(batch) for batch in backend.batches) == [1, 3, 3]
+    assert _lines(fp) == sorted(f"{word}=Hint for {word}." for word in words)
+    assert metrics["words"] == 7
+    assert metrics["batches"] == 3
+    assert metrics["errors"] == metrics["failed"] == 0
+
+
+def test_backpressure():
+    release = threading.Event()
+    pulled = []
+
+    class BlockingBackend(StubBackend):
+        def generate(self, words):
+            release.wait(5)
+            return super().generate(words)
+
+    def words():
+        for i in range(50):
+            pulled.append(i)
+            yield f"word{i}"
+
+    fp = io.StringIO()
+    thread = threading.Thread(
+        target=generate_hints, args=(BlockingBackend(batch_size=1), words(), fp)
+    )
+    thread.start()
+    deadline = time.monotonic() + 5
+    while len(pulled) < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    # One batch in the backend, two queued, one waiting for room: the
+    # producer cannot pull a fifth word before the backend is released.
+    assert len(pulled) == 4
+    release.set()
+    thread.join(5)
+    assert len(_lines(fp)) == 50
+
+
+def test_retries_failed_batch():
+    backend = RecordingBackend(batch_size=2, fail_on={"word1"}, failures=1)
+    fp = io.StringIO()
+    words = [f"word{i}" for i in range(4)]
+
+    metrics = generate_hints(backend, iter(words), fp, retry_delay=0)
+
+    assert backend.batches.count(["word0", "word1"]) == 2
+    assert _lines(fp) == sorted(f"{word}=Hint for {word}." for word in words)
+    assert metrics["errors"] == 1
+    assert metrics["failed"] == 0
+
+
+def test_reports_words_failing_every_attempt(capsys):
+    backend = RecordingBackend(batch_size=2, fail_on={"word1"}, failures=10)
+    fp = io.StringIO()
+    words = [f"word{i}" for i in range(4)]
+
+    metrics = generate_hints(backend, iter(words), fp, retries=2, retry_delay=0)
+
+    assert backend.batches.count(["word0", "word1"]) == 3
+    assert _lines(fp) == ["word2=Hint for word2.", "word3=Hint for word3."]
+    assert metrics["errors"] == 3
+    assert metrics["failed"] == 2
+    assert "No hints for word0, word1 after 3 attempts" in capsys.readouterr().out
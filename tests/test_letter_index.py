@@ -0,0 +1,45 @@
+"""LetterPositionIndex against a brute force scan of the words."""
+from grid_generator.src.grid_generator import LetterPositionIndex
+
+
+def test_postings_match_a_scan(word_picker):
+    words = word_picker.word_dictionary.unique_words[:2000]
+    index = LetterPositionIndex(words)
+
+    expected = {}
+    for word_id, word in enumerate(words):
+        for position, char in enumerate(word):
+            expected.setdefault((char, position, len(word)), []).append(word_id)
+    assert {key: list(ids) for key, ids in index.postings.items()} == expected
+
+
+def test_lookup_filters_match_a_scan(word_picker):
+    words = word_picker.word_dictionary.unique_words[:2000]
+    index = LetterPositionIndex(words)
+
+    def scan(char, position=None, length=None, min_length=None, max_length=None):
+        return {
+            word_id
+            for word_id, word in enumerate(words)
+            if any(
+                letter == char and position in (None, at)
+                for at, letter in enumerate(word)
+            )
+            and length in (None, len(word))
+            and (min_length is None or len(word) >= min_length)
+            and (max_length is None or len(word) <= max_length)
+        }
+
+    for char in "aeqz":
+        assert index.lookup(char) == scan(char)
+        assert index.lookup(char, position=1) == scan(char, position=1)
+        assert index.lookup(char, length=5) == scan(char, length=5)
+        assert index.lookup(char, min_length=4, max_length=6) == scan(
+            char, min_length=4, max_length=6
+        )
+        assert sorted(index.occurrences(char)) == sorted(
+            (word_id, at)
+            for word_id, word in enumerate(words)
+            for at, letter in enumerate(word)
+            if letter == char
+        )
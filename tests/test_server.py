@@ -0,0 +1,103 @@
+"""Round trips against a PuzzleServer listening on localhost."""
+from concurrent.futures import Future
+import asyncio
+import json
+
+from grid_generator.src.server import PuzzleServer
+
+
+class FakeService:
+    """Resolves puzzles immediately, a 13 word puzzle raises."""
+
+    workers = 2
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit_puzzle(self, num_words=6, time_budget=None, **kwargs) -> Future:
+        self.submitted.append((num_words, time_budget))
+        future = Future()
+        if num_words == 13:
+            future.set_exception(RuntimeError("worker failed"))
+        else:
+            future.set_result({"words": [], "num_words": num_words})
+        return future
+
+
+async def _get(port, target):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(body)
+
+
+async def _round_trips():
+    service = FakeService()
+    async with PuzzleServer(service, prefetch=[(6, None)], buffer_size=2) as server:
+        port = await server.start(port=0)
+        for _ in range(100):
+            if len(server.buffers[(6, None)]) == 2:
+                break
+            await asyncio.sleep(0.01)
+        return service, [
+            await _get(port, "/puzzle?num_words=6"),
+            await _get(port, "/puzzle?num_words=8"),
+            await _get(port, "/puzzle?num_words=abc"),
+            await _get(port, "/puzzle?num_words=13"),
+            await _get(port, "/nowhere"),
+            await _get(port, "/health"),
+        ]
+
+
+def test_round_trips():
+    service, responses = asyncio.run(_round_trips())
+    buffered, on_demand, bad_request, failed, not_found, health = responses
+
+    assert buffered == (200, {"words": [], "num_words": 6, "difficulty": None})
+    assert on_demand[0] == 200 and on_demand[1]["num_words"] == 8
+    assert bad_request[0] == 400
+    assert failed[0] == 503
+    assert not_found[0] == 404
+    assert health[0] == 200
+    # Only the on-demand puzzles were generated within the deadline.
+    assert [num_words for num_words, budget in service.submitted if budget] == [8, 13]
+
+
+class PendingService(FakeService):
+    """Never resolves prefetched puzzles."""
+
+    def submit_puzzle(self, num_words=6, time_budget=None, **kwargs) -> Future:
+        if time_budget is not None:
+            return super().submit_puzzle(num_words, time_budget, **kwargs)
+        self.submitted.append((num_words, time_budget))
+        return Future()
+
+
+async def _refills_in_flight():
+    service = PendingService()
+    async with PuzzleServer(service, prefetch=[(6, None), (8, None)]) as server:
+        port = await server.start(port=0)
+        for _ in range(500):
+            if service.submitted:
+                break
+            await asyncio.sleep(0.01)
+        # Lets the other refill task run up to its wait as well.
+        for _ in range(10):
+            await asyncio.sleep(0)
+        in_flight = len(service.submitted)
+        # Buffers are empty, the puzzle is generated on demand right away.
+        status, _ = await _get(port, "/puzzle?num_words=6")
+        return in_flight, status
+
+
+def test_refills_leave_workers_for_on_demand():
+    in_flight, status = asyncio.run(_refills_in_flight())
+    # 2 workers, 1 reserved for on-demand puzzles.
+    assert in_flight == 1
+    assert status == 200
@@ -0,0 +1,54 @@
+"""Path searches over WordGraph, in process and in worker processes."""
+import random
+
+import pytest
+
+from grid_generator.src import grid_generator
+from grid_generator.src.grid_generator import WordGraph
+
+WORDS = ["house", "river", "stone", "garden", "window", "silver"]
+
+
+def _graph_state(graph):
+    return (
+        bytes(graph.link_origin),
+        bytes(graph.link_target),
+        bytes(graph.link_index_a),
+        bytes(graph.link_index_b),
+        [(link.used, link.parent_letter) for link in graph.links],
+    )
+
+
+def test_search_leaves_the_graph_unchanged():
+    graph = WordGraph(WORDS)
+    before = _graph_state(graph)
+    first = graph.generate_all_pathes(max_pathes=20, rng=random.Random(1))
+    assert _graph_state(graph) == before
+    # The graph is not consumed, the same seed finds the same pathes again.
+    assert graph.generate_all_pathes(max_pathes=20, rng=random.Random(1)) == first
+    assert first
+    for key, path in first.items():
+        assert len(set(key)) == len(key) == len(WORDS) - 1
+        assert [graph.links[link_id] for link_id in key] == path
+        # One link leaves every node but the last one visited.
+        assert len({graph.link_origin[link_id] for link_id in key}) == len(key)
+
+
+def test_parallel_search_finds_complete_pathes():
+    graph = WordGraph(WORDS)
+    pathes = graph.parallelized_generate_all_pathes(
+        max_pathes=20, threads=2, rng=random.Random(1)
+    )
+    assert pathes
+    assert all(len(path) == len(WORDS) - 1 for path in pathes.values())
+    assert graph.path_ids == list(pathes)
+
+
+def test_parallel_search_raises_worker_errors(monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("search failed")
+
+    # Forked workers inherit the patched module.
+    monkeypatch.setattr(grid_generator, "randomized_path_ids", fail)
+    with pytest.raises(RuntimeError, match="search failed"):
+        WordGraph(WORDS).parallelized_generate_all_pathes(threads=2)
@@ -0,0 +1,47 @@
+"""Frequency ranked, length bucketed word picking."""
+from collections import Counter
+import random
+
+import pytest
+
+from grid_generator.src.grid_generator import AliasTable, Difficulty
+
+
+def test_alias_table_samples_by_weight():
+    table = AliasTable([1, 2, 3, 4, 0])
+    rng = random.Random(1)
+    counts = Counter(table.sample(rng) for _ in range(50000))
+    assert counts[4] == 0
+    for idx, weight in enumerate([1, 2, 3, 4]):
+        assert counts[idx] / 50000 == pytest.approx(weight / 10, abs=0.01)
+
+
+def test_difficulty_bands_split_the_candidates(word_picker):
+    bands = [word_picker.band(difficulty) for difficulty in Difficulty.bands]
+    assert [word_id for band in bands for word_id in band] == list(
+        word_picker.band()
+    )
+    hard = word_picker.band(Difficulty.Hard)
+    rng = random.Random(1)
+    for _ in range(20):
+        words = word_picker.pick_n_random_words(
+            6, max_length=8, min_length=4, rng=rng, difficulty=Difficulty.Hard
+        )
+        assert len(set(words)) == 6
+        for word in words:
+            assert word_picker.word_dictionary.word_id(word) in hard
+            assert 4 <= len(word) <= 8
+
+
+def test_exhausted_length_range_raises(word_picker):
+    lengths = word_picker.word_dictionary.lengths
+    available = sum(1 for word_id in word_picker.band() if lengths[word_id] == 11)
+    assert available
+    words = word_picker.pick_n_random_words(
+        available, max_length=11, min_length=11, rng=random.Random(1)
+    )
+    assert len(set(words)) == available
+    with pytest.raises(ValueError, match="Not enough words of length 11-11"):
+        word_picker.pick_n_random_words(
+            available + 1, max_length=11, min_length=11, rng=random.Random(1)
+        )